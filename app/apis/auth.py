@@ -14,20 +14,23 @@ def startup():
     database.Base.metadata.create_all(bind=database.engine)
 
 @router.post("/register")
-def register(username: str = Body(...), password: str = Body(...), db: Session = Depends(auth.get_db)):
-    existing = db.query(auth.User).filter(auth.User.username == username).first()
+async def register(username: str = Body(...), password: str = Body(...), db: Session = Depends(auth.get_db)):
+    existing = await auth.get_user(db, username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
-    user = auth.User(username=username, hashed_password=auth.hash_password(password))
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    hashed_password = await auth.hash_password_async(password)
+    await auth.create_user(db, username, hashed_password)
     return {"msg": "User registered"}
 
 @router.post("/login")
-def login(username: str = Body(...), password: str = Body(...), db: Session = Depends(auth.get_db)):
-    user = db.query(auth.User).filter(auth.User.username == username).first()
-    if not user or not auth.verify_password(password, user.hashed_password):
+async def login(username: str = Body(...), password: str = Body(...), db: Session = Depends(auth.get_db)):
+    user = await auth.get_user(db, username)
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid username or password")
+    valid, new_hash = await auth.verify_and_update_password(password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    if new_hash:
+        await auth.update_password_hash(db, user, new_hash)
     token = auth.create_access_token({"sub": user.username})
-    return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": token, "token_type": "bearer"}
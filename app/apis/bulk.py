@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from app.helpers.auth import get_current_user
+from app.helpers.bulk import run_batch, validate_batch
+from app.schemas.bulk import BulkRequest
+
+router = APIRouter(prefix="/bulk")
+
+@router.post("")
+async def bulk_operations(batch: BulkRequest, user=Depends(get_current_user)):
+    validate_batch(batch)
+    return StreamingResponse(run_batch(batch), media_type="application/x-ndjson")
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Depends, Query
+from app.helpers.auth import get_current_user
+from app.helpers.capacity import capacity_report
+
+router = APIRouter(prefix="/capacity")
+
+@router.get("")
+async def get_capacity(top: int = Query(10, ge=1, le=100), user=Depends(get_current_user)):
+    return await capacity_report(top)
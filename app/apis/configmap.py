@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, UploadFile, Form, File, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, Form, File, Depends, Query, Request, Response
 from kubernetes.client.rest import ApiException
 from fastapi.responses import PlainTextResponse
 from app.helpers.auth import get_current_user
-from typing import Optional
+from app.helpers.responses import render, cached_not_modified, not_modified, etag
+from app.helpers.uploads import collect_entries
+from typing import List, Optional
+import yaml
 from app.helpers.configmap import (
     create_config_map, get_config_map, list_config_maps,
     update_config_map, delete_config_map
@@ -15,20 +18,19 @@ router = APIRouter(prefix="/ns")
 async def create_configmap(
     namespace: str,
     name: str = Form(...),
-    filename: str = Form(...),
+    filename: Optional[str] = Form(None),
     content: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
+    extract: bool = Form(False),
     user=Depends(get_current_user)
 ):
-    if not file and not content:
-        raise HTTPException(status_code=400, detail="Either 'file' or 'content' must be provided.")
-
-    # Pilih apakah akan menggunakan content atau file
-    file_data = content if content else (await file.read()).decode("utf-8")
+    # Upload dibaca per chunk dengan batas ukuran ConfigMap, konten non-UTF-8 masuk binaryData
+    data, binary_data = await collect_entries(content or None, filename, [file, *(files or [])], extract)
 
     try:
         # Panggil helper untuk membuat ConfigMap
-        created = await create_config_map(namespace, name, filename, file_data)
+        created = await create_config_map(namespace, name, data, binary_data)
     except ApiException as e:
         raise HTTPException(status_code=e.status, detail=e.body)
 
@@ -36,41 +38,53 @@ async def create_configmap(
 
 
 @router.get("/{namespace}/configmaps", response_model=list[ConfigMapListItem])
-async def list_configmaps(namespace: str):
-    return await list_config_maps(namespace)
+async def list_configmaps(namespace: str, request: Request, response: Response, fields: Optional[str] = Query(None)):
+    cached = cached_not_modified(request, "configmaps")
+    if cached:
+        return cached
+    result = await list_config_maps(namespace, fields=fields)
+    return render(result, raw=fields is not None, request=request, response=response)
 
 
 @router.get("/{namespace}/configmaps/{name}")
-async def get_configmap(namespace: str, name: str, format: str = "json", user=Depends(get_current_user)):
-    as_yaml = format.lower() == "yaml"
-    result = await get_config_map(namespace, name, as_yaml=as_yaml)
+async def get_configmap(
+    namespace: str,
+    name: str,
+    request: Request,
+    response: Response,
+    format: str = "json",
+    fields: Optional[str] = Query(None),
+    user=Depends(get_current_user),
+):
+    cached = cached_not_modified(request, "configmaps", namespace, name)
+    if cached:
+        return cached
+    result = await get_config_map(namespace, name, fields=fields)
 
-    if as_yaml:
-        return PlainTextResponse(content=result, media_type="text/plain")
-    return result
+    if format.lower() == "yaml":
+        return not_modified(request, result.resource_version) or PlainTextResponse(
+            content=yaml.dump(dict(result), sort_keys=False, default_flow_style=False),
+            media_type="text/plain",
+            headers={"ETag": etag(result.resource_version)},
+        )
+    return render(result, request=request, response=response)
 
 
 @router.put("/{namespace}/configmaps/{name}", response_model=ConfigMapResponse)
 async def update_configmap(
     namespace: str,
     name: str,
-    filename: str = Form(...),
+    filename: Optional[str] = Form(None),
     content: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
+    extract: bool = Form(False),
+    resource_version: Optional[str] = Form(None),
     user=Depends(get_current_user)
 ):
+    data, binary_data = await collect_entries(content or None, filename, [file, *(files or [])], extract)
 
-    if not file and not content:
-        raise HTTPException(status_code=400, detail="Either 'file' or 'content' must be provided.")
-
-    file_data = content if content else (await file.read()).decode("utf-8")
-
-    try:
-        created = await update_config_map(namespace, name, filename, file_data)
-    except ApiException as e:
-        raise HTTPException(status_code=e.status, detail=e.body)
-
-    return await update_config_map(namespace, name, filename, file_data)
+    return await update_config_map(namespace, name, data, binary_data, resource_version)
 
 
 @router.delete("/{namespace}/configmaps/{name}")
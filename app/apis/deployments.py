@@ -1,19 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body, Path
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Path, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from app.helpers import deployment
 from app.helpers.deployment import patch_deployment, remove_deployment_labels
 from app.helpers.auth import get_current_user
+from app.helpers.kube_async import run_k8s
+from app.helpers.responses import render, cached_not_modified
+from app.helpers.resource_watch import WATCH_HEARTBEAT_SECONDS, format_sse
+from app.helpers.rollout import rollout_events
 from app.schemas.deployments import DeploymentCreate, DeploymentUpdate, DeploymentResponse
 
 router = APIRouter(prefix="/deployments", tags=["Deployments"])
 
 @router.get("", response_model=List[DeploymentResponse])
-def list_deployments(namespace: str = Query("default"), user=Depends(get_current_user)):
-    return deployment.list_deployments(namespace)
+def list_deployments(
+    request: Request,
+    response: Response,
+    namespace: str = Query("default"),
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    cursor: Optional[str] = Query(None),
+    all_namespaces: bool = Query(False),
+    fields: Optional[str] = Query(None),
+    user=Depends(get_current_user),
+):
+    if limit is None and cursor is None:
+        cached = cached_not_modified(request, "deployments")
+        if cached:
+            return cached
+    result = deployment.list_deployments(None if all_namespaces else namespace, limit=limit, cursor=cursor, fields=fields)
+    headers = {"X-Next-Cursor": result.continue_token} if result.continue_token else {}
+    return render(result, raw=fields is not None, headers=headers, request=request, response=response)
 
 @router.get("/{name}")
-def get_deployment(name: str, namespace: str = Query("default"), user=Depends(get_current_user)):
-    return deployment.get_deployment(name, namespace)
+def get_deployment(
+    request: Request,
+    response: Response,
+    name: str,
+    namespace: str = Query("default"),
+    fields: Optional[str] = Query(None),
+    user=Depends(get_current_user),
+):
+    cached = cached_not_modified(request, "deployments", namespace, name)
+    if cached:
+        return cached
+    return render(deployment.get_deployment(name, namespace, fields=fields), request=request, response=response)
+
+@router.get("/{name}/rollout")
+async def rollout_status(
+    name: str,
+    namespace: str = Query("default"),
+    timeout: float = Query(300, gt=0, le=3600, description="Seconds to wait for the rollout"),
+    wait: bool = Query(False, description="Long-poll and return only the final state"),
+    user=Depends(get_current_user),
+):
+    if wait:
+        final = None
+        async for state in await rollout_events(name, namespace, timeout):
+            final = state
+        return final
+
+    events = await rollout_events(name, namespace, timeout, heartbeat=WATCH_HEARTBEAT_SECONDS)
+
+    async def stream():
+        async for state in events:
+            yield format_sse(state["phase"], state) if state else ": heartbeat\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.post("")
 def create_deployment(deploy: DeploymentCreate, user=Depends(get_current_user)):
@@ -27,7 +83,7 @@ async def update_deployment(
     labels_to_remove: Optional[List[str]] = Query(None),
     user=Depends(get_current_user),
 ):
-    return patch_deployment(name, namespace, update_data, labels_to_remove)
+    return await run_k8s(patch_deployment, name, namespace, update_data, labels_to_remove)
 
 
 @router.patch("/{name}/labels/remove")
@@ -35,9 +91,10 @@ async def remove_labels(
     name: str,
     namespace: str = Query("default"),
     labels_to_remove: List[str] = Body(..., embed=True),
+    resource_version: Optional[str] = Body(None, embed=True),
     user=Depends(get_current_user),
 ):
-    return remove_deployment_labels(name, namespace, labels_to_remove)
+    return await run_k8s(remove_deployment_labels, name, namespace, labels_to_remove, resource_version)
 
 @router.delete("/{name}")
 def delete_deployment(name: str, namespace: str = Query("default"), user=Depends(get_current_user)):
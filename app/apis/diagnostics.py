@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from app.helpers.auth import get_current_user, token_cache_stats
+from app.helpers.informer import informer_status
+from app.configs.kube_client import pool_stats
+from app.helpers.log_hub import hub_status
+from app.helpers.write_dedup import dedup_stats
+
+router = APIRouter(prefix="/diagnostics")
+
+@router.get("/informers")
+def get_informers(user=Depends(get_current_user)):
+    return informer_status()
+
+@router.get("/k8s-pool")
+def get_k8s_pool(user=Depends(get_current_user)):
+    return pool_stats()
+
+@router.get("/auth-cache")
+def get_auth_cache(user=Depends(get_current_user)):
+    return token_cache_stats()
+
+@router.get("/log-hub")
+async def get_log_hub(user=Depends(get_current_user)):
+    return hub_status()
+
+@router.get("/write-dedup")
+def get_write_dedup(user=Depends(get_current_user)):
+    return dedup_stats()
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Request, Response
+from typing import List, Optional
 from app.helpers.auth import get_current_user
+from app.helpers.responses import render
+from app.helpers.overview import OVERVIEW_SECTION_TIMEOUT, namespace_overview
 from app.helpers.namespace import (
     list_namespaces,
     get_namespace_details,
@@ -33,12 +35,12 @@ from app.schemas.namespace import (
 router = APIRouter(prefix="/ns")
 
 @router.get("/", response_model=List[str])
-def get_namespaces(user=Depends(get_current_user)):  # Menambahkan autentikasi
-    return list_namespaces()
+def get_namespaces(request: Request, response: Response, user=Depends(get_current_user)):  # Menambahkan autentikasi
+    return render(list_namespaces(), request=request, response=response)
 
 @router.get("/{name}", response_model=dict)
-def get_namespace_by_name(name: str, user=Depends(get_current_user)):
-    return get_namespace_details(name)
+def get_namespace_by_name(name: str, request: Request, response: Response, fields: Optional[str] = Query(None), user=Depends(get_current_user)):
+    return render(get_namespace_details(name, fields=fields), request=request, response=response)
 
 @router.post("/", response_model=dict)
 def post_namespace(payload: NamespaceCreate, user=Depends(get_current_user)):  # Menambahkan autentikasi
@@ -56,6 +58,17 @@ def update_namespace_labels(name: str, payload: NamespaceLabelUpdate, user=Depen
 def remove_labels_from_namespace(name: str, payload: NamespaceLabelKeys, user=Depends(get_current_user)):
     return delete_namespace_labels(name, payload.keys)
 
+@router.get("/{name}/overview", response_model=dict)
+async def get_namespace_overview(
+    name: str,
+    sections: Optional[str] = Query(None, description="Comma separated sections, default all"),
+    timeout: float = Query(OVERVIEW_SECTION_TIMEOUT, gt=0, le=30, description="Per-section timeout in seconds"),
+    hotspots: int = Query(5, ge=0, le=100),
+    user=Depends(get_current_user),
+):
+    selected = [s.strip() for s in sections.split(",") if s.strip()] if sections else None
+    return await namespace_overview(name, selected, timeout=timeout, hotspots=hotspots)
+
 @router.get("/{name}/quotas", response_model=List[dict])
 def list_quotas(name: str, user=Depends(get_current_user)):
     return get_resource_quotas(name)
@@ -1,7 +1,14 @@
 from fastapi import APIRouter
-from app.helpers.pods import list_pods, get_pod, get_pod_logs, stream_logs, create_pod, delete_pod
-from app.helpers.auth import get_current_user
-from fastapi import Query, Path, Depends
+from app.helpers.pods import (
+    list_pods, get_pod, get_pod_logs, stream_logs, stream_merged_logs, websocket_logs,
+    compile_log_matcher, search_pod_logs, create_pod, delete_pod
+)
+from app.helpers.deployment import get_deployment_selector
+from app.helpers.kube_async import run_k8s
+from app.helpers.responses import render, cached_not_modified
+from app.helpers.auth import get_current_user, verify_token
+from fastapi import Query, Path, Depends, Request, Response, WebSocket, HTTPException, status
+from typing import List, Optional
 from fastapi.responses import StreamingResponse
 from app.schemas.pods import PodCreateRequest, PodListResponse, PodInfo, ContainerSpec
 
@@ -9,12 +16,35 @@ router = APIRouter(prefix="/pods")
 
 # === Pods Operation ===
 @router.get("/{namespace}", response_model=PodListResponse)
-def get_pods(namespace: str):
-    return list_pods(namespace)
+def get_pods(
+    namespace: str,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    cursor: Optional[str] = Query(None),
+    all_namespaces: bool = Query(False),
+    fields: Optional[str] = Query(None),
+):
+    if limit is None and cursor is None:
+        cached = cached_not_modified(request, "pods")
+        if cached:
+            return cached
+    result = list_pods(None if all_namespaces else namespace, limit=limit, cursor=cursor, fields=fields)
+    headers = {"X-Next-Cursor": result["next_cursor"]} if result["next_cursor"] else {}
+    return render(result, raw=fields is not None, headers=headers, request=request, response=response)
 
 @router.get("/{namespace}/{pod_name}", response_model=PodInfo)
-def get_pod_detail(namespace: str, pod_name: str):
-    return get_pod(namespace, pod_name)
+def get_pod_detail(
+    namespace: str,
+    pod_name: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None),
+):
+    cached = cached_not_modified(request, "pods", namespace, pod_name)
+    if cached:
+        return cached
+    return render(get_pod(namespace, pod_name, fields=fields), raw=fields is not None, request=request, response=response)
 
 @router.post("/{namespace}")
 def post_create_pod(namespace: str, payload: PodCreateRequest):
@@ -22,16 +52,115 @@ def post_create_pod(namespace: str, payload: PodCreateRequest):
    
 # === Pods Logs ===
 @router.get("/{namespace}/{pod_name}/logs")
-def api_get_logs(pod_name: str, namespace: str, user=Depends(get_current_user)):
-    return get_pod_logs(pod_name, namespace)
+async def api_get_logs(
+    pod_name: str,
+    namespace: str,
+    container: Optional[str] = Query(None),
+    tail_lines: Optional[int] = Query(None, ge=0),
+    since_seconds: Optional[int] = Query(None, ge=1),
+    since_time: Optional[str] = Query(None, description="RFC3339 timestamp"),
+    limit_bytes: Optional[int] = Query(None, ge=1),
+    previous: bool = Query(False),
+    timestamps: bool = Query(False),
+    format: str = Query("text", pattern="^(text|ndjson)$"),
+    user=Depends(get_current_user),
+):
+    body = await get_pod_logs(
+        pod_name, namespace, format,
+        container=container,
+        tail_lines=tail_lines,
+        since_seconds=since_seconds,
+        since_time=since_time,
+        limit_bytes=limit_bytes,
+        previous=previous,
+        timestamps=timestamps,
+    )
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/plain"
+    return StreamingResponse(body, media_type=media_type)
+
+@router.get("/{namespace}/{pod_name}/logs/search")
+async def api_search_logs(
+    pod_name: str,
+    namespace: str,
+    pattern: Optional[str] = Query(None, description="Regular expression"),
+    literal: Optional[List[str]] = Query(None, description="Literal string, may be repeated"),
+    ignore_case: bool = Query(False),
+    before: int = Query(0, ge=0, le=100),
+    after: int = Query(0, ge=0, le=100),
+    max_matches: Optional[int] = Query(None, ge=1),
+    follow: bool = Query(False),
+    container: Optional[str] = Query(None),
+    tail_lines: Optional[int] = Query(None, ge=0),
+    since_seconds: Optional[int] = Query(None, ge=1),
+    since_time: Optional[str] = Query(None, description="RFC3339 timestamp"),
+    previous: bool = Query(False),
+    user=Depends(get_current_user),
+):
+    matcher = compile_log_matcher(pattern, literal, ignore_case)
+    results = await search_pod_logs(
+        namespace, pod_name, matcher,
+        before=before,
+        after=after,
+        max_matches=max_matches,
+        follow=follow,
+        container=container,
+        tail_lines=tail_lines,
+        since_seconds=since_seconds,
+        since_time=since_time,
+        previous=previous,
+    )
+    return StreamingResponse(results, media_type="application/x-ndjson")
 
 @router.get("/{namespace}/{pod_name}/logs/stream")
-def api_stream_pod_logs(pod_name: str, namespace: str, user=Depends(get_current_user)):
+def api_stream_pod_logs(
+    pod_name: str,
+    namespace: str,
+    container: Optional[str] = Query(None),
+    user=Depends(get_current_user),
+):
     return StreamingResponse(
-        stream_logs(namespace, pod_name),
+        stream_logs(namespace, pod_name, container),
         media_type="text/plain"
     )
 
+@router.get("/{namespace}/logs/stream")
+async def api_stream_merged_logs(
+    namespace: str,
+    selector: Optional[str] = Query(None, description="Label selector, e.g. app=web"),
+    deployment: Optional[str] = Query(None, description="Follow the pods of this deployment"),
+    container: Optional[str] = Query(None),
+    user=Depends(get_current_user),
+):
+    if deployment:
+        selector = await run_k8s(get_deployment_selector, deployment, namespace)
+    if not selector:
+        raise HTTPException(status_code=400, detail="Either 'selector' or 'deployment' must be provided.")
+    body = await stream_merged_logs(namespace, selector, container)
+    return StreamingResponse(body, media_type="text/plain")
+
+@router.websocket("/{namespace}/{pod_name}/logs/ws")
+async def ws_stream_pod_logs(
+    websocket: WebSocket,
+    namespace: str,
+    pod_name: str,
+    container: Optional[str] = Query(None),
+    token: Optional[str] = Query(None),
+    batch_bytes: int = Query(32 * 1024, ge=1024, le=1024 * 1024),
+    batch_ms: int = Query(100, ge=10, le=5000),
+):
+    # Browsers cannot set headers on websockets, so the token may come as a query parameter
+    authorization = websocket.headers.get("authorization", "")
+    bearer = token or (authorization[7:] if authorization.lower().startswith("bearer ") else None)
+    try:
+        if not bearer:
+            raise HTTPException(status_code=401, detail="Missing token")
+        verify_token(bearer)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    await websocket_logs(websocket, namespace, pod_name, container, batch_bytes, batch_ms / 1000)
+
 @router.delete("/{namespace}/{name}")
 def api_delete_pod(namespace: str, name: str, user=Depends(get_current_user)):
     return delete_pod(namespace, name)
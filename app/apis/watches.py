@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.helpers.auth import get_current_user
+from app.helpers.resource_watch import WATCHABLE, watch_events
+
+router = APIRouter(prefix="/watch")
+
+@router.get("/{resource}")
+async def watch_resource(
+    resource: str,
+    namespace: str = Query("default"),
+    all_namespaces: bool = Query(False),
+    fields: Optional[str] = Query(None),
+    selector: Optional[str] = Query(None, description="Label selector, e.g. app=web"),
+    resource_version: Optional[str] = Query(None, description="Start after this resourceVersion"),
+    last_event_id: Optional[str] = Header(None),
+    user=Depends(get_current_user),
+):
+    if resource not in WATCHABLE:
+        raise HTTPException(status_code=404, detail=f"Cannot watch '{resource}'. Available: {list(WATCHABLE)}")
+    events = watch_events(
+        resource,
+        None if all_namespaces else namespace,
+        fields=fields,
+        label_selector=selector,
+        # An EventSource reconnect carries the id of the last event it saw
+        resource_version=last_event_id or resource_version,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,116 @@
+# app/configs/kube_client.py
+# One ApiClient (and so one urllib3 connection pool) shared by every helper.
+from kubernetes import client
+from urllib3.connection import HTTPConnection
+from typing import Optional
+import functools
+import os
+import socket
+import threading
+import time
+from app.helpers.metrics import METRICS_ENABLED, UPSTREAM_ERRORS, UPSTREAM_LATENCY
+
+K8S_POOL_MAXSIZE = int(os.getenv("K8S_POOL_MAXSIZE", "32"))
+K8S_CONNECT_TIMEOUT = float(os.getenv("K8S_CONNECT_TIMEOUT", "5"))
+# Read timeout applied to every call that does not set its own
+K8S_REQUEST_TIMEOUT = float(os.getenv("K8S_REQUEST_TIMEOUT", "30"))
+# Longest silence tolerated on streaming calls (watches, log follow), which pass it explicitly
+K8S_STREAM_TIMEOUT = float(os.getenv("K8S_STREAM_TIMEOUT", "3600"))
+K8S_TCP_KEEPALIVE = os.getenv("K8S_TCP_KEEPALIVE", "1") == "1"
+
+
+class PooledApiClient(client.ApiClient):
+    def call_api(self, *args, **kwargs):
+        if kwargs.get("_request_timeout") is None:
+            kwargs["_request_timeout"] = (K8S_CONNECT_TIMEOUT, K8S_REQUEST_TIMEOUT)
+        return super().call_api(*args, **kwargs)
+
+
+def _timed(method, verb: str, resource: str):
+    # Resolved once per method: labels() costs as much as the observation
+    latency = UPSTREAM_LATENCY.labels(verb, resource)
+
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except client.exceptions.ApiException as e:
+            UPSTREAM_ERRORS.labels(verb, resource, str(e.status)).inc()
+            raise
+        except Exception:
+            UPSTREAM_ERRORS.labels(verb, resource, "error").inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+    return timed
+
+
+class InstrumentedApi:
+    """Proxy around a generated API object that times every method call.
+
+    Labels come from the method name, so they are bounded by the client's API
+    surface: ``list_namespaced_pod`` is verb ``list``, resource
+    ``namespaced_pod``. Errors raised while the response is deserialized
+    (4xx/5xx) are counted too, since they happen outside ``call_api``.
+    """
+
+    def __init__(self, api):
+        self._api = api
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        verb, _, resource = name.removesuffix("_with_http_info").partition("_")
+        timed = _timed(attr, verb, resource)
+        # Cached on the proxy, so the next lookup does not come back here
+        setattr(self, name, timed)
+        return timed
+
+
+def instrumented(api):
+    """``api`` (e.g. ``CoreV1Api(get_api_client())``) with upstream metrics when they are enabled."""
+    return InstrumentedApi(api) if METRICS_ENABLED else api
+
+
+def stream_timeout(read: float = K8S_STREAM_TIMEOUT) -> tuple:
+    """``_request_timeout`` for a streaming call; the client rejects ``None`` as a read timeout."""
+    return (K8S_CONNECT_TIMEOUT, read)
+
+
+_api_client: Optional[PooledApiClient] = None
+_lock = threading.Lock()
+
+
+def get_api_client() -> PooledApiClient:
+    global _api_client
+    if _api_client is None:
+        with _lock:
+            if _api_client is None:
+                configuration = client.Configuration.get_default_copy()
+                configuration.connection_pool_maxsize = K8S_POOL_MAXSIZE
+                api_client = PooledApiClient(configuration)
+                if K8S_TCP_KEEPALIVE:
+                    api_client.rest_client.pool_manager.connection_pool_kw["socket_options"] = (
+                        HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+                    )
+                _api_client = api_client
+    return _api_client
+
+
+def pool_stats() -> dict:
+    """Connection reuse counters of the shared urllib3 pools."""
+    pools = get_api_client().rest_client.pool_manager.pools
+    connections = requests = 0
+    for key in pools.keys():
+        pool = pools[key]
+        connections += pool.num_connections
+        requests += pool.num_requests
+    return {
+        "pools": len(pools),
+        "maxsize": K8S_POOL_MAXSIZE,
+        "connections_created": connections,
+        "requests": requests,
+        "connections_per_1k_requests": round(connections * 1000 / requests, 2) if requests else None,
+    }
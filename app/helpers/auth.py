@@ -2,45 +2,230 @@
 from fastapi import Depends, HTTPException, status
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, select, update
 from sqlalchemy.orm import Session
+from typing import NamedTuple, Optional
 from app.schemas.auth import User
-from app.db.database import SessionLocal
+from app.db.database import SessionLocal, AsyncSessionLocal
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import asyncio
+import os
+import threading
+import time
 
 SECRET_KEY = "change_this_secret_key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 360
+# Maximum number of verified tokens kept in memory, 0 disables the cache
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+# Hashes with a different cost are re-hashed transparently on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt runs on its own small pool so logins cannot starve the request threadpool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Running + queued password operations before new ones are rejected with 429
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
+# Seconds a looked-up user is reused by login without querying the database, 0 disables it
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE)
 security = HTTPBearer()
 
-def get_db():
+def _get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+async def _no_sync_db():
+    # The async engine opens its own sessions, so no sync session is checked out
+    return None
+
+get_db = _no_sync_db if AsyncSessionLocal is not None else _get_sync_db
+
 def hash_password(password: str):
     return pwd_context.hash(password)
 
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
 
+async def _run_password_job(func, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=429,
+            detail="Too many concurrent password operations, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_slots.release()
+
+async def hash_password_async(password: str):
+    return await _run_password_job(pwd_context.hash, password)
+
+async def verify_and_update_password(plain: str, hashed: str):
+    """Return (valid, new_hash); new_hash is set when the stored hash uses outdated settings."""
+    return await _run_password_job(pwd_context.verify_and_update, plain, hashed)
+
+class UserRecord(NamedTuple):
+    id: int
+    username: str
+    hashed_password: str
+
+# username -> (expires_at, UserRecord)
+_user_cache: dict = {}
+
+def _cache_user(record: UserRecord):
+    if USER_CACHE_TTL > 0:
+        _user_cache[record.username] = (time.monotonic() + USER_CACHE_TTL, record)
+
+def invalidate_user(username: Optional[str] = None):
+    """Drop a cached user, or every cached user when ``username`` is None."""
+    if username is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(username, None)
+
+# Any change to a User row made through SQLAlchemy in this process drops the cached
+# record and the user's verified tokens, so a deleted or re-passworded user cannot
+# log in with stale data and their tokens are checked again on the next request.
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed_users(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            invalidate_user(obj.username)
+            invalidate_user_tokens(obj.username)
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_bulk_user_changes(orm_execute_state):
+    # UPDATE/DELETE statements do not say which users they touch
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ is User for mapper in orm_execute_state.all_mappers
+    ):
+        invalidate_user()
+        clear_token_cache()
+
+def _get_user(db: Session, username: str) -> Optional[UserRecord]:
+    user = db.query(User).filter(User.username == username).first()
+    return UserRecord(user.id, user.username, user.hashed_password) if user else None
+
+def _create_user(db: Session, username: str, hashed_password: str):
+    user = User(username=username, hashed_password=hashed_password)
+    db.add(user)
+    db.commit()
+
+def _update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.execute(update(User).where(User.id == user_id).values(hashed_password=hashed_password))
+    db.commit()
+
+async def get_user(db: Session, username: str) -> Optional[UserRecord]:
+    entry = _user_cache.get(username)
+    if entry is not None:
+        expires_at, record = entry
+        if expires_at > time.monotonic():
+            return record
+        _user_cache.pop(username, None)
+
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(User).where(User.username == username))
+            user = result.scalar_one_or_none()
+            record = UserRecord(user.id, user.username, user.hashed_password) if user else None
+    else:
+        record = await run_in_threadpool(_get_user, db, username)
+
+    if record is not None:
+        _cache_user(record)
+    return record
+
+async def create_user(db: Session, username: str, hashed_password: str):
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            session.add(User(username=username, hashed_password=hashed_password))
+            await session.commit()
+    else:
+        await run_in_threadpool(_create_user, db, username, hashed_password)
+
+async def update_password_hash(db: Session, user: UserRecord, hashed_password: str):
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(User).where(User.id == user.id).values(hashed_password=hashed_password))
+            await session.commit()
+    else:
+        await run_in_threadpool(_update_password_hash, db, user.id, hashed_password)
+    _cache_user(user._replace(hashed_password=hashed_password))
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+# token -> (claims, exp); entries are dropped once the token's own exp has passed
+_token_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+_token_cache_stats = {"hits": 0, "misses": 0}
+
 def verify_token(token: str):
+    now = time.time()
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+        if entry is not None:
+            payload, exp = entry
+            if exp > now:
+                _token_cache.move_to_end(token)
+                _token_cache_stats["hits"] += 1
+                return dict(payload)
+            del _token_cache[token]
+        _token_cache_stats["misses"] += 1
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+    exp = payload.get("exp")
+    if TOKEN_CACHE_SIZE > 0 and isinstance(exp, (int, float)):
+        with _token_cache_lock:
+            _token_cache[token] = (dict(payload), exp)
+            _token_cache.move_to_end(token)
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return payload
+
+def invalidate_token(token: str):
+    """Drop a token from the cache, e.g. when it is revoked."""
+    with _token_cache_lock:
+        _token_cache.pop(token, None)
+
+def invalidate_user_tokens(username: str):
+    """Drop every cached token issued to ``username``."""
+    with _token_cache_lock:
+        for token in [t for t, (payload, _) in _token_cache.items() if payload.get("sub") == username]:
+            del _token_cache[token]
+
+def clear_token_cache():
+    with _token_cache_lock:
+        _token_cache.clear()
+
+def token_cache_stats():
+    with _token_cache_lock:
+        return {"size": len(_token_cache), "max_size": TOKEN_CACHE_SIZE, **_token_cache_stats}
+
 def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)):
     return verify_token(token.credentials)
 
@@ -0,0 +1,153 @@
+# === bulk.py ===
+# Runs a batch of create/patch/delete/scale operations with bounded concurrency.
+# Operations are grouped by namespace (or by object) and each group runs in
+# submission order, while different groups run in parallel. Every operation is
+# a single API call, except deployment patches: they go through patch_deployment
+# and behave exactly like PATCH /deployments/{name}.
+from kubernetes.client import CoreV1Api, AppsV1Api
+from kubernetes.client.rest import ApiException
+from typing import AsyncIterator, Dict, List
+from fastapi import HTTPException
+from app.configs.kube_client import get_api_client, instrumented
+from app.helpers.deployment import STRATEGIC_MERGE_PATCH, patch_deployment
+from app.helpers.kube_async import run_k8s
+from app.helpers.write_dedup import forget_write
+from app.schemas.bulk import BulkOperation, BulkRequest
+import asyncio
+import json
+import os
+import time
+
+core_v1 = instrumented(CoreV1Api(get_api_client()))
+apps_v1 = instrumented(AppsV1Api(get_api_client()))
+
+# Default number of operations in flight per batch
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "16"))
+BULK_MAX_OPERATIONS = int(os.getenv("BULK_MAX_OPERATIONS", "1000"))
+
+# kind -> (create, patch, delete)
+CALLS = {
+    "deployment": (apps_v1.create_namespaced_deployment, apps_v1.patch_namespaced_deployment,
+                   apps_v1.delete_namespaced_deployment),
+    "configmap": (core_v1.create_namespaced_config_map, core_v1.patch_namespaced_config_map,
+                  core_v1.delete_namespaced_config_map),
+    "pod": (core_v1.create_namespaced_pod, core_v1.patch_namespaced_pod, core_v1.delete_namespaced_pod),
+}
+
+KINDS = {"deployment": "Deployment", "configmap": "ConfigMap", "pod": "Pod"}
+API_VERSIONS = {"deployment": "apps/v1", "configmap": "v1", "pod": "v1"}
+
+
+def _manifest(operation: BulkOperation) -> dict:
+    body = dict(operation.body)
+    body.setdefault("apiVersion", API_VERSIONS[operation.kind])
+    body.setdefault("kind", KINDS[operation.kind])
+    metadata = dict(body.get("metadata") or {})
+    metadata.setdefault("name", operation.name)
+    metadata["namespace"] = operation.namespace
+    body["metadata"] = metadata
+    return body
+
+
+def _execute(operation: BulkOperation, dry_run: bool):
+    create, patch, delete = CALLS[operation.kind]
+    kwargs = {"dry_run": "All"} if dry_run else {}
+    if operation.op == "patch" and operation.kind == "deployment":
+        return patch_deployment(operation.name, operation.namespace, operation.body or {},
+                                operation.labels_to_remove, dry_run=dry_run)
+    if not dry_run:
+        # Anything else may change the object: the next identical update is written again
+        forget_write(operation.kind, operation.namespace, operation.name)
+    if operation.op == "create":
+        return create(operation.namespace, _manifest(operation), **kwargs)
+    if operation.op == "patch":
+        return patch(operation.name, operation.namespace, operation.body, _content_type=STRATEGIC_MERGE_PATCH, **kwargs)
+    if operation.op == "scale":
+        return apps_v1.patch_namespaced_deployment_scale(
+            operation.name, operation.namespace, {"spec": {"replicas": operation.replicas}}, **kwargs
+        )
+    return delete(operation.name, operation.namespace, **kwargs)
+
+
+def _error_detail(e: ApiException) -> str:
+    try:
+        return json.loads(e.body).get("message") or e.reason
+    except (TypeError, ValueError, AttributeError):
+        return e.reason
+
+
+async def _run_one(index: int, operation: BulkOperation, dry_run: bool, slots: asyncio.Semaphore) -> dict:
+    result = {
+        "index": index,
+        "op": operation.op,
+        "kind": operation.kind,
+        "namespace": operation.namespace,
+        "name": operation.name,
+        "dry_run": dry_run,
+    }
+    async with slots:
+        try:
+            obj = await run_k8s(_execute, operation, dry_run)
+        except ApiException as e:
+            return {**result, "status": "error", "code": e.status, "detail": _error_detail(e)}
+        except HTTPException as e:
+            return {**result, "status": "error", "code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            # Client-side failures (bad manifest, connection errors) are reported per item too
+            return {**result, "status": "error", "code": None, "detail": str(e)}
+    if isinstance(obj, dict):
+        # patch_deployment result: reports whether the write was skipped as a no-op
+        return {**result, "status": "ok", "written": obj["written"]}
+    metadata = getattr(obj, "metadata", None)
+    return {
+        **result,
+        "status": "ok",
+        "resource_version": getattr(metadata, "resource_version", None),
+    }
+
+
+def validate_batch(batch: BulkRequest):
+    if len(batch.operations) > BULK_MAX_OPERATIONS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_OPERATIONS} operations per batch")
+
+
+async def run_batch(batch: BulkRequest) -> AsyncIterator[str]:
+    """Execute ``batch`` and yield one NDJSON result per operation as it completes, then a summary."""
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(batch.concurrency or BULK_CONCURRENCY)
+    results: asyncio.Queue = asyncio.Queue()
+
+    groups: Dict[tuple, List[int]] = {}
+    for index, operation in enumerate(batch.operations):
+        if batch.ordering == "namespace":
+            key = (operation.namespace,)
+        else:
+            key = (operation.kind, operation.namespace, operation.name)
+        groups.setdefault(key, []).append(index)
+
+    async def run_group(indexes: List[int]):
+        for index in indexes:
+            await results.put(await _run_one(index, batch.operations[index], batch.dry_run, slots))
+
+    tasks = [asyncio.create_task(run_group(indexes)) for indexes in groups.values()]
+    succeeded = failed = 0
+    try:
+        for _ in batch.operations:
+            result = await results.get()
+            if result["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps(result) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield json.dumps({
+        "summary": {
+            "total": len(batch.operations),
+            "succeeded": succeeded,
+            "failed": failed,
+            "dry_run": batch.dry_run,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    }) + "\n"
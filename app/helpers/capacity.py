@@ -0,0 +1,155 @@
+# === capacity.py ===
+# Cluster-wide capacity report. Lists are fetched concurrently as raw JSON
+# (skipping the kubernetes model deserialization, which dominates CPU on large
+# clusters) and every quantity string goes through the memoized parser, so
+# 50k pods with a handful of distinct request values cost a few dict lookups
+# each. Everything is aggregated in a single pass per list.
+from collections import defaultdict
+from kubernetes.client import CoreV1Api
+from typing import Dict, List, Tuple
+from app.configs.kube_client import get_api_client, instrumented
+from app.helpers.kube_async import run_k8s
+from app.helpers.quantity import parse_quantity
+import asyncio
+import json
+import time
+
+core_v1 = instrumented(CoreV1Api(get_api_client()))
+
+RESOURCES = ("cpu", "memory")
+# Finished pods no longer hold their requests on a node
+ACTIVE_PODS = "status.phase!=Succeeded,status.phase!=Failed"
+
+
+async def _items(list_call, **kwargs) -> List[dict]:
+    response = await run_k8s(list_call, _preload_content=False, **kwargs)
+    return json.loads(response.data)["items"]
+
+
+def _sum_into(totals: Dict[str, float], resources: dict):
+    for name in RESOURCES:
+        value = parse_quantity(resources.get(name)) if resources else None
+        if value:
+            totals[name] += value
+
+
+def _pod_resources(spec: dict) -> Tuple[Dict[str, float], Dict[str, float], int]:
+    """Effective requests and limits of a pod, as the scheduler counts them.
+
+    Init containers run one at a time before the app containers, so each
+    resource is the larger of the sum over containers and the largest init
+    container, plus the pod overhead. Also returns how many containers set no
+    requests at all.
+    """
+    effective = []
+    unbounded = 0
+    for kind in ("requests", "limits"):
+        total = defaultdict(float)
+        for container in spec.get("containers", []):
+            resources = (container.get("resources") or {}).get(kind)
+            if kind == "requests" and not resources:
+                unbounded += 1
+            _sum_into(total, resources)
+        for container in spec.get("initContainers") or []:
+            init = defaultdict(float)
+            _sum_into(init, (container.get("resources") or {}).get(kind))
+            for name, value in init.items():
+                total[name] = max(total[name], value)
+        _sum_into(total, spec.get("overhead"))
+        effective.append(total)
+    return effective[0], effective[1], unbounded
+
+
+def _ratio(numerator: float, denominator: float):
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def _format(totals: Dict[str, float]) -> Dict[str, float]:
+    return {name: round(totals.get(name, 0.0), 3) for name in RESOURCES}
+
+
+async def capacity_report(top: int = 10) -> dict:
+    started = time.perf_counter()
+    nodes, pods, quotas, limit_ranges = await asyncio.gather(
+        _items(core_v1.list_node),
+        _items(core_v1.list_pod_for_all_namespaces, field_selector=ACTIVE_PODS),
+        _items(core_v1.list_resource_quota_for_all_namespaces),
+        _items(core_v1.list_limit_range_for_all_namespaces),
+    )
+    fetched = time.perf_counter()
+
+    allocatable = defaultdict(float)
+    schedulable_nodes = 0
+    for node in nodes:
+        if node.get("spec", {}).get("unschedulable"):
+            continue
+        schedulable_nodes += 1
+        _sum_into(allocatable, node.get("status", {}).get("allocatable"))
+
+    namespaces: Dict[str, dict] = defaultdict(lambda: {
+        "pods": 0,
+        "requests": defaultdict(float),
+        "limits": defaultdict(float),
+        "containers_without_requests": 0,
+    })
+    requested = defaultdict(float)
+    limited = defaultdict(float)
+    for pod in pods:
+        entry = namespaces[pod["metadata"]["namespace"]]
+        requests, limits, unbounded = _pod_resources(pod.get("spec", {}))
+        entry["pods"] += 1
+        entry["containers_without_requests"] += unbounded
+        for name in RESOURCES:
+            entry["requests"][name] += requests[name]
+            entry["limits"][name] += limits[name]
+            requested[name] += requests[name]
+            limited[name] += limits[name]
+
+    quota_pressure: Dict[str, float] = {}
+    for quota in quotas:
+        namespace = quota["metadata"]["namespace"]
+        status = quota.get("status", {})
+        used = status.get("used") or {}
+        for resource, hard in (status.get("hard") or {}).items():
+            ratio = _ratio(parse_quantity(used.get(resource, "0")) or 0.0, parse_quantity(hard) or 0.0)
+            if ratio is not None and ratio > quota_pressure.get(namespace, -1):
+                quota_pressure[namespace] = ratio
+    with_limit_range = {limit_range["metadata"]["namespace"] for limit_range in limit_ranges}
+
+    report = {}
+    for namespace, entry in namespaces.items():
+        report[namespace] = {
+            "pods": entry["pods"],
+            "requests": _format(entry["requests"]),
+            "limits": _format(entry["limits"]),
+            "share_of_allocatable": {name: _ratio(entry["requests"][name], allocatable[name]) for name in RESOURCES},
+            "max_quota_ratio": quota_pressure.get(namespace),
+            "has_limit_range": namespace in with_limit_range,
+            "containers_without_requests": entry["containers_without_requests"],
+        }
+
+    def top_by(key) -> List[dict]:
+        ranked = sorted(report.items(), key=lambda item: key(item[1]) or 0, reverse=True)
+        return [{"namespace": namespace, "value": key(entry)} for namespace, entry in ranked[:top] if key(entry)]
+
+    return {
+        "cluster": {
+            "nodes": schedulable_nodes,
+            "pods": len(pods),
+            "allocatable": _format(allocatable),
+            "requests": _format(requested),
+            "limits": _format(limited),
+            "utilization": {name: _ratio(requested[name], allocatable[name]) for name in RESOURCES},
+            "overcommit": {name: _ratio(limited[name], allocatable[name]) for name in RESOURCES},
+        },
+        "top_namespaces": {
+            "cpu_requests": top_by(lambda entry: entry["requests"]["cpu"]),
+            "memory_requests": top_by(lambda entry: entry["requests"]["memory"]),
+            "quota_pressure": top_by(lambda entry: entry["max_quota_ratio"]),
+        },
+        "namespaces": report,
+        "timing_ms": {
+            "fetch": round((fetched - started) * 1000, 1),
+            "compute": round((time.perf_counter() - fetched) * 1000, 1),
+        },
+    }
@@ -2,28 +2,39 @@ from kubernetes import client
 from kubernetes.client.rest import ApiException
 from fastapi import HTTPException
 import logging
-import yaml
 import textwrap
+from app.helpers.kube_async import run_k8s
+from app.configs.kube_client import get_api_client, instrumented
+from app.helpers.informer import list_objects, cached_object
+from app.helpers.projection import select_fields, project, project_object
+from app.helpers.write_dedup import (WRITE_DEDUP, configmap_unchanged, content_hash, forget_write, last_write,
+                                     record_write, remember_write)
+from typing import Dict, Optional
 
+core_v1 = instrumented(client.CoreV1Api(get_api_client()))
 
-async def create_config_map_from_text(namespace: str, name: str, content: str, filename: str):
+
+async def create_config_map_from_data(namespace: str, name: str, data: Dict[str, str],
+                                      binary_data: Optional[Dict[str, str]] = None):
     try:
         config_map = client.V1ConfigMap(
             api_version="v1",
             kind="ConfigMap",
             metadata=client.V1ObjectMeta(name=name, namespace=namespace),
-            data={filename: content}
+            data=data or None,
+            binary_data=binary_data or None,
         )
 
-        api_instance = client.CoreV1Api()
-        api_instance.create_namespaced_config_map(namespace=namespace, body=config_map)
+        await run_k8s(core_v1.create_namespaced_config_map, namespace=namespace, body=config_map)
+        forget_write("configmap", namespace, name)
 
         logging.info(f"ConfigMap '{name}' created in namespace '{namespace}'")
 
         return {
             "name": name,
             "namespace": namespace,
-            "data": {filename: content},
+            "data": data,
+            "binary_keys": sorted(binary_data or {}),
             "message": f"ConfigMap '{name}' created successfully."
         }
 
@@ -37,70 +48,100 @@ async def create_config_map_from_text(namespace: str, name: str, content: str, f
 
 
 # Fungsi pembungkus yang dipanggil dari endpoint
-async def create_config_map(namespace: str, name: str, filename: str, file_data: str):
-    return await create_config_map_from_text(namespace, name, file_data, filename)
-
-
-async def list_config_maps(namespace: str):
+async def create_config_map(namespace: str, name: str, data: Dict[str, str],
+                            binary_data: Optional[Dict[str, str]] = None):
+    return await create_config_map_from_data(namespace, name, data, binary_data)
+
+
+CONFIGMAP_FIELDS = {
+    "name": lambda cm: cm.metadata.name,
+    "namespace": lambda cm: cm.metadata.namespace,
+    "data": lambda cm: cm.data or {},
+    "labels": lambda cm: cm.metadata.labels,
+    "annotations": lambda cm: cm.metadata.annotations,
+    "creation_timestamp": lambda cm: cm.metadata.creation_timestamp,
+}
+CONFIGMAP_DEFAULT_FIELDS = ["name", "namespace", "data"]
+
+# Detail view flattens multi-line values the way this endpoint always has
+CONFIGMAP_DETAIL_FIELDS = {
+    **CONFIGMAP_FIELDS,
+    "data": lambda cm: {
+        k: ''.join(line.strip() for line in v.split('\n'))
+        for k, v in (cm.data or {}).items()
+    },
+}
+
+
+async def list_config_maps(namespace: str, fields: Optional[str] = None):
+    selected = select_fields(fields, CONFIGMAP_FIELDS) or CONFIGMAP_DEFAULT_FIELDS
     try:
-        api_instance = client.CoreV1Api()
-        configmaps = api_instance.list_namespaced_config_map(namespace=namespace)
-
-        return [
-            {
-                "name": item.metadata.name,
-                "namespace": item.metadata.namespace,
-                "data": item.data or {},
-            }
-            for item in configmaps.items
-        ]
+        configmaps = await run_k8s(list_objects, "configmaps", namespace)
+        return configmaps.map(lambda item: project(item, CONFIGMAP_FIELDS, selected))
     except ApiException as e:
         raise HTTPException(status_code=e.status, detail=e.body)
 
 
 # Mendapatkan detail ConfigMap berdasarkan nama
-async def get_config_map(namespace: str, name: str, as_yaml: bool = False):
+async def get_config_map(namespace: str, name: str, fields: Optional[str] = None):
+    selected = select_fields(fields, CONFIGMAP_DETAIL_FIELDS) or CONFIGMAP_DEFAULT_FIELDS
     try:
-        api_instance = client.CoreV1Api()
-        configmap = api_instance.read_namespaced_config_map(name=name, namespace=namespace)
-
-        result = {
-            "name": configmap.metadata.name,
-            "namespace": namespace,
-            "data": {
-                k: ''.join(line.strip() for line in v.split('\n'))
-                for k, v in (configmap.data or {}).items()
-            }
-        }
-
-        if as_yaml:
-            return yaml.dump(result, sort_keys=False, default_flow_style=False)
-        return result
+        configmap = await run_k8s(core_v1.read_namespaced_config_map, name=name, namespace=namespace)
+        return project_object(configmap, CONFIGMAP_DETAIL_FIELDS, selected)
 
     except ApiException as e:
         raise HTTPException(status_code=e.status, detail=e.body)
 
 # Update ConfigMap (replace existing data)
-async def update_config_map(namespace: str, name: str, filename: str, new_content: str):
+async def update_config_map(namespace: str, name: str, data: Dict[str, str],
+                            binary_data: Optional[Dict[str, str]] = None,
+                            resource_version: Optional[str] = None):
     try:
-        api_instance = client.CoreV1Api()
-
-        # Dapatkan ConfigMap lama (untuk verifikasi exist)
-        existing = api_instance.read_namespaced_config_map(name=name, namespace=namespace)
-
-        # Perbarui isinya (bisa ditimpa hanya 1 key, atau semua)
-        if not existing.data:
-            existing.data = {}
-
-        existing.data[filename] = new_content
-
-        # Kirim pembaruan
-        updated = api_instance.patch_namespaced_config_map(name=name, namespace=namespace, body=existing)
+        # Satu merge patch: hanya key yang diubah yang dikirim, tanpa membangun ulang seluruh ConfigMap.
+        # Patch ke ConfigMap yang tidak ada menghasilkan 404, resource_version yang usang 409.
+        # Key yang pindah antara data dan binaryData dihapus dari sisi lainnya (null).
+        binary_data = binary_data or {}
+        body = {
+            "data": {**{key: None for key in binary_data}, **data},
+            "binaryData": {**{key: None for key in data}, **binary_data},
+        }
+        digest = content_hash(body)
+        if WRITE_DEDUP:
+            # Konten sama persis: lewati write agar resourceVersion tidak berubah dan watcher tidak dibangunkan.
+            # Diputuskan tanpa membaca ke server: dari cache informer, atau dari write identik terakhir proses ini.
+            current = cached_object("configmaps", namespace, name)
+            skipped = last_write("configmap", namespace, name, digest, current, resource_version)
+            if skipped is None and current is not None \
+                    and (not resource_version or resource_version == current.metadata.resource_version) \
+                    and configmap_unchanged(current, data, binary_data):
+                skipped = {"name": name, "namespace": namespace, "data": current.data or {},
+                           "binary_keys": sorted(current.binary_data or {})}
+            if skipped is not None:
+                record_write("configmap", written=False)
+                return {
+                    "data": data,
+                    **skipped,
+                    "written": False,
+                    "message": f"ConfigMap '{name}' unchanged, nothing written."
+                }
+
+        if resource_version:
+            body["metadata"] = {"resourceVersion": resource_version}
+
+        updated = await run_k8s(core_v1.patch_namespaced_config_map, name=name, namespace=namespace, body=body,
+                                _content_type="application/merge-patch+json")
+        record_write("configmap", written=True)
+        if WRITE_DEDUP:
+            # Isi data tidak disimpan (bisa sampai 1 MiB): respons skip berikutnya memakai data dari request
+            remember_write("configmap", namespace, name, digest, updated.metadata.resource_version,
+                           {"name": name, "namespace": namespace, "binary_keys": sorted(updated.binary_data or {})})
 
         return {
             "name": updated.metadata.name,
             "namespace": namespace,
-            "data": updated.data,
+            "data": updated.data or {},
+            "binary_keys": sorted(updated.binary_data or {}),
+            "written": True,
             "message": f"ConfigMap '{name}' updated successfully."
         }
 
@@ -110,8 +151,8 @@ async def update_config_map(namespace: str, name: str, filename: str, new_conten
 # Delete ConfigMap
 async def delete_config_map(namespace: str, name: str):
     try:
-        api_instance = client.CoreV1Api()
-        api_instance.delete_namespaced_config_map(name=name, namespace=namespace)
+        await run_k8s(core_v1.delete_namespaced_config_map, name=name, namespace=namespace)
+        forget_write("configmap", namespace, name)
 
         return {"message": f"ConfigMap '{name}' deleted from namespace '{namespace}'."}
 
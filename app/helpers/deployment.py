@@ -1,15 +1,23 @@
 # === kube_helper.py ===
 from kubernetes import client, config, watch
 from kubernetes.client import CoreV1Api, AppsV1Api, BatchV1Api
+from app.configs.kube_client import get_api_client, instrumented
 from fastapi import HTTPException
 from datetime import datetime
 from typing import Optional, List
+from app.helpers.informer import list_objects, cached_object
+from app.helpers.projection import select_fields, project, project_object
+from app.helpers.write_dedup import (WRITE_DEDUP, content_hash, deployment_unchanged, forget_write, last_write,
+                                     record_write, remember_write)
 
 
 
-core_v1 = CoreV1Api()
-apps_v1 = AppsV1Api()
-batch_v1 = BatchV1Api()
+core_v1 = instrumented(CoreV1Api(get_api_client()))
+apps_v1 = instrumented(AppsV1Api(get_api_client()))
+batch_v1 = instrumented(BatchV1Api(get_api_client()))
+
+# Set explicitly: the client otherwise decides the patch type from the body
+STRATEGIC_MERGE_PATCH = "application/strategic-merge-patch+json"
 
 def handle_k8s_exception(func):
     def wrapper(*args, **kwargs):
@@ -21,41 +29,52 @@ def handle_k8s_exception(func):
 
 
 # === DEPLOYMENT OPERATIONS ===
+DEPLOYMENT_FIELDS = {
+    "name": lambda d: d.metadata.name,
+    "replicas": lambda d: d.status.replicas or 0,
+    "available": lambda d: d.status.available_replicas or 0,
+    "updated": lambda d: d.status.updated_replicas or 0,
+    "unavailable": lambda d: d.status.unavailable_replicas or 0,
+    "labels": lambda d: d.metadata.labels,
+    "annotations": lambda d: d.metadata.annotations,
+    "creation_timestamp": lambda d: d.metadata.creation_timestamp.isoformat() if d.metadata.creation_timestamp else None,
+    "namespace": lambda d: d.metadata.namespace,
+    "uid": lambda d: d.metadata.uid,
+    "image": lambda d: d.spec.template.spec.containers[0].image if d.spec.template.spec.containers else None,
+}
+
 @handle_k8s_exception
-def list_deployments(namespace: str):
-    deployments = apps_v1.list_namespaced_deployment(namespace)
-    return [
-        {
-            "name": d.metadata.name,
-            "replicas": d.status.replicas or 0,
-            "available": d.status.available_replicas or 0,
-            "updated": d.status.updated_replicas or 0,
-            "unavailable": d.status.unavailable_replicas or 0,
-            "labels": d.metadata.labels,
-            "annotations": d.metadata.annotations,
-            "creation_timestamp": d.metadata.creation_timestamp.isoformat() if d.metadata.creation_timestamp else None,
-            "namespace": d.metadata.namespace,
-            "uid": d.metadata.uid,
-            "image": d.spec.template.spec.containers[0].image if d.spec.template.spec.containers else None  # Menambahkan image
-        } for d in deployments.items
-    ]
+def list_deployments(
+    namespace: Optional[str],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    selected = select_fields(fields, DEPLOYMENT_FIELDS)
+    deployments = list_objects("deployments", namespace, limit=limit, cursor=cursor)
+    return deployments.map(lambda d: project(d, DEPLOYMENT_FIELDS, selected))
 
 # Get a specific deployment
 @handle_k8s_exception
-def get_deployment(name: str, namespace: str):
-    deployment = apps_v1.read_namespaced_deployment(name, namespace)
-    return {
-        "name": deployment.metadata.name,
-        "replicas": deployment.status.replicas or 0,
-        "available": deployment.status.available_replicas or 0,
-        "updated": deployment.status.updated_replicas or 0,
-        "unavailable": deployment.status.unavailable_replicas or 0,
-        "labels": deployment.metadata.labels,
-        "annotations": deployment.metadata.annotations,
-        "creation_timestamp": deployment.metadata.creation_timestamp,
-        "namespace": deployment.metadata.namespace,
-        "uid": deployment.metadata.uid
-    }
+def get_deployment(name: str, namespace: str, fields: Optional[str] = None):
+    selected = select_fields(fields, DEPLOYMENT_FIELDS)
+    return project_object(apps_v1.read_namespaced_deployment(name, namespace), DEPLOYMENT_FIELDS, selected)
+
+@handle_k8s_exception
+def get_deployment_selector(name: str, namespace: str) -> str:
+    """Label selector string matching the pods of a deployment."""
+    selector = apps_v1.read_namespaced_deployment(name, namespace).spec.selector
+    terms = [f"{key}={value}" for key, value in (selector.match_labels or {}).items()]
+    for expr in selector.match_expressions or []:
+        if expr.operator == "In":
+            terms.append(f"{expr.key} in ({','.join(expr.values)})")
+        elif expr.operator == "NotIn":
+            terms.append(f"{expr.key} notin ({','.join(expr.values)})")
+        elif expr.operator == "Exists":
+            terms.append(expr.key)
+        elif expr.operator == "DoesNotExist":
+            terms.append(f"!{expr.key}")
+    return ",".join(terms)
 
 @handle_k8s_exception
 def create_deployment(deploy_data):
@@ -126,33 +145,19 @@ def create_deployment(deploy_data):
 
 
 @handle_k8s_exception
-def remove_deployment_labels(name: str, namespace: str, labels_to_remove: List[str]):
-    deployment = apps_v1.read_namespaced_deployment(name, namespace)
-    
-    patch_ops = []
-
-    # Hapus label dari metadata.labels
-    for label in labels_to_remove:
-        if deployment.metadata.labels and label in deployment.metadata.labels:
-            patch_ops.append({
-                "op": "remove",
-                "path": f"/metadata/labels/{label}"
-            })
-
-    # Hapus label dari template.metadata.labels
-    for label in labels_to_remove:
-        if deployment.spec.template.metadata.labels and label in deployment.spec.template.metadata.labels:
-            patch_ops.append({
-                "op": "remove",
-                "path": f"/spec/template/metadata/labels/{label}"
-            })
-
-    if not patch_ops:
-        return {"status": "No labels to remove"}
-
-    results = apps_v1.patch_namespaced_deployment(
-        name, namespace, patch_ops
-    )
+def remove_deployment_labels(name: str, namespace: str, labels_to_remove: List[str], resource_version: Optional[str] = None):
+    # A null value deletes the key in a strategic merge patch, and absent keys are ignored,
+    # so the labels can be removed without reading the deployment first
+    removed = {label: None for label in labels_to_remove}
+    patch_payload = {
+        "metadata": {"labels": removed},
+        "spec": {"template": {"metadata": {"labels": removed}}},
+    }
+    if resource_version:
+        patch_payload["metadata"]["resourceVersion"] = resource_version
+
+    results = apps_v1.patch_namespaced_deployment(name, namespace, patch_payload, _content_type=STRATEGIC_MERGE_PATCH)
+    forget_write("deployment", namespace, name)
 
     return {
         "status": "Success",
@@ -167,60 +172,84 @@ def remove_deployment_labels(name: str, namespace: str, labels_to_remove: List[s
 @handle_k8s_exception
 def delete_deployment(name: str, namespace: str):
     result = apps_v1.delete_namespaced_deployment(name=name, namespace=namespace)
+    forget_write("deployment", namespace, name)
     return {
         "status": result.status,
         "message": "Deployment deleted",
     }
 
-@handle_k8s_exception
-def patch_deployment(name: str, namespace: str, update_data: dict, labels_to_remove: List[str] = None):
-    deployment = apps_v1.read_namespaced_deployment(name, namespace)
-
-    # Update existing labels
-    metadata_labels = deployment.metadata.labels or {}
-    template_labels = deployment.spec.template.metadata.labels or {}
-
-    if update_data.get("labels"):
-        metadata_labels.update(update_data["labels"])
-        template_labels.update(update_data["labels"])
-
-    # Hapus labels jika diminta
-    if labels_to_remove:
-        for key in labels_to_remove:
-            metadata_labels.pop(key, None)
-            template_labels.pop(key, None)
-
-    # Buat patch payload dengan labels yang telah diubah
-    patch_payload = {
-        "spec": {
-            "replicas": update_data.get("replicas", deployment.spec.replicas),
-            "template": {
-                "metadata": {
-                    "labels": template_labels
-                },
-                "spec": {
-                    "containers": [
-                        {
-                            "name": deployment.spec.template.spec.containers[0].name,
-                            "image": update_data.get("image", deployment.spec.template.spec.containers[0].image)
-                        }
-                    ]
-                }
-            }
-        },
-        "metadata": {
-            "labels": metadata_labels
-        }
-    }
-
-    result = apps_v1.patch_namespaced_deployment(name, namespace, patch_payload)
+def _deployment_result(deployment, written: bool) -> dict:
     return {
         "status": "Success",
-        "labels": result.metadata.labels,
-        "template_labels": result.spec.template.metadata.labels,
-        "name": result.metadata.name,
-        "namespace": result.metadata.namespace,
-        "replicas": result.spec.replicas,
-        "image": result.spec.template.spec.containers[0].image
+        "written": written,
+        "labels": deployment.metadata.labels,
+        "template_labels": deployment.spec.template.metadata.labels,
+        "name": deployment.metadata.name,
+        "namespace": deployment.metadata.namespace,
+        "replicas": deployment.spec.replicas,
+        "image": deployment.spec.template.spec.containers[0].image
     }
 
+@handle_k8s_exception
+def patch_deployment(name: str, namespace: str, update_data: dict, labels_to_remove: List[str] = None,
+                     dry_run: bool = False):
+    """Update replicas, image and labels with one strategic merge patch.
+
+    Only the given values are sent, without reading the deployment first. The
+    deployment is only read for an image change without ``container``, to find
+    the first container's name, and then from the informer cache when it has
+    it. No-op writes are skipped (``WRITE_DEDUP``) when the cache or the last
+    identical write shows nothing would change. ``resource_version`` makes the
+    patch conditional: a newer object on the server returns 409. ``dry_run``
+    sends the patch with ``dryRun=All``.
+    """
+    container = update_data.get("container")
+    current = cached_object("deployments", namespace, name) if WRITE_DEDUP or update_data.get("image") else None
+    if update_data.get("image") and not container:
+        if current is None:
+            current = apps_v1.read_namespaced_deployment(name, namespace)
+        container = current.spec.template.spec.containers[0].name
+
+    labels = dict(update_data.get("labels") or {})
+    for key in labels_to_remove or []:
+        labels[key] = None
+
+    metadata = {}
+    template = {}
+    spec = {}
+    if labels:
+        metadata["labels"] = labels
+        template["metadata"] = {"labels": labels}
+    if update_data.get("replicas") is not None:
+        spec["replicas"] = update_data["replicas"]
+    if update_data.get("image"):
+        template["spec"] = {"containers": [{"name": container, "image": update_data["image"]}]}
+    if template:
+        spec["template"] = template
+
+    digest = content_hash({"metadata": metadata, "spec": spec})
+    expected_version = update_data.get("resource_version")
+    if WRITE_DEDUP:
+        skipped = last_write("deployment", namespace, name, digest, current, expected_version)
+        if skipped is None and current is not None \
+                and (not expected_version or expected_version == current.metadata.resource_version) \
+                and deployment_unchanged(current, update_data, labels_to_remove, container):
+            skipped = _deployment_result(current, written=False)
+        if skipped is not None:
+            if not dry_run:
+                record_write("deployment", written=False)
+            return {**skipped, "written": False}
+
+    if expected_version:
+        metadata["resourceVersion"] = expected_version
+    patch_payload = {"metadata": metadata, "spec": spec}
+    kwargs = {"dry_run": "All"} if dry_run else {}
+    result = apps_v1.patch_namespaced_deployment(name, namespace, patch_payload, _content_type=STRATEGIC_MERGE_PATCH,
+                                                 **kwargs)
+    if not dry_run:
+        record_write("deployment", written=True)
+        if WRITE_DEDUP:
+            remember_write("deployment", namespace, name, digest, result.metadata.resource_version,
+                           _deployment_result(result, written=True))
+    return _deployment_result(result, written=True)
+
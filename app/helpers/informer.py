@@ -0,0 +1,266 @@
+# === informer.py ===
+# Optional watch-driven cache for list endpoints. Each enabled resource is
+# LISTed once cluster-wide and then kept up to date through a watch, so list
+# helpers can be served from memory instead of hitting the API server.
+from kubernetes import client, watch
+from kubernetes.client import CoreV1Api, AppsV1Api, BatchV1Api
+from app.configs.kube_client import get_api_client, instrumented, stream_timeout, K8S_REQUEST_TIMEOUT
+from fastapi import HTTPException
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+core_v1 = instrumented(CoreV1Api(get_api_client()))
+apps_v1 = instrumented(AppsV1Api(get_api_client()))
+batch_v1 = instrumented(BatchV1Api(get_api_client()))
+
+# Comma separated list of resources to cache, e.g. "services,deployments"
+INFORMER_RESOURCES = [r.strip() for r in os.getenv("INFORMER_RESOURCES", "").split(",") if r.strip()]
+# Server side watch timeout; the watch is re-opened from the last resourceVersion
+INFORMER_WATCH_TIMEOUT = int(os.getenv("INFORMER_WATCH_TIMEOUT", "60"))
+# Cached data older than this is not served, list helpers fall back to the API
+INFORMER_MAX_STALENESS = float(os.getenv("INFORMER_MAX_STALENESS", "180"))
+INFORMER_RETRY_SECONDS = float(os.getenv("INFORMER_RETRY_SECONDS", "5"))
+
+# resource -> (namespaced list call, cluster-wide list call)
+RESOURCES = {
+    "pods": (core_v1.list_namespaced_pod, core_v1.list_pod_for_all_namespaces),
+    "services": (core_v1.list_namespaced_service, core_v1.list_service_for_all_namespaces),
+    "configmaps": (core_v1.list_namespaced_config_map, core_v1.list_config_map_for_all_namespaces),
+    "secrets": (core_v1.list_namespaced_secret, core_v1.list_secret_for_all_namespaces),
+    "pvcs": (core_v1.list_namespaced_persistent_volume_claim,
+             core_v1.list_persistent_volume_claim_for_all_namespaces),
+    "deployments": (apps_v1.list_namespaced_deployment, apps_v1.list_deployment_for_all_namespaces),
+    "statefulsets": (apps_v1.list_namespaced_stateful_set, apps_v1.list_stateful_set_for_all_namespaces),
+    "daemonsets": (apps_v1.list_namespaced_daemon_set, apps_v1.list_daemon_set_for_all_namespaces),
+    "jobs": (batch_v1.list_namespaced_job, batch_v1.list_job_for_all_namespaces),
+}
+
+
+class Informer:
+    def __init__(self, resource: str, list_all):
+        self.resource = resource
+        self._list_all = list_all
+        self._lock = threading.Lock()
+        self._store: Dict[str, Dict[str, object]] = {}  # namespace -> name -> object
+        self._resource_version: Optional[str] = None
+        self._last_sync: Optional[float] = None
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._watch: Optional[watch.Watch] = None
+        self._thread: Optional[threading.Thread] = None
+        self.relists = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"informer-{self.resource}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watch:
+            self._watch.stop()
+
+    @property
+    def staleness(self) -> Optional[float]:
+        if self._last_sync is None:
+            return None
+        return time.monotonic() - self._last_sync
+
+    def is_fresh(self) -> bool:
+        staleness = self.staleness
+        return self._synced.is_set() and staleness is not None and staleness <= INFORMER_MAX_STALENESS
+
+    def items(self, namespace: Optional[str] = None) -> List[object]:
+        return self.snapshot(namespace)[0]
+
+    def snapshot(self, namespace: Optional[str] = None) -> Tuple[List[object], Optional[str]]:
+        """Cached objects together with the resourceVersion the store is at."""
+        with self._lock:
+            if namespace is None:
+                objs = [obj for objs in self._store.values() for obj in objs.values()]
+            else:
+                objs = list(self._store.get(namespace, {}).values())
+            return objs, self._resource_version
+
+    @property
+    def resource_version(self) -> Optional[str]:
+        with self._lock:
+            return self._resource_version
+
+    def get(self, namespace: str, name: str) -> Optional[object]:
+        with self._lock:
+            return self._store.get(namespace, {}).get(name)
+
+    def status(self) -> dict:
+        with self._lock:
+            count = sum(len(objs) for objs in self._store.values())
+        staleness = self.staleness
+        return {
+            "resource": self.resource,
+            "synced": self._synced.is_set(),
+            "fresh": self.is_fresh(),
+            "objects": count,
+            "resource_version": self._resource_version,
+            "staleness_seconds": round(staleness, 3) if staleness is not None else None,
+            "relists": self.relists,
+        }
+
+    def _touch(self):
+        self._last_sync = time.monotonic()
+
+    def _relist(self):
+        result = self._list_all()
+        store: Dict[str, Dict[str, object]] = {}
+        for obj in result.items:
+            store.setdefault(obj.metadata.namespace, {})[obj.metadata.name] = obj
+        with self._lock:
+            self._store = store
+            self._resource_version = result.metadata.resource_version
+        self.relists += 1
+        self._touch()
+        self._synced.set()
+
+    def _apply(self, event: dict):
+        event_type = event["type"]
+        obj = event["object"]
+        if event_type in ("ADDED", "MODIFIED"):
+            with self._lock:
+                self._store.setdefault(obj.metadata.namespace, {})[obj.metadata.name] = obj
+        elif event_type == "DELETED":
+            with self._lock:
+                self._store.get(obj.metadata.namespace, {}).pop(obj.metadata.name, None)
+
+    def _watch_once(self):
+        self._watch = watch.Watch()
+        for event in self._watch.stream(
+            self._list_all,
+            resource_version=self._resource_version,
+            timeout_seconds=INFORMER_WATCH_TIMEOUT,
+            allow_watch_bookmarks=True,
+            _request_timeout=stream_timeout(INFORMER_WATCH_TIMEOUT + K8S_REQUEST_TIMEOUT),
+        ):
+            if self._stop.is_set():
+                break
+            self._apply(event)
+            # Set after the object is stored, so a resourceVersion never runs ahead of the data
+            if self._watch.resource_version:
+                self._resource_version = self._watch.resource_version
+            self._touch()
+        # Server closed the watch after timeout_seconds, resume from the same resourceVersion
+        self._touch()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._resource_version is None:
+                    self._relist()
+                self._watch_once()
+            except client.exceptions.ApiException as e:
+                if e.status == 410:
+                    # resourceVersion too old, start again from a fresh LIST
+                    logging.info(f"Informer '{self.resource}' watch expired, relisting")
+                    self._resource_version = None
+                    continue
+                logging.warning(f"Informer '{self.resource}' API error: {e.status} {e.reason}")
+                self._stop.wait(INFORMER_RETRY_SECONDS)
+            except Exception as e:
+                logging.warning(f"Informer '{self.resource}' error: {e}")
+                self._stop.wait(INFORMER_RETRY_SECONDS)
+
+
+_informers: Dict[str, Informer] = {}
+
+
+def start_informers():
+    for resource in INFORMER_RESOURCES:
+        if resource not in RESOURCES:
+            logging.warning(f"Unknown informer resource '{resource}', skipping")
+            continue
+        if resource in _informers:
+            continue
+        informer = Informer(resource, RESOURCES[resource][1])
+        informer.start()
+        _informers[resource] = informer
+
+
+def stop_informers():
+    for informer in _informers.values():
+        informer.stop()
+    _informers.clear()
+
+
+def informer_status() -> List[dict]:
+    return [informer.status() for informer in _informers.values()]
+
+
+def cached_version(resource: str, namespace: Optional[str] = None, name: Optional[str] = None) -> Optional[str]:
+    """resourceVersion of a cached list (or of one object when ``name`` is given), if fresh.
+
+    Lets conditional requests be answered without calling the API server.
+    """
+    if name is None:
+        informer = _informers.get(resource)
+        return informer.resource_version if informer and informer.is_fresh() else None
+    obj = cached_object(resource, namespace, name)
+    return obj.metadata.resource_version if obj is not None else None
+
+
+def cached_object(resource: str, namespace: str, name: str) -> Optional[object]:
+    """The cached object, if its informer is fresh and has it."""
+    informer = _informers.get(resource)
+    if not informer or not informer.is_fresh():
+        return None
+    return informer.get(namespace, name)
+
+
+class Listing(list):
+    """List of kubernetes objects plus the cursor for the next page and the list resourceVersion."""
+
+    def __init__(self, items=(), continue_token: Optional[str] = None, resource_version: Optional[str] = None):
+        super().__init__(items)
+        self.continue_token = continue_token
+        self.resource_version = resource_version
+
+    def map(self, func: Callable[[object], object]) -> "Listing":
+        return Listing(map(func, self), self.continue_token, self.resource_version)
+
+
+def list_objects(resource: str, namespace: Optional[str], limit: Optional[int] = None, cursor: Optional[str] = None,
+                 request_timeout: Optional[float] = None) -> Listing:
+    """Return kubernetes model objects, from the informer store when it is fresh.
+
+    ``namespace=None`` lists across all namespaces in a single call.
+    ``limit``/``cursor`` map to the API server's ``limit``/``continue`` chunking;
+    paginated requests always go to the API server so cursors stay valid.
+    ``request_timeout`` bounds the API call when the store cannot answer.
+    """
+    paginated = limit is not None or cursor is not None
+    informer = _informers.get(resource)
+    if not paginated and informer and informer.is_fresh():
+        items, resource_version = informer.snapshot(namespace)
+        return Listing(items, resource_version=resource_version)
+
+    list_namespaced, list_all = RESOURCES[resource]
+    kwargs = {}
+    if limit is not None:
+        kwargs["limit"] = limit
+    if cursor:
+        kwargs["_continue"] = cursor
+    if request_timeout is not None:
+        kwargs["_request_timeout"] = request_timeout
+    try:
+        if namespace is None:
+            result = list_all(**kwargs)
+        else:
+            result = list_namespaced(namespace, **kwargs)
+    except client.exceptions.ApiException as e:
+        if e.status == 410 and cursor:
+            raise HTTPException(status_code=410, detail="Cursor expired, restart the listing without a cursor")
+        raise
+    return Listing(
+        result.items,
+        continue_token=result.metadata._continue or None,
+        resource_version=result.metadata.resource_version,
+    )
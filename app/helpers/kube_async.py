@@ -0,0 +1,263 @@
+# === kube_async.py ===
+# The kubernetes client is blocking. Async handlers run its calls on a
+# dedicated thread pool so a slow API server never stalls the event loop.
+# Long-lived streams (log follow, watches) are read with asyncio directly,
+# so an idle stream costs a socket instead of a thread. They use the shared
+# client's configuration (host, credentials, TLS files, proxy) but not its
+# urllib3 pool: a pooled connection would be held by a blocking thread for as
+# long as the stream is open. Streams record the same upstream metrics as the
+# instrumented API objects, timed until the response headers arrive.
+from kubernetes import client
+from kubernetes.client.rest import should_bypass_proxies
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlencode, urlsplit
+from app.configs.kube_client import get_api_client, K8S_CONNECT_TIMEOUT, K8S_STREAM_TIMEOUT
+from app.helpers.metrics import METRICS_ENABLED, UPSTREAM_ERRORS, UPSTREAM_LATENCY
+import asyncio
+import functools
+import os
+import ssl
+import time
+
+K8S_EXECUTOR_WORKERS = int(os.getenv("K8S_EXECUTOR_WORKERS", "32"))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_executor = ThreadPoolExecutor(max_workers=K8S_EXECUTOR_WORKERS, thread_name_prefix="k8s-call")
+# Keyed by the TLS settings and the files' modification times, see _get_ssl_context
+_ssl_contexts: Dict[tuple, ssl.SSLContext] = {}
+
+
+async def run_k8s(func, *args, **kwargs):
+    """Await a blocking kubernetes client call without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=False)
+
+
+def _mtime(path: Optional[str]) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime if path else None
+    except OSError:
+        return None
+
+
+def _get_ssl_context(configuration) -> ssl.SSLContext:
+    """TLS context for the configured CA and client certificate.
+
+    Rebuilt when a file name or a file's modification time changes, so a
+    rotated client certificate is picked up by the next stream.
+    """
+    files = (configuration.ssl_ca_cert, configuration.cert_file, configuration.key_file)
+    key = (*files, *map(_mtime, files), configuration.verify_ssl, configuration.assert_hostname)
+    context = _ssl_contexts.get(key)
+    if context is None:
+        context = ssl.create_default_context(cafile=configuration.ssl_ca_cert)
+        if not configuration.verify_ssl:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        elif configuration.assert_hostname is False:
+            context.check_hostname = False
+        if configuration.cert_file:
+            context.load_cert_chain(configuration.cert_file, configuration.key_file)
+        # Only the current credentials are worth keeping
+        _ssl_contexts.clear()
+        _ssl_contexts[key] = context
+    return context
+
+
+async def _read_head(reader: asyncio.StreamReader, read_timeout: float):
+    """Status line and lower-cased headers of an HTTP response."""
+    status_line = (await _timed_read(reader.readline(), read_timeout)).decode("latin-1").rstrip("\r\n")
+    headers = {}
+    while True:
+        line = await _timed_read(reader.readline(), read_timeout)
+        if line in (b"\r\n", b"\n", b""):
+            return status_line, headers
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+
+async def _open_connection(configuration, url, port: int, secure: bool, chunk_size: int, read_timeout: float):
+    """Connect to the API server, through an HTTP CONNECT tunnel when ``configuration.proxy`` applies.
+
+    Honours ``no_proxy`` and ``proxy_headers`` like the sync client. Only
+    ``http://`` proxies are supported here.
+    """
+    ssl_context = _get_ssl_context(configuration) if secure else None
+    proxy = configuration.proxy
+    if not proxy or should_bypass_proxies(configuration.host, configuration.no_proxy or ""):
+        return await asyncio.open_connection(url.hostname, port, ssl=ssl_context,
+                                             server_hostname=url.hostname if secure else None, limit=chunk_size)
+
+    proxy_url = urlsplit(proxy)
+    if proxy_url.scheme != "http":
+        raise client.exceptions.ApiException(
+            status=502, reason=f"Streamed responses only support http:// proxies, not {proxy_url.scheme}://")
+    reader, writer = await asyncio.open_connection(proxy_url.hostname, proxy_url.port or 80, limit=chunk_size)
+    try:
+        authority = f"{url.hostname}:{port}"
+        headers = {"Host": authority, **(configuration.proxy_headers or {})}
+        request = f"CONNECT {authority} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+        writer.write(request.encode("latin-1"))
+        await writer.drain()
+        status_line, _ = await _read_head(reader, read_timeout)
+        parts = status_line.split(" ", 2)
+        if len(parts) < 2 or parts[1] != "200":
+            raise client.exceptions.ApiException(status=502, reason=f"Proxy refused the tunnel: {status_line!r}")
+        if secure:
+            await writer.start_tls(ssl_context, server_hostname=url.hostname)
+    except BaseException:
+        writer.close()
+        raise
+    return reader, writer
+
+
+def _metric_labels(path: str, query: Optional[dict]):
+    """(verb, resource) of a streamed path: ``/api/v1/namespaces/ns/pods/web/log`` is ("stream", "pods/log")."""
+    segments = path.strip("/").split("/")
+    # Drop api/<version> or apis/<group>/<version>, then the namespace
+    segments = segments[2:] if segments[0] == "api" else segments[3:]
+    if segments[:1] == ["namespaces"] and len(segments) > 2:
+        segments = segments[2:]
+    verb = "watch" if (query or {}).get("watch") else "stream"
+    return verb, "/".join(segments[0::2])
+
+
+def _observe(verb: str, resource: str, started: float, error_status=None):
+    if not METRICS_ENABLED:
+        return
+    UPSTREAM_LATENCY.labels(verb, resource).observe(time.perf_counter() - started)
+    if error_status is not None:
+        UPSTREAM_ERRORS.labels(verb, resource, str(error_status)).inc()
+
+
+def _request_headers(api_client, netloc: str) -> dict:
+    headers = {"Host": netloc, "Accept": "*/*", "Connection": "close", **api_client.default_headers}
+    # Same credentials the sync client sends, refreshed through the configured hook
+    for setting in api_client.configuration.auth_settings().values():
+        if setting["in"] == "header" and setting["value"]:
+            headers[setting["key"]] = setting["value"]
+    return headers
+
+
+async def _timed_read(read, timeout: float):
+    """Await one socket read; a silent half-open connection raises TimeoutError (an OSError)."""
+    async with asyncio.timeout(timeout):
+        return await read
+
+
+async def _iter_body(reader: asyncio.StreamReader, headers: dict, chunk_size: int,
+                     read_timeout: float) -> AsyncIterator[bytes]:
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        while True:
+            size_line = await _timed_read(reader.readline(), read_timeout)
+            if not size_line:
+                return
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                return
+            remaining = size
+            while remaining:
+                data = await _timed_read(reader.read(min(remaining, chunk_size)), read_timeout)
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
+            await _timed_read(reader.readline(), read_timeout)  # CRLF after each chunk
+    elif "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining:
+            data = await _timed_read(reader.read(min(remaining, chunk_size)), read_timeout)
+            if not data:
+                return
+            remaining -= len(data)
+            yield data
+    else:
+        while True:
+            data = await _timed_read(reader.read(chunk_size), read_timeout)
+            if not data:
+                return
+            yield data
+
+
+async def stream_chunks(path: str, query: Optional[dict] = None, chunk_size: int = STREAM_CHUNK_SIZE,
+                        read_timeout: float = K8S_STREAM_TIMEOUT) -> AsyncIterator[bytes]:
+    """GET an API server path and yield the response body as it arrives.
+
+    Non-200 responses raise ``ApiException`` like the sync client does. Every
+    read waits at most ``read_timeout`` seconds, after which ``TimeoutError``
+    (an ``OSError``, so watchers retry) is raised.
+    """
+    api_client = get_api_client()
+    configuration = api_client.configuration
+    url = urlsplit(configuration.host)
+    secure = url.scheme == "https"
+    port = url.port or (443 if secure else 80)
+    params = {k: v for k, v in (query or {}).items() if v is not None}
+    target = url.path.rstrip("/") + path + ("?" + urlencode(params) if params else "")
+
+    verb, resource = _metric_labels(path, query)
+    started = time.perf_counter()
+    writer = None
+    try:
+        try:
+            reader, writer = await asyncio.wait_for(
+                _open_connection(configuration, url, port, secure, chunk_size, read_timeout),
+                timeout=K8S_CONNECT_TIMEOUT,
+            )
+            headers = _request_headers(api_client, url.netloc)
+            request = f"GET {target} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+            writer.write(request.encode("latin-1"))
+            await writer.drain()
+
+            status_line, response_headers = await _read_head(reader, read_timeout)
+            parts = status_line.split(" ", 2)
+            if len(parts) < 2 or not parts[1].isdigit():
+                raise client.exceptions.ApiException(
+                    status=502, reason=f"Malformed response from API server: {status_line!r}")
+            status = int(parts[1])
+        except client.exceptions.ApiException as e:
+            _observe(verb, resource, started, e.status)
+            raise
+        except Exception:
+            _observe(verb, resource, started, "error")
+            raise
+        _observe(verb, resource, started, status if status != 200 else None)
+
+        if status != 200:
+            body = b""
+            async for data in _iter_body(reader, response_headers, chunk_size, read_timeout):
+                body += data
+                if len(body) > chunk_size:
+                    break
+            error = client.exceptions.ApiException(status=status, reason=parts[2] if len(parts) > 2 else "")
+            error.body = body.decode("utf-8", errors="replace")
+            raise error
+
+        async for data in _iter_body(reader, response_headers, chunk_size, read_timeout):
+            yield data
+    finally:
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+async def stream_lines(path: str, query: Optional[dict] = None) -> AsyncIterator[str]:
+    """Like ``stream_chunks`` but yields decoded lines without the trailing newline."""
+    pending = b""
+    async with aclosing(stream_chunks(path, query)) as chunks:
+        async for chunk in chunks:
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line.decode("utf-8", errors="replace")
+    if pending:
+        yield pending.decode("utf-8", errors="replace")
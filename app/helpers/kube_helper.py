@@ -1,18 +1,21 @@
 # === kube_helper.py ===
-from kubernetes import client, config, watch
+from kubernetes import client, config
 from kubernetes.client import CoreV1Api, AppsV1Api, BatchV1Api
+from app.configs.kube_client import get_api_client, instrumented
 from fastapi import HTTPException
 from datetime import datetime
 from typing import Optional, List
+from app.helpers.informer import Listing, list_objects
+from app.helpers.projection import select_fields, project
 
 # try:
 #     config.load_incluster_config()
 # except config.ConfigException as e:
 #     raise RuntimeError("Failed to load in-cluster config: " + str(e))
 
-core_v1 = CoreV1Api()
-apps_v1 = AppsV1Api()
-batch_v1 = BatchV1Api()
+core_v1 = instrumented(CoreV1Api(get_api_client()))
+apps_v1 = instrumented(AppsV1Api(get_api_client()))
+batch_v1 = instrumented(BatchV1Api(get_api_client()))
 
 def handle_k8s_exception(func):
     def wrapper(*args, **kwargs):
@@ -29,44 +32,26 @@ def handle_k8s_exception(func):
 #         config.load_kube_config()
 
 # === POD OPERATIONS ===
-@handle_k8s_exception
-def list_pods(namespace: str):
-    pods = core_v1.list_namespaced_pod(namespace)
-    return [
+POD_FIELDS = {
+    "name": lambda pod: pod.metadata.name,
+    "status": lambda pod: pod.status.phase,
+    "node": lambda pod: pod.spec.node_name,
+    "container_statuses": lambda pod: [
         {
-            "name": pod.metadata.name,
-            "status": pod.status.phase,
-            "node": pod.spec.node_name,
-            "container_statuses": [
-                {
-                    "name": cs.name,
-                    "ready": cs.ready,
-                    "restart_count": cs.restart_count
-                } for cs in pod.status.container_statuses
-            ] if pod.status.container_statuses else [],
-            "labels": pod.metadata.labels,
-            "annotations": pod.metadata.annotations,
-            "creation_timestamp": pod.metadata.creation_timestamp,
-        }
-        for pod in pods.items]
-
-@handle_k8s_exception
-def get_pod_logs(pod_name: str, namespace: str):
-    log = core_v1.read_namespaced_pod_log(pod_name, namespace)
-    return {"pod": pod_name, "log": log.strip().split("\n")}
+            "name": cs.name,
+            "ready": cs.ready,
+            "restart_count": cs.restart_count
+        } for cs in pod.status.container_statuses
+    ] if pod.status.container_statuses else [],
+    "labels": lambda pod: pod.metadata.labels,
+    "annotations": lambda pod: pod.metadata.annotations,
+    "creation_timestamp": lambda pod: pod.metadata.creation_timestamp,
+}
 
 @handle_k8s_exception
-def stream_logs(namespace: str, pod_name: str):
-    w = watch.Watch()
-    for line in w.stream(
-        core_v1.read_namespaced_pod_log,
-        name=pod_name,
-        namespace=namespace,
-        follow=True,
-        tail_lines=50,
-        timestamps=True,
-    ):
-        yield line + "\n"
+def list_pods(namespace: str, fields: Optional[str] = None):
+    selected = select_fields(fields, POD_FIELDS)
+    return list_objects("pods", namespace).map(lambda pod: project(pod, POD_FIELDS, selected))
 
 # === Other Resources ===
 @handle_k8s_exception
@@ -76,75 +61,108 @@ def list_namespaces():
 
 
 # === SERVICES OPERATIONS ===
-@handle_k8s_exception
-def list_services(namespace: str):
-    services = core_v1.list_namespaced_service(namespace)
-    return [
+SERVICE_FIELDS = {
+    "name": lambda s: s.metadata.name,
+    "type": lambda s: s.spec.type,
+    "cluster_ip": lambda s: s.spec.cluster_ip,
+    "ports": lambda s: [
         {
-            "name": s.metadata.name,
-            "type": s.spec.type,
-            "cluster_ip": s.spec.cluster_ip,
-            "ports": [
-                {
-                    "port": p.port,
-                    "protocol": p.protocol,
-                    "target_port": p.target_port
-                } for p in s.spec.ports
-            ],
-            "selector": s.spec.selector,
-            "labels": s.metadata.labels
-        } for s in services.items
-    ]
+            "port": p.port,
+            "protocol": p.protocol,
+            "target_port": p.target_port
+        } for p in s.spec.ports or []
+    ],
+    "selector": lambda s: s.spec.selector,
+    "labels": lambda s: s.metadata.labels,
+    "namespace": lambda s: s.metadata.namespace,
+}
+
+CONFIGMAP_FIELDS = {
+    "name": lambda cm: cm.metadata.name,
+    "data": lambda cm: cm.data,
+    "labels": lambda cm: cm.metadata.labels,
+    "annotations": lambda cm: cm.metadata.annotations,
+    "creation_timestamp": lambda cm: cm.metadata.creation_timestamp,
+    "namespace": lambda cm: cm.metadata.namespace,
+}
+
+SECRET_FIELDS = {
+    "name": lambda s: s.metadata.name,
+    "type": lambda s: s.type,
+    "labels": lambda s: s.metadata.labels,
+    "annotations": lambda s: s.metadata.annotations,
+    "creation_timestamp": lambda s: s.metadata.creation_timestamp,
+    "namespace": lambda s: s.metadata.namespace,
+}
+
+STATEFULSET_FIELDS = {
+    "name": lambda s: s.metadata.name,
+    "replicas": lambda s: s.status.replicas or 0,
+}
+
+JOB_FIELDS = {
+    "name": lambda j: j.metadata.name,
+    "namespace": lambda j: j.metadata.namespace,
+    "succeeded": lambda j: j.status.succeeded or 0,
+}
+
+DAEMONSET_FIELDS = {
+    "name": lambda d: d.metadata.name,
+    "desired": lambda d: d.status.desired_number_scheduled or 0,
+}
+
+PV_FIELDS = {
+    "name": lambda pv: pv.metadata.name,
+    "capacity": lambda pv: pv.spec.capacity.get("storage", "N/A"),
+}
+
+PVC_FIELDS = {
+    "name": lambda pvc: pvc.metadata.name,
+    "namespace": lambda pvc: pvc.metadata.namespace,
+    "status": lambda pvc: pvc.status.phase,
+    "volume": lambda pvc: pvc.spec.volume_name,
+}
 
 @handle_k8s_exception
-def list_configmaps(namespace: str):
-    cms = core_v1.list_namespaced_config_map(namespace)
-    return [
-        {
-            "name": cm.metadata.name,
-            "data": cm.data,
-            "labels": cm.metadata.labels,
-            "annotations": cm.metadata.annotations,
-            "creation_timestamp": cm.metadata.creation_timestamp,
-            "namespace": cm.metadata.namespace
-        } for cm in cms.items
-    ]
+def list_services(namespace: Optional[str], fields: Optional[str] = None):
+    selected = select_fields(fields, SERVICE_FIELDS)
+    return list_objects("services", namespace).map(lambda s: project(s, SERVICE_FIELDS, selected))
 
 @handle_k8s_exception
-def list_secrets(namespace: str):
-    secrets = core_v1.list_namespaced_secret(namespace)
-    return [
-        {
-            "name": s.metadata.name,
-            "type": s.type,
-            "labels": s.metadata.labels,
-            "annotations": s.metadata.annotations,
-            "creation_timestamp": s.metadata.creation_timestamp,
-            "namespace": s.metadata.namespace
-        } for s in secrets.items
-    ]
+def list_configmaps(namespace: Optional[str], fields: Optional[str] = None):
+    selected = select_fields(fields, CONFIGMAP_FIELDS)
+    return list_objects("configmaps", namespace).map(lambda cm: project(cm, CONFIGMAP_FIELDS, selected))
+
+@handle_k8s_exception
+def list_secrets(namespace: Optional[str], fields: Optional[str] = None):
+    selected = select_fields(fields, SECRET_FIELDS)
+    return list_objects("secrets", namespace).map(lambda s: project(s, SECRET_FIELDS, selected))
 
 @handle_k8s_exception
-def list_statefulsets(namespace: str):
-    ssets = apps_v1.list_namespaced_stateful_set(namespace)
-    return [{"name": s.metadata.name, "replicas": s.status.replicas or 0} for s in ssets.items]
+def list_statefulsets(namespace: str, fields: Optional[str] = None):
+    selected = select_fields(fields, STATEFULSET_FIELDS)
+    return list_objects("statefulsets", namespace).map(lambda s: project(s, STATEFULSET_FIELDS, selected))
 
 @handle_k8s_exception
-def list_jobs(namespace: str):
-    jobs = batch_v1.list_namespaced_job(namespace)
-    return [{"name": j.metadata.name, "succeeded": j.status.succeeded or 0} for j in jobs.items]
+def list_jobs(namespace: Optional[str], fields: Optional[str] = None):
+    selected = select_fields(fields, JOB_FIELDS)
+    return list_objects("jobs", namespace).map(lambda j: project(j, JOB_FIELDS, selected))
 
 @handle_k8s_exception
-def list_daemonsets(namespace: str):
-    ds = apps_v1.list_namespaced_daemon_set(namespace)
-    return [{"name": d.metadata.name, "desired": d.status.desired_number_scheduled or 0} for d in ds.items]
+def list_daemonsets(namespace: str, fields: Optional[str] = None):
+    selected = select_fields(fields, DAEMONSET_FIELDS)
+    return list_objects("daemonsets", namespace).map(lambda d: project(d, DAEMONSET_FIELDS, selected))
 
 @handle_k8s_exception
-def list_persistent_volumes():
+def list_persistent_volumes(fields: Optional[str] = None):
+    selected = select_fields(fields, PV_FIELDS)
     pvs = core_v1.list_persistent_volume()
-    return [{"name": pv.metadata.name, "capacity": pv.spec.capacity.get("storage", "N/A")} for pv in pvs.items]
+    return Listing(
+        [project(pv, PV_FIELDS, selected) for pv in pvs.items],
+        resource_version=pvs.metadata.resource_version,
+    )
 
 @handle_k8s_exception
-def list_persistent_volume_claims(namespace: str):
-    pvcs = core_v1.list_namespaced_persistent_volume_claim(namespace)
-    return [{"name": pvc.metadata.name, "status": pvc.status.phase, "volume": pvc.spec.volume_name} for pvc in pvcs.items]
+def list_persistent_volume_claims(namespace: Optional[str], fields: Optional[str] = None):
+    selected = select_fields(fields, PVC_FIELDS)
+    return list_objects("pvcs", namespace).map(lambda pvc: project(pvc, PVC_FIELDS, selected))
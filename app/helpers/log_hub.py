@@ -0,0 +1,143 @@
+# === log_hub.py ===
+# One upstream follow connection per (namespace, pod, container), fanned out to
+# every subscriber through a bounded ring buffer. The upstream never waits for
+# subscribers: a subscriber that falls behind the buffer skips ahead and is
+# told how many lines it missed. The upstream closes with its last subscriber.
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+from kubernetes import client
+from app.helpers import kube_async
+import asyncio
+import logging
+import os
+
+# Lines kept per stream, replayed to new joiners and used as slack for slow readers
+LOG_HUB_BUFFER = int(os.getenv("LOG_HUB_BUFFER", "2000"))
+# Lines requested from the kubelet when an upstream opens, and replayed to each joiner
+LOG_HUB_BACKLOG = int(os.getenv("LOG_HUB_BACKLOG", "50"))
+
+TopicKey = Tuple[str, str, Optional[str]]
+
+
+class LogTopic:
+    def __init__(self, namespace: str, pod_name: str, container: Optional[str], since_time: Optional[str] = None):
+        self.key: TopicKey = (namespace, pod_name, container)
+        self.since_time = since_time
+        self.lines: deque = deque(maxlen=LOG_HUB_BUFFER)
+        self.next_seq = 0  # sequence number of the next published line
+        self.subscribers: set = set()
+        self.closed = False
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def first_seq(self) -> int:
+        return self.next_seq - len(self.lines)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._follow())
+
+    def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    def publish(self, line: str):
+        self.lines.append(line)
+        self.next_seq += 1
+        for subscription in self.subscribers:
+            subscription.wakeup.set()
+
+    async def _follow(self):
+        namespace, pod_name, container = self.key
+        path = f"/api/v1/namespaces/{quote(namespace)}/pods/{quote(pod_name)}/log"
+        query = {"follow": "true", "timestamps": "true", "container": container}
+        if self.since_time:
+            query["sinceTime"] = self.since_time
+        else:
+            query["tailLines"] = LOG_HUB_BACKLOG
+        try:
+            async for line in kube_async.stream_lines(path, query):
+                self.publish(line)
+        except asyncio.CancelledError:
+            raise
+        except client.exceptions.ApiException as e:
+            self.error = f"{e.status} {e.reason}"
+        except Exception as e:
+            logging.warning(f"Log follower for {namespace}/{pod_name} failed: {e}")
+            self.error = str(e)
+        finally:
+            self.closed = True
+            if _topics.get(self.key) is self:
+                del _topics[self.key]
+            for subscription in self.subscribers:
+                subscription.wakeup.set()
+
+
+class LogSubscription:
+    def __init__(self, topic: LogTopic, backlog: int):
+        self.topic = topic
+        self.cursor = max(topic.first_seq, topic.next_seq - backlog)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0  # lines skipped because this reader fell behind
+
+    async def next_lines(self) -> List[str]:
+        """Wait for and return the next unread lines; an empty list means the stream ended."""
+        topic = self.topic
+        while True:
+            if self.cursor < topic.first_seq:
+                self.dropped += topic.first_seq - self.cursor
+                self.cursor = topic.first_seq
+            if self.cursor < topic.next_seq:
+                lines = list(islice(topic.lines, self.cursor - topic.first_seq, None))
+                self.cursor = topic.next_seq
+                return lines
+            if topic.closed:
+                return []
+            self.wakeup.clear()
+            await self.wakeup.wait()
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+_topics: Dict[TopicKey, LogTopic] = {}
+
+
+def subscribe(namespace: str, pod_name: str, container: Optional[str] = None, backlog: int = LOG_HUB_BACKLOG,
+              since_time: Optional[str] = None) -> LogSubscription:
+    """Join the stream of one container; ``since_time`` (RFC3339) starts a new upstream there instead of its tail."""
+    key = (namespace, pod_name, container)
+    topic = _topics.get(key)
+    if topic is None:
+        topic = LogTopic(namespace, pod_name, container, since_time)
+        _topics[key] = topic
+        topic.start()
+    subscription = LogSubscription(topic, backlog)
+    topic.subscribers.add(subscription)
+    return subscription
+
+
+def unsubscribe(subscription: LogSubscription):
+    topic = subscription.topic
+    topic.subscribers.discard(subscription)
+    if not topic.subscribers:
+        topic.stop()
+        if _topics.get(topic.key) is topic:
+            del _topics[topic.key]
+
+
+def hub_status() -> List[dict]:
+    return [
+        {
+            "namespace": topic.key[0],
+            "pod": topic.key[1],
+            "container": topic.key[2],
+            "subscribers": len(topic.subscribers),
+            "buffered_lines": len(topic.lines),
+            "published_lines": topic.next_seq,
+        }
+        for topic in _topics.values()
+    ]
@@ -0,0 +1,108 @@
+# === metrics.py ===
+# Prometheus metrics for our own routes and for the calls we make to the
+# kube-apiserver, so a slow response can be attributed to one or the other.
+# Labels are route and API path *templates*, never raw paths, to keep
+# cardinality bounded.
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+import os
+import time
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HTTP_REQUESTS = Counter(
+    "kubechef_http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "kubechef_http_request_duration_seconds", "Time until the response is complete",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("kubechef_http_requests_in_flight", "HTTP requests being handled")
+STREAMING_CONNECTIONS = Gauge(
+    "kubechef_streaming_connections", "Open streaming responses and WebSockets", ["route"]
+)
+UPSTREAM_LATENCY = Histogram(
+    "kubechef_k8s_request_duration_seconds", "kube-apiserver call latency (until headers for streams)",
+    ["verb", "resource"], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "kubechef_k8s_request_errors_total", "kube-apiserver calls that failed", ["verb", "resource", "status"]
+)
+WRITES = Counter("kubechef_k8s_writes_total", "Update requests by outcome", ["kind", "result"])
+
+
+def _route_template(scope) -> str:
+    # FastAPI stores the matched route in the scope during routing
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: no per-request Request/Response objects, just timers and labels."""
+
+    def __init__(self, app):
+        self.app = app
+        # (method, route, status) -> (request counter, latency histogram): labels() costs as much as the update
+        self._children = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if not streaming:
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                elif message.get("more_body"):
+                    # More than one body chunk: a streamed response (logs, SSE, NDJSON)
+                    streaming = True
+                    STREAMING_CONNECTIONS.labels(_route_template(scope)).inc()
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = _route_template(scope)
+            if streaming:
+                STREAMING_CONNECTIONS.labels(route).dec()
+            key = (scope["method"], route, status)
+            children = self._children.get(key)
+            if children is None:
+                children = self._children[key] = (
+                    HTTP_REQUESTS.labels(scope["method"], route, str(status)),
+                    HTTP_LATENCY.labels(scope["method"], route),
+                )
+            children[0].inc()
+            children[1].observe(time.perf_counter() - started)
+
+    async def _websocket(self, scope, receive, send):
+        accepted = False
+
+        async def send_wrapper(message):
+            nonlocal accepted
+            if message["type"] == "websocket.accept":
+                accepted = True
+                STREAMING_CONNECTIONS.labels(_route_template(scope)).inc()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if accepted:
+                STREAMING_CONNECTIONS.labels(_route_template(scope)).dec()
+
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
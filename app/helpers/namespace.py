@@ -1,4 +1,7 @@
 from kubernetes import client
+from app.configs.kube_client import get_api_client, instrumented
+from app.helpers.projection import select_fields, project_object
+from app.helpers.informer import Listing
 from fastapi import HTTPException
 from typing import Optional, Dict, List
 from datetime import datetime
@@ -11,8 +14,8 @@ from app.schemas.namespace import (
     Subject
 )
 
-core_v1 = client.CoreV1Api()
-rbac_v1 = client.RbacAuthorizationV1Api()
+core_v1 = instrumented(client.CoreV1Api(get_api_client()))
+rbac_v1 = instrumented(client.RbacAuthorizationV1Api(get_api_client()))
 
 # === Exception handler ===
 def handle_k8s_exception(func):
@@ -28,17 +31,19 @@ def handle_k8s_exception(func):
 @handle_k8s_exception
 def list_namespaces():
     namespaces = core_v1.list_namespace()
-    return [ns.metadata.name for ns in namespaces.items]
+    return Listing([ns.metadata.name for ns in namespaces.items], resource_version=namespaces.metadata.resource_version)
+
+NAMESPACE_FIELDS = {
+    "name": lambda ns: ns.metadata.name,
+    "labels": lambda ns: ns.metadata.labels,
+    "creation_timestamp": lambda ns: ns.metadata.creation_timestamp.isoformat() if ns.metadata.creation_timestamp else None,
+    "status": lambda ns: ns.status.phase,
+}
 
 @handle_k8s_exception
-def get_namespace_details(name: str):
-    ns = core_v1.read_namespace(name=name)
-    return {
-        "name": ns.metadata.name,
-        "labels": ns.metadata.labels,
-        "creation_timestamp": ns.metadata.creation_timestamp.isoformat() if ns.metadata.creation_timestamp else None,
-        "status": ns.status.phase
-    }
+def get_namespace_details(name: str, fields: Optional[str] = None):
+    selected = select_fields(fields, NAMESPACE_FIELDS)
+    return project_object(core_v1.read_namespace(name=name), NAMESPACE_FIELDS, selected)
 
 @handle_k8s_exception
 def create_namespace(data: NamespaceBase):
@@ -0,0 +1,158 @@
+# === overview.py ===
+# One-call namespace overview for the UI. Every section is fetched
+# concurrently on the kube executor with its own timeout, so a slow or failing
+# sub-call degrades into a section-level error instead of delaying or breaking
+# the whole page. The timeout is also passed to the API calls, so an abandoned
+# section does not keep an executor thread busy.
+from collections import Counter
+from kubernetes import client
+from kubernetes.client import CoreV1Api
+from fastapi import HTTPException
+from typing import Callable, Dict, List, Optional
+from app.configs.kube_client import get_api_client, instrumented
+from app.helpers.informer import list_objects
+from app.helpers.kube_async import run_k8s
+from app.helpers.quantity import parse_quantity
+import asyncio
+import os
+import time
+
+core_v1 = instrumented(CoreV1Api(get_api_client()))
+
+# Default per-section timeout in seconds
+OVERVIEW_SECTION_TIMEOUT = float(os.getenv("OVERVIEW_SECTION_TIMEOUT", "3"))
+
+
+def _namespace(namespace: str, hotspots: int, timeout: float) -> dict:
+    ns = core_v1.read_namespace(name=namespace, _request_timeout=timeout)
+    return {
+        "name": ns.metadata.name,
+        "status": ns.status.phase,
+        "labels": ns.metadata.labels,
+        "creation_timestamp": ns.metadata.creation_timestamp,
+    }
+
+
+def _quotas(namespace: str, hotspots: int, timeout: float) -> List[dict]:
+    result = []
+    for quota in core_v1.list_namespaced_resource_quota(namespace=namespace, _request_timeout=timeout).items:
+        hard = quota.status.hard or {}
+        used = quota.status.used or {}
+        resources = {}
+        for resource, hard_value in hard.items():
+            hard_number = parse_quantity(hard_value)
+            used_number = parse_quantity(used.get(resource, "0"))
+            resources[resource] = {
+                "hard": hard_value,
+                "used": used.get(resource, "0"),
+                "ratio": round(used_number / hard_number, 4) if hard_number and used_number is not None else None,
+            }
+        result.append({"name": quota.metadata.name, "resources": resources})
+    return result
+
+
+def _limit_ranges(namespace: str, hotspots: int, timeout: float) -> List[dict]:
+    return [
+        {
+            "name": limit_range.metadata.name,
+            "limits": [
+                {
+                    "type": item.type,
+                    "max": item.max,
+                    "min": item.min,
+                    "default": item.default,
+                    "default_request": item.default_request,
+                }
+                for item in limit_range.spec.limits or []
+            ],
+        }
+        for limit_range in core_v1.list_namespaced_limit_range(namespace=namespace, _request_timeout=timeout).items
+    ]
+
+
+def _pods(namespace: str, hotspots: int, timeout: float) -> dict:
+    pods = list_objects("pods", namespace, request_timeout=timeout)
+    phases = Counter(pod.status.phase for pod in pods)
+    restarts = []
+    for pod in pods:
+        for status in pod.status.container_statuses or []:
+            if status.restart_count:
+                terminated = status.last_state.terminated if status.last_state else None
+                restarts.append({
+                    "pod": pod.metadata.name,
+                    "container": status.name,
+                    "restarts": status.restart_count,
+                    "last_reason": terminated.reason if terminated else None,
+                })
+    restarts.sort(key=lambda item: item["restarts"], reverse=True)
+    return {
+        "total": len(pods),
+        "by_phase": dict(phases),
+        "restart_hotspots": restarts[:hotspots],
+    }
+
+
+def _deployments(namespace: str, hotspots: int, timeout: float) -> dict:
+    counts = Counter()
+    not_ready = []
+    for deployment in list_objects("deployments", namespace, request_timeout=timeout):
+        desired = deployment.spec.replicas or 0
+        status = deployment.status
+        if (status.updated_replicas or 0) < desired:
+            state = "progressing"
+        elif (status.available_replicas or 0) < desired:
+            state = "unavailable"
+        else:
+            state = "available"
+        counts[state] += 1
+        if state != "available":
+            not_ready.append({
+                "name": deployment.metadata.name,
+                "state": state,
+                "desired": desired,
+                "available": status.available_replicas or 0,
+            })
+    return {"total": sum(counts.values()), "by_status": dict(counts), "not_ready": not_ready}
+
+
+def _services(namespace: str, hotspots: int, timeout: float) -> dict:
+    services = list_objects("services", namespace, request_timeout=timeout)
+    return {"total": len(services), "by_type": dict(Counter(s.spec.type for s in services))}
+
+
+SECTIONS: Dict[str, Callable[[str, int, float], object]] = {
+    "namespace": _namespace,
+    "quotas": _quotas,
+    "limit_ranges": _limit_ranges,
+    "pods": _pods,
+    "deployments": _deployments,
+    "services": _services,
+}
+
+
+async def _section(name: str, namespace: str, hotspots: int, timeout: float):
+    try:
+        return await asyncio.wait_for(run_k8s(SECTIONS[name], namespace, hotspots, timeout), timeout=timeout)
+    except asyncio.TimeoutError:
+        return {"error": f"Timed out after {timeout:g}s", "timed_out": True}
+    except client.exceptions.ApiException as e:
+        if name == "namespace" and e.status == 404:
+            raise HTTPException(status_code=404, detail=f"Namespace '{namespace}' not found")
+        return {"error": f"{e.status} {e.reason}", "timed_out": False}
+    except Exception as e:
+        # Connection errors, client-side timeouts or an object this code did not expect
+        return {"error": f"{type(e).__name__}: {e}", "timed_out": False}
+
+
+async def namespace_overview(namespace: str, sections: Optional[List[str]] = None,
+                             timeout: float = OVERVIEW_SECTION_TIMEOUT, hotspots: int = 5) -> dict:
+    """Fetch the requested sections concurrently, each bounded by ``timeout`` seconds."""
+    names = sections or list(SECTIONS)
+    unknown = [name for name in names if name not in SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections {unknown}. Available: {list(SECTIONS)}")
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_section(name, namespace, hotspots, timeout) for name in names))
+    overview = dict(zip(names, results))
+    overview["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return overview
@@ -1,11 +1,25 @@
-from kubernetes import client, watch
+from kubernetes import client
 from kubernetes.client import CoreV1Api, AppsV1Api, BatchV1Api
-from fastapi import HTTPException
+from app.configs.kube_client import get_api_client, instrumented
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from typing import List, Optional
+from app.helpers.informer import list_objects, cached_object
+from app.helpers.projection import select_fields, project, project_object, Versioned
+from app.helpers import log_hub, kube_async
+from app.helpers.kube_async import run_k8s
+from urllib.parse import quote
+from collections import deque
+import asyncio
+import codecs
+import json
+import logging
+import re
+import time
 from app.schemas.pods import PodCreateRequest, PodListResponse, PodInfo, ContainerSpec
 
-core_v1 = CoreV1Api()
-apps_v1 = AppsV1Api()
-batch_v1 = BatchV1Api()
+core_v1 = instrumented(CoreV1Api(get_api_client()))
+apps_v1 = instrumented(AppsV1Api(get_api_client()))
+batch_v1 = instrumented(BatchV1Api(get_api_client()))
 
 def handle_k8s_exception(func):
     def wrapper(*args, **kwargs):
@@ -16,46 +30,40 @@ def handle_k8s_exception(func):
     return wrapper
 
 
+POD_FIELDS = {
+    "name": lambda pod: pod.metadata.name,
+    "namespace": lambda pod: pod.metadata.namespace,
+    "status": lambda pod: pod.status.phase,
+    "node_name": lambda pod: pod.spec.node_name,
+    "start_time": lambda pod: pod.status.start_time,
+    "host_ip": lambda pod: pod.status.host_ip,
+    "pod_ip": lambda pod: pod.status.pod_ip,
+    "containers": lambda pod: [c.name for c in pod.spec.containers],
+}
+
 @handle_k8s_exception
-def list_pods(namespace: str):
-    v1 = client.CoreV1Api()
-    pods = v1.list_namespaced_pod(namespace=namespace)
+def list_pods(
+    namespace: Optional[str],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    selected = select_fields(fields, POD_FIELDS)
+    pods = list_objects("pods", namespace, limit=limit, cursor=cursor)
 
-    return {
+    return Versioned({
         "namespace": namespace,
-        "pods": [
-            {
-                "name": pod.metadata.name,
-                "status": pod.status.phase,
-                "node_name": pod.spec.node_name,
-                "start_time": pod.status.start_time,
-                "host_ip": pod.status.host_ip,
-                "pod_ip": pod.status.pod_ip,
-                "containers": [c.name for c in pod.spec.containers],
-            }
-            for pod in pods.items
-        ]
-    }
+        "pods": [project(pod, POD_FIELDS, selected) for pod in pods],
+        "next_cursor": pods.continue_token,
+    }, pods.resource_version)
 
 @handle_k8s_exception
-def get_pod(namespace: str, pod_name: str):
-    v1 = client.CoreV1Api()
-    pod = v1.read_namespaced_pod(name=pod_name, namespace=namespace)
-
-    return {
-        "name": pod.metadata.name,
-        "status": pod.status.phase,
-        "node_name": pod.spec.node_name,
-        "start_time": pod.status.start_time,
-        "host_ip": pod.status.host_ip,
-        "pod_ip": pod.status.pod_ip,
-        "containers": [c.name for c in pod.spec.containers],
-    }
+def get_pod(namespace: str, pod_name: str, fields: Optional[str] = None):
+    selected = select_fields(fields, POD_FIELDS)
+    return project_object(core_v1.read_namespaced_pod(name=pod_name, namespace=namespace), POD_FIELDS, selected)
 
 @handle_k8s_exception
 def create_pod(namespace: str, payload: PodCreateRequest):
-    v1 = client.CoreV1Api()
-
     containers = []
     for c in payload.containers:
         containers.append(
@@ -89,26 +97,460 @@ def create_pod(namespace: str, payload: PodCreateRequest):
         )
     )
 
-    resp = v1.create_namespaced_pod(namespace=namespace, body=pod_manifest)
+    resp = core_v1.create_namespaced_pod(namespace=namespace, body=pod_manifest)
     return {"message": f"Pod '{resp.metadata.name}' berhasil dibuat di namespace '{namespace}'."}
 
-@handle_k8s_exception
-def get_pod_logs(pod_name: str, namespace: str):
-    log = core_v1.read_namespaced_pod_log(pod_name, namespace)
-    return {"pod": pod_name, "log": log.strip().split("\n")}
+def _log_query(
+    container: Optional[str] = None,
+    tail_lines: Optional[int] = None,
+    since_seconds: Optional[int] = None,
+    since_time: Optional[str] = None,
+    limit_bytes: Optional[int] = None,
+    previous: bool = False,
+    timestamps: bool = False,
+    follow: bool = False,
+) -> dict:
+    if since_seconds is not None and since_time is not None:
+        raise HTTPException(status_code=400, detail="Use either 'since_seconds' or 'since_time', not both.")
+    return {
+        "container": container,
+        "tailLines": tail_lines,
+        "sinceSeconds": since_seconds,
+        "sinceTime": since_time,
+        "limitBytes": limit_bytes,
+        "previous": "true" if previous else None,
+        "timestamps": "true" if timestamps else None,
+        "follow": "true" if follow else None,
+    }
 
-@handle_k8s_exception
-def stream_logs(namespace: str, pod_name: str):
-    w = watch.Watch()
-    for line in w.stream(
-        core_v1.read_namespaced_pod_log,
-        name=pod_name,
-        namespace=namespace,
-        follow=True,
-        tail_lines=50,
-        timestamps=True,
-    ):
-        yield line + "\n"
+async def _open_stream(stream):
+    """Pull the first item before the response starts so API errors become proper HTTP errors."""
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        return _empty_stream()
+    except client.exceptions.ApiException as e:
+        await stream.aclose()
+        try:
+            detail = json.loads(e.body).get("message", e.reason)
+        except (TypeError, ValueError, AttributeError):
+            detail = e.reason
+        raise HTTPException(status_code=e.status, detail=detail)
+    return _prepend(first, stream)
+
+async def _empty_stream():
+    return
+    yield
+
+async def _prepend(first, stream):
+    try:
+        yield first
+        async for item in stream:
+            yield item
+    finally:
+        await stream.aclose()
+
+async def open_pod_log(namespace: str, pod_name: str, query: dict, lines: bool = False):
+    """Raw log body of a pod as bytes chunks, or decoded lines when ``lines`` is set."""
+    path = f"/api/v1/namespaces/{quote(namespace)}/pods/{quote(pod_name)}/log"
+    stream = kube_async.stream_lines(path, query) if lines else kube_async.stream_chunks(path, query)
+    return await _open_stream(stream)
+
+async def get_pod_logs(pod_name: str, namespace: str, format: str = "text", **options):
+    """Stream a (non-follow) pod log as plain text chunks or NDJSON lines, never holding it whole."""
+    query = _log_query(**options)
+    if format != "ndjson":
+        return await open_pod_log(namespace, pod_name, query)
+
+    lines = await open_pod_log(namespace, pod_name, query, lines=True)
+
+    async def ndjson():
+        number = 0
+        async for line in lines:
+            number += 1
+            yield json.dumps({"pod": pod_name, "line": number, "log": line}) + "\n"
+    return ndjson()
+
+def compile_log_matcher(pattern: Optional[str], literals: Optional[List[str]], ignore_case: bool = False):
+    """One compiled regex for a pattern and/or a set of literal strings."""
+    alternatives = []
+    if pattern:
+        alternatives.append(f"(?:{pattern})")
+    alternatives.extend(re.escape(literal) for literal in literals or [] if literal)
+    if not alternatives:
+        raise HTTPException(status_code=400, detail="Either 'pattern' or 'literal' must be provided.")
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    try:
+        return re.compile("|".join(alternatives), flags)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pattern: {e}")
+
+async def search_pod_logs(
+    namespace: str,
+    pod_name: str,
+    matcher,
+    before: int = 0,
+    after: int = 0,
+    max_matches: Optional[int] = None,
+    **options,
+):
+    """Scan a pod log as it streams and yield NDJSON records for matches and their context.
+
+    Blocks of complete lines are first searched as a whole; only blocks that
+    contain a match are split into lines, so sparse matches cost one regex
+    scan per chunk. Works with ``follow=True`` for live alerting.
+    """
+    chunks = await open_pod_log(namespace, pod_name, _log_query(**options))
+
+    async def results():
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        search = matcher.search
+        context: deque = deque(maxlen=before or None)
+        after_left = matches = scanned = total_bytes = 0
+        pending = ""
+        started = time.perf_counter()
+
+        def record(number: int, text: str, is_match: bool) -> str:
+            return json.dumps({"line": number, "match": is_match, "text": text}) + "\n"
+
+        def scan(block: str) -> str:
+            """Records for one block of complete lines, keeping context and match counts across blocks."""
+            nonlocal after_left, matches, scanned
+            if not after_left and not search(block):
+                # Fast path: nothing in this block is emitted, only keep the last lines as context
+                count = block.count("\n") + 1
+                if before:
+                    tail = block.rsplit("\n", before)[-before:]
+                    first = scanned + count - len(tail) + 1
+                    context.extend(zip(range(first, first + len(tail)), tail))
+                scanned += count
+                return ""
+
+            output = []
+            for line in block.split("\n"):
+                scanned += 1
+                if (max_matches is None or matches < max_matches) and search(line):
+                    matches += 1
+                    output.extend(record(n, t, False) for n, t in context)
+                    context.clear()
+                    output.append(record(scanned, line, True))
+                    after_left = after
+                elif after_left:
+                    after_left -= 1
+                    output.append(record(scanned, line, False))
+                elif max_matches is not None and matches >= max_matches:
+                    break
+                elif before:
+                    context.append((scanned, line))
+            return "".join(output)
+
+        def finished() -> bool:
+            return max_matches is not None and matches >= max_matches and not after_left
+
+        try:
+            async for chunk in chunks:
+                total_bytes += len(chunk)
+                text = pending + decoder.decode(chunk)
+                block, newline, pending = text.rpartition("\n")
+                if not newline:
+                    pending = text
+                    continue
+                if finished():
+                    break
+                output = scan(block)
+                if output:
+                    yield output
+            else:
+                # The last line has no trailing newline at EOF or with tail_lines
+                pending += decoder.decode(b"", final=True)
+                if pending and not finished():
+                    output = scan(pending)
+                    if output:
+                        yield output
+        finally:
+            await chunks.aclose()
+
+        elapsed = time.perf_counter() - started
+        yield json.dumps({"summary": {
+            "lines_scanned": scanned,
+            "matches": matches,
+            "bytes_scanned": total_bytes,
+            "seconds": round(elapsed, 3),
+            "mb_per_second": round(total_bytes / 1e6 / elapsed, 2) if elapsed else None,
+        }}) + "\n"
+
+    return results()
+
+async def _default_container(namespace: str, pod_name: str, container: Optional[str]) -> Optional[str]:
+    """The container a log request reads when it names none, so both requests share one hub topic.
+
+    The API server only picks a container on its own when the pod has one;
+    otherwise (or when the pod cannot be read) ``container`` stays None and
+    the log request reports the error.
+    """
+    if container:
+        return container
+    pod = cached_object("pods", namespace, pod_name)
+    if pod is None:
+        try:
+            pod = await run_k8s(core_v1.read_namespaced_pod, pod_name, namespace)
+        except Exception:
+            return None
+    containers = pod.spec.containers or []
+    return containers[0].name if len(containers) == 1 else None
+
+async def stream_logs(namespace: str, pod_name: str, container: Optional[str] = None):
+    # Shares one upstream follower with every other client tailing the same container
+    container = await _default_container(namespace, pod_name, container)
+    subscription = log_hub.subscribe(namespace, pod_name, container)
+    try:
+        while True:
+            lines = await subscription.next_lines()
+            dropped = subscription.take_dropped()
+            if dropped:
+                yield f"... {dropped} lines dropped, client too slow ...\n"
+            if not lines:
+                break
+            yield "".join(line + "\n" for line in lines)
+        if subscription.topic.error:
+            yield f"error: {subscription.topic.error}\n"
+    finally:
+        log_hub.unsubscribe(subscription)
+
+async def websocket_logs(
+    websocket: WebSocket,
+    namespace: str,
+    pod_name: str,
+    container: Optional[str] = None,
+    batch_bytes: int = 32 * 1024,
+    batch_interval: float = 0.1,
+):
+    """Send followed log lines as JSON frames batched by size or time window.
+
+    The client may send {"action": "pause"} / {"action": "resume"}. While paused, or
+    while a send is blocked on a slow connection, lines are not queued per client:
+    the reader falls behind the shared hub buffer and the skipped lines are
+    reported in the "dropped" field of the next frame.
+    """
+    loop = asyncio.get_running_loop()
+    container = await _default_container(namespace, pod_name, container)
+    subscription = log_hub.subscribe(namespace, pod_name, container)
+    running = asyncio.Event()
+    running.set()
+    send_lock = asyncio.Lock()
+    dropped_total = 0
+
+    async def send_frame(frame: dict):
+        async with send_lock:
+            await websocket.send_json(frame)
+
+    async def send(lines):
+        nonlocal dropped_total
+        dropped = subscription.take_dropped()
+        dropped_total += dropped
+        await send_frame({"lines": lines, "dropped": dropped, "dropped_total": dropped_total})
+
+    async def pump():
+        batch, size, deadline = [], 0, None
+        while True:
+            await running.wait()
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                lines = await asyncio.wait_for(subscription.next_lines(), timeout)
+            except asyncio.TimeoutError:
+                lines = None
+            if lines == []:
+                if batch or subscription.dropped:
+                    await send(batch)
+                await send_frame({"event": "end", "error": subscription.topic.error})
+                return
+            for line in lines or ():
+                if deadline is None:
+                    deadline = loop.time() + batch_interval
+                batch.append(line)
+                size += len(line) + 1
+                if size >= batch_bytes:
+                    await send(batch)
+                    # The next line opens a new time window
+                    batch, size, deadline = [], 0, None
+            if deadline is not None and loop.time() >= deadline:
+                if batch:
+                    await send(batch)
+                batch, size, deadline = [], 0, None
+
+    async def control():
+        async for message in websocket.iter_json():
+            action = message.get("action") if isinstance(message, dict) else None
+            if action == "pause":
+                running.clear()
+            elif action == "resume":
+                running.set()
+            await send_frame({"event": action or "unknown", "paused": not running.is_set()})
+
+    tasks = [asyncio.create_task(pump()), asyncio.create_task(control())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                logging.warning(f"Log websocket for {namespace}/{pod_name} failed: {task.exception()}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        log_hub.unsubscribe(subscription)
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass
+
+def _timestamp_key(line: str) -> str:
+    # RFC3339Nano trims trailing zeros, pad the fraction so keys sort lexically
+    stamp = line.split(" ", 1)[0]
+    if not stamp.endswith("Z"):
+        return stamp
+    seconds, _, fraction = stamp[:-1].partition(".")
+    return f"{seconds}.{fraction.ljust(9, '0')}"
+
+
+async def stream_merged_logs(
+    namespace: str,
+    selector: str,
+    container: Optional[str] = None,
+    merge_window: float = 0.5,
+    max_batch: int = 5000,
+):
+    """Follow every pod matching ``selector`` and merge their lines by timestamp.
+
+    The matching pods are listed first, so a bad selector, or a ``container``
+    that one of them does not have, fails before the response starts. After
+    that a pod watch attaches and detaches replicas as they come and go. Each
+    pod is read through the shared log hub by a coroutine, not a thread. Lines
+    collected within one ``merge_window`` are emitted sorted by their
+    timestamp prefix. At most ``max_batch`` lines are held for the client;
+    past that the readers stop draining the hub, which skips ahead for them
+    and reports the dropped lines.
+    """
+    try:
+        listing = await run_k8s(
+            core_v1.list_namespaced_pod, namespace, label_selector=selector, _preload_content=False
+        )
+    except client.exceptions.ApiException as e:
+        raise HTTPException(status_code=e.status, detail=e.reason)
+    listing = json.loads(listing.data)
+    if container:
+        for pod in listing["items"]:
+            containers = [c["name"] for c in pod["spec"]["containers"]]
+            if container not in containers:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Pod '{pod['metadata']['name']}' has no container '{container}'. Containers: {containers}",
+                )
+    return _merge_pod_logs(namespace, selector, container, listing, merge_window, max_batch)
+
+async def _merge_pod_logs(namespace, selector, container, listing, merge_window, max_batch):
+    sources: dict = {}  # pod name -> (subscription, reader task)
+    last_seen: dict = {}  # pod name -> timestamp key of its newest line sent, so a re-attach does not repeat lines
+    buffer: list = []
+    space = asyncio.Event()
+    space.set()
+    path = f"/api/v1/namespaces/{quote(namespace)}/pods"
+
+    async def read_source(pod_name: str, subscription):
+        prefix = f"[{pod_name}/{subscription.topic.key[2]}] "
+        while True:
+            while len(buffer) >= max_batch:
+                space.clear()
+                await space.wait()
+            lines = await subscription.next_lines()
+            dropped = subscription.take_dropped()
+            # Other readers may have filled the buffer meanwhile; keep the newest lines that fit
+            room = max(0, max_batch - len(buffer))
+            if len(lines) > room:
+                dropped += len(lines) - room
+                lines = lines[len(lines) - room:]
+            if dropped:
+                buffer.append(("", f"{prefix}... {dropped} lines dropped, client too slow ..."))
+            seen = last_seen.get(pod_name)
+            keyed = [(_timestamp_key(line), prefix + line) for line in lines]
+            if seen:
+                keyed = [item for item in keyed if item[0] > seen]
+            if not keyed:
+                if not lines and subscription.topic.closed:
+                    return
+                continue
+            last_seen[pod_name] = keyed[-1][0]
+            buffer.extend(keyed)
+
+    def attach(pod: dict):
+        name = pod["metadata"]["name"]
+        active = sources.get(name)
+        if active and not active[1].done():
+            return
+        if pod.get("status", {}).get("phase") == "Pending":
+            return
+        if active:
+            log_hub.unsubscribe(active[0])
+        containers = [c["name"] for c in pod["spec"]["containers"]]
+        if container and container not in containers:
+            # Checked up front for the listed pods; a later replica may still differ
+            buffer.append(("", f"[{name}] has no container '{container}', skipped"))
+            return
+        # A finished or restarted pod is re-attached where it left off rather than from its tail
+        since = last_seen.get(name)
+        subscription = log_hub.subscribe(namespace, name, container or containers[0],
+                                         since_time=since + "Z" if since else None)
+        sources[name] = (subscription, asyncio.create_task(read_source(name, subscription)))
+
+    def detach(name: str):
+        active = sources.pop(name, None)
+        if active:
+            active[1].cancel()
+            log_hub.unsubscribe(active[0])
+
+    async def watch_pods():
+        resource_version = listing["metadata"].get("resourceVersion")
+        while True:
+            query = {"watch": "true", "labelSelector": selector, "resourceVersion": resource_version}
+            try:
+                async for line in kube_async.stream_lines(path, query):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    obj = event["object"]
+                    if event["type"] == "ERROR":
+                        if obj.get("code") == 410:
+                            resource_version = None
+                        else:
+                            await asyncio.sleep(1)
+                        break
+                    resource_version = obj["metadata"].get("resourceVersion", resource_version)
+                    if event["type"] in ("ADDED", "MODIFIED"):
+                        attach(obj)
+                    elif event["type"] == "DELETED":
+                        detach(obj["metadata"]["name"])
+            except client.exceptions.ApiException as e:
+                if e.status != 410:
+                    raise
+                resource_version = None
+
+    for pod in listing["items"]:
+        attach(pod)
+    watcher = asyncio.create_task(watch_pods())
+    try:
+        while True:
+            if len(buffer) < max_batch:
+                await asyncio.sleep(merge_window)
+            if watcher.done():
+                yield f"error: {watcher.exception()}\n"
+                return
+            if buffer:
+                batch = sorted(buffer, key=lambda item: item[0])
+                buffer.clear()
+                space.set()
+                yield "".join(text + "\n" for _, text in batch)
+    finally:
+        watcher.cancel()
+        for name in list(sources):
+            detach(name)
 
 @handle_k8s_exception
 def delete_pod(namespace: str, name: str):
@@ -0,0 +1,39 @@
+# === projection.py ===
+# Sparse fieldsets: each resource declares how every output attribute is read
+# from the kubernetes model object, and only the requested ones are extracted.
+from fastapi import HTTPException
+from typing import Callable, Dict, List, Optional
+
+Extractors = Dict[str, Callable[[object], object]]
+
+
+def select_fields(fields: Optional[str], extractors: Extractors) -> Optional[List[str]]:
+    """Parse a ``fields=a,b,c`` query value; None means every field."""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in extractors]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields {unknown}. Available fields: {list(extractors)}",
+        )
+    return names
+
+
+def project(obj, extractors: Extractors, fields: Optional[List[str]] = None) -> dict:
+    if fields is None:
+        return {name: extract(obj) for name, extract in extractors.items()}
+    return {name: extractors[name](obj) for name in fields}
+
+
+class Versioned(dict):
+    """Response body plus the resourceVersion it was read at, used for its ETag."""
+
+    def __init__(self, content=(), resource_version: Optional[str] = None):
+        super().__init__(content)
+        self.resource_version = resource_version
+
+
+def project_object(obj, extractors: Extractors, fields: Optional[List[str]] = None) -> Versioned:
+    return Versioned(project(obj, extractors, fields), obj.metadata.resource_version)
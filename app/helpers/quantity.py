@@ -0,0 +1,41 @@
+# === quantity.py ===
+# Kubernetes resource quantities ("500m", "2Gi", "1.5e3") as plain floats.
+# Clusters repeat the same few strings endlessly, so parsing is memoized.
+from functools import lru_cache
+from typing import Dict, Optional
+import re
+
+SUFFIXES = {
+    "Ki": 2 ** 10, "Mi": 2 ** 20, "Gi": 2 ** 30, "Ti": 2 ** 40, "Pi": 2 ** 50, "Ei": 2 ** 60,
+    "n": 1e-9, "u": 1e-6, "m": 1e-3, "": 1,
+    "k": 1e3, "M": 1e6, "G": 1e9, "T": 1e12, "P": 1e15, "E": 1e18,
+}
+_QUANTITY = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+))(?:([eE][+-]?\d+)|(Ki|Mi|Gi|Ti|Pi|Ei|n|u|m|k|M|G|T|P|E))?$")
+
+
+@lru_cache(maxsize=4096)
+def parse_quantity(value: Optional[str]) -> Optional[float]:
+    """Parse a quantity string into a float in base units (cores, bytes, counts).
+
+    Returns None for empty or malformed values instead of raising, so a single
+    odd object cannot break an aggregate report.
+    """
+    if value is None:
+        return None
+    match = _QUANTITY.match(str(value).strip())
+    if not match:
+        return None
+    number, exponent, suffix = match.groups()
+    if exponent:
+        return float(number + exponent)
+    return float(number) * SUFFIXES[suffix or ""]
+
+
+def parse_resources(resources: Optional[Dict[str, str]]) -> Dict[str, float]:
+    """Parse a ``{"cpu": "500m", "memory": "1Gi"}`` map, dropping malformed values."""
+    parsed = {}
+    for name, value in (resources or {}).items():
+        number = parse_quantity(value)
+        if number is not None:
+            parsed[name] = number
+    return parsed
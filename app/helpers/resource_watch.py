@@ -0,0 +1,145 @@
+# === resource_watch.py ===
+# Server-Sent Events over Kubernetes watches. Each subscriber is a coroutine
+# reading the watch through kube_async, so idle subscribers cost a socket and
+# a few objects rather than a thread. Events are projected with the same field
+# tables as the list endpoints and carry their resourceVersion as the SSE id,
+# so a reconnecting EventSource resumes through Last-Event-ID.
+from contextlib import aclosing
+from fastapi.encoders import jsonable_encoder
+from typing import AsyncIterator, Optional
+from urllib.parse import quote
+from kubernetes import client, watch
+from app.helpers import kube_async
+from app.helpers.projection import select_fields, project
+from app.helpers.pods import POD_FIELDS
+from app.helpers.deployment import DEPLOYMENT_FIELDS
+from app.helpers.configmap import CONFIGMAP_FIELDS, CONFIGMAP_DEFAULT_FIELDS
+from app.helpers.namespace import NAMESPACE_FIELDS
+import asyncio
+import json
+import os
+
+# Seconds without events before a comment line is sent to keep proxies from closing the stream
+WATCH_HEARTBEAT_SECONDS = float(os.getenv("WATCH_HEARTBEAT_SECONDS", "15"))
+# Delay before re-opening a watch that failed, also sent to clients as the SSE retry hint
+WATCH_RETRY_SECONDS = float(os.getenv("WATCH_RETRY_SECONDS", "3"))
+
+# resource -> (API group path, plural, model class, field table, default fields, namespaced)
+WATCHABLE = {
+    "pods": ("/api/v1", "pods", "V1Pod", POD_FIELDS, None, True),
+    "deployments": ("/apis/apps/v1", "deployments", "V1Deployment", DEPLOYMENT_FIELDS, None, True),
+    "configmaps": ("/api/v1", "configmaps", "V1ConfigMap", CONFIGMAP_FIELDS, CONFIGMAP_DEFAULT_FIELDS, True),
+    "namespaces": ("/api/v1", "namespaces", "V1Namespace", NAMESPACE_FIELDS, None, False),
+}
+
+
+def watch_path(resource: str, namespace: Optional[str]) -> str:
+    group, plural, _, _, _, namespaced = WATCHABLE[resource]
+    if namespaced and namespace is not None:
+        return f"{group}/namespaces/{quote(namespace)}/{plural}"
+    return f"{group}/{plural}"
+
+
+def format_sse(event: Optional[str] = None, data=None, event_id: Optional[str] = None) -> str:
+    message = ""
+    if event_id:
+        message += f"id: {event_id}\n"
+    if event:
+        message += f"event: {event}\n"
+    if data is not None:
+        message += f"data: {json.dumps(jsonable_encoder(data), separators=(',', ':'))}\n"
+    return message + "\n"
+
+
+async def _read_watch(resource: str, namespace: Optional[str], selected, label_selector: Optional[str],
+                      resource_version: Optional[str], queue: asyncio.Queue):
+    """Put SSE messages on ``queue``, re-opening the watch from the last resourceVersion.
+
+    Client errors (4xx other than 410) cannot be fixed by retrying: they end
+    the stream with an ERROR event followed by ``None``.
+    """
+    _, _, model, fields, _, _ = WATCHABLE[resource]
+    decoder = watch.Watch()
+    path = watch_path(resource, namespace)
+    while True:
+        query = {
+            "watch": "true",
+            "allowWatchBookmarks": "true",
+            "labelSelector": label_selector,
+            "resourceVersion": resource_version,
+        }
+        try:
+            async with aclosing(kube_async.stream_lines(path, query)) as lines:
+                async for line in lines:
+                    event = decoder.unmarshal_event(line, model)
+                    if event is None:
+                        continue
+                    event_type, raw = event["type"], event["raw_object"]
+                    if event_type == "ERROR":
+                        raise client.exceptions.ApiException(status=raw.get("code"), reason=raw.get("message"))
+                    resource_version = raw["metadata"].get("resourceVersion", resource_version)
+                    if event_type == "BOOKMARK":
+                        # id only: moves the client's Last-Event-ID without dispatching an event
+                        await queue.put(f"id: {resource_version}\n\n")
+                        continue
+                    await queue.put(format_sse(event_type, project(event["object"], fields, selected), resource_version))
+        except client.exceptions.ApiException as e:
+            if e.status == 410:
+                # resourceVersion too old: tell the client to drop its state, then replay current objects
+                resource_version = None
+                await queue.put(format_sse("RESYNC", {"reason": "resourceVersion expired"}))
+                continue
+            if e.status and 400 <= e.status < 500:
+                await queue.put(format_sse("ERROR", {"status": e.status, "reason": e.reason}))
+                await queue.put(None)
+                return
+            await queue.put(format_sse("WARNING", {"status": e.status, "reason": e.reason}))
+            await asyncio.sleep(WATCH_RETRY_SECONDS)
+            continue
+        except OSError as e:
+            await queue.put(format_sse("WARNING", {"reason": str(e)}))
+            await asyncio.sleep(WATCH_RETRY_SECONDS)
+            continue
+        # Server ended the watch (its timeout), resume from the last resourceVersion
+
+
+def watch_events(
+    resource: str,
+    namespace: Optional[str],
+    fields: Optional[str] = None,
+    label_selector: Optional[str] = None,
+    resource_version: Optional[str] = None,
+    heartbeat: float = WATCH_HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    """SSE stream of ADDED/MODIFIED/DELETED deltas for ``resource``.
+
+    Without ``resource_version`` the stream starts with an ADDED event for every
+    existing object. ``namespace=None`` watches across all namespaces. ``fields``
+    is validated here, before the response starts.
+    """
+    _, _, _, table, default_fields, _ = WATCHABLE[resource]
+    selected = select_fields(fields, table) or default_fields
+    return _stream(resource, namespace, selected, label_selector, resource_version, heartbeat)
+
+
+async def _stream(resource, namespace, selected, label_selector, resource_version, heartbeat) -> AsyncIterator[str]:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+    reader = asyncio.create_task(
+        _read_watch(resource, namespace, selected, label_selector, resource_version, queue)
+    )
+    try:
+        yield f"retry: {int(WATCH_RETRY_SECONDS * 1000)}\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if reader.done():
+                    yield format_sse("ERROR", {"reason": str(reader.exception())})
+                    return
+                yield ": heartbeat\n\n"
+                continue
+            if message is None:
+                return
+            yield message
+    finally:
+        reader.cancel()
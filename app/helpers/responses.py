@@ -0,0 +1,97 @@
+# === responses.py ===
+from fastapi.encoders import jsonable_encoder
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from typing import Optional
+from app.helpers import informer
+import logging
+import os
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+# Serialize helper output with orjson and skip response_model re-validation.
+# Helper output is built by this service, so validating it again only costs CPU;
+# the response_model stays on the route and the OpenAPI schema is unchanged.
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+if FAST_JSON and orjson is None:
+    logging.warning("FAST_JSON=1 but orjson is not installed, using the standard JSON encoder")
+    FAST_JSON = False
+
+
+def _orjson_default(obj):
+    # Anything orjson does not know natively (e.g. pydantic models) goes through FastAPI's encoder
+    return jsonable_encoder(obj)
+
+
+class FastJSONResponse(JSONResponse):
+    # UTC datetimes end in "Z", as pydantic writes them for validated responses
+    utc_z = True
+
+    def render(self, content) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_UTC_Z if self.utc_z else 0)
+        return orjson.dumps(content, default=_orjson_default, option=option)
+
+
+class FastRawJSONResponse(FastJSONResponse):
+    # Raw content is never validated: "+00:00", as jsonable_encoder writes it
+    utc_z = False
+
+
+def etag(resource_version: Optional[str]) -> Optional[str]:
+    # Weak: the same resourceVersion can be rendered with different fields or formats
+    return f'W/"{resource_version}"' if resource_version else None
+
+
+def not_modified(request: Request, resource_version: Optional[str]) -> Optional[Response]:
+    """A 304 response when the client's If-None-Match already names ``resource_version``."""
+    tag = etag(resource_version)
+    if_none_match = request.headers.get("if-none-match")
+    if not tag or not if_none_match:
+        return None
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    if tag in candidates or "*" in candidates:
+        return Response(status_code=304, headers={"ETag": tag})
+    return None
+
+
+def cached_not_modified(request: Request, resource: str, namespace: Optional[str] = None,
+                        name: Optional[str] = None) -> Optional[Response]:
+    """Answer If-None-Match from the informer cache, without calling the API server."""
+    if "if-none-match" not in request.headers:
+        return None
+    return not_modified(request, informer.cached_version(resource, namespace, name))
+
+
+def render(content, raw: bool = False, headers: Optional[dict] = None,
+           request: Optional[Request] = None, response: Optional[Response] = None):
+    """Return ``content`` for response_model validation, or send it as-is when ``raw``.
+
+    Projected (``fields=``) payloads do not match the full response model, so
+    they bypass validation while the route keeps its documented schema. With
+    ``FAST_JSON=1`` every rendered response takes the orjson path, with the
+    same bytes as without it: helpers return exactly the response model's
+    fields, so there is nothing for validation to drop, and datetimes are
+    written the way each path writes them.
+
+    Content carrying a ``resource_version`` (``Listing``, ``Versioned``) gets an
+    ETag, and a matching If-None-Match on ``request`` returns 304 unserialized.
+    Headers are set on ``response`` when the content goes through validation.
+    """
+    resource_version = getattr(content, "resource_version", None)
+    if request is not None:
+        unchanged = not_modified(request, resource_version)
+        if unchanged:
+            return unchanged
+    if resource_version:
+        headers = {**(headers or {}), "ETag": etag(resource_version)}
+    if FAST_JSON:
+        return (FastRawJSONResponse if raw else FastJSONResponse)(content, headers=headers)
+    if not raw:
+        if response is not None and headers:
+            response.headers.update(headers)
+        return content
+    return JSONResponse(jsonable_encoder(content), headers=headers)
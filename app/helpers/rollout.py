@@ -0,0 +1,158 @@
+# === rollout.py ===
+# Rollout status from a single watch on the Deployment, replacing client-side
+# polling. The Deployment controller aggregates its ReplicaSets into
+# status.updatedReplicas/availableReplicas/replicas, so watching the Deployment
+# sees every ReplicaSet transition that matters (same rules as
+# `kubectl rollout status`).
+from contextlib import aclosing
+from kubernetes import client
+from kubernetes.client import AppsV1Api
+from typing import AsyncIterator, Optional
+from urllib.parse import quote
+from app.configs.kube_client import get_api_client, instrumented
+from app.helpers import kube_async
+from app.helpers.kube_async import run_k8s
+from fastapi import HTTPException
+import asyncio
+import json
+
+apps_v1 = instrumented(AppsV1Api(get_api_client()))
+
+TERMINAL_PHASES = ("complete", "failed", "timeout")
+
+
+def rollout_state(deployment: dict) -> dict:
+    """Rollout phase of a Deployment, given as the API's JSON object."""
+    metadata = deployment.get("metadata", {})
+    spec = deployment.get("spec", {})
+    status = deployment.get("status", {})
+    desired = spec.get("replicas", 1)
+    replicas = status.get("replicas", 0)
+    updated = status.get("updatedReplicas", 0)
+    available = status.get("availableReplicas", 0)
+    generation = metadata.get("generation", 0)
+    observed = status.get("observedGeneration", 0)
+
+    state = {
+        "name": metadata.get("name"),
+        "namespace": metadata.get("namespace"),
+        "generation": generation,
+        "observed_generation": observed,
+        "desired": desired,
+        "replicas": replicas,
+        "updated": updated,
+        "available": available,
+    }
+    if observed < generation:
+        return {**state, "phase": "progressing", "message": "Waiting for the deployment spec update to be observed"}
+    for condition in status.get("conditions") or []:
+        if condition.get("type") == "Progressing" and condition.get("reason") == "ProgressDeadlineExceeded":
+            return {**state, "phase": "failed", "message": condition.get("message") or "Progress deadline exceeded"}
+    if updated < desired:
+        return {**state, "phase": "progressing", "message": f"{updated} out of {desired} new replicas have been updated"}
+    if replicas > updated:
+        return {**state, "phase": "progressing", "message": f"{replicas - updated} old replicas are pending termination"}
+    if available < updated:
+        return {**state, "phase": "progressing", "message": f"{available} of {updated} updated replicas are available"}
+    return {**state, "phase": "complete", "message": "Rollout complete"}
+
+
+async def _watch_deployment(name: str, namespace: str, resource_version: Optional[str], queue: asyncio.Queue):
+    """Put the rollout state on ``queue`` after every change of the deployment."""
+    path = f"/apis/apps/v1/namespaces/{quote(namespace)}/deployments"
+    while True:
+        query = {
+            "watch": "true",
+            "fieldSelector": f"metadata.name={name}",
+            "resourceVersion": resource_version,
+        }
+        try:
+            async with aclosing(kube_async.stream_lines(path, query)) as lines:
+                async for line in lines:
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    obj = event["object"]
+                    if event["type"] == "ERROR":
+                        raise client.exceptions.ApiException(status=obj.get("code"), reason=obj.get("message"))
+                    resource_version = obj["metadata"].get("resourceVersion", resource_version)
+                    if event["type"] == "DELETED":
+                        await queue.put({"name": name, "namespace": namespace, "phase": "failed",
+                                         "message": "Deployment was deleted"})
+                        return
+                    await queue.put(rollout_state(obj))
+        except client.exceptions.ApiException as e:
+            if e.status != 410:
+                await queue.put({"name": name, "namespace": namespace, "phase": "failed",
+                                 "message": f"Watch failed: {e.status} {e.reason}"})
+                return
+            # resourceVersion expired, a new watch starts with the current object as ADDED
+            resource_version = None
+        except OSError:
+            await asyncio.sleep(1)
+        # Server closed the watch, resume from the last resourceVersion
+
+
+async def rollout_events(name: str, namespace: str, timeout: float,
+                         heartbeat: Optional[float] = None) -> AsyncIterator[Optional[dict]]:
+    """Yield the rollout state on every change until it completes, fails or ``timeout`` passes.
+
+    The first state is read before the watch starts, so a missing deployment
+    raises 404 before any event is produced. With ``heartbeat``, ``None`` is
+    yielded after that many idle seconds so streaming callers can keep the
+    connection alive.
+    """
+    try:
+        current = await run_k8s(
+            apps_v1.read_namespaced_deployment, name, namespace, _preload_content=False
+        )
+    except client.exceptions.ApiException as e:
+        raise HTTPException(status_code=e.status, detail=e.reason)
+    deployment = json.loads(current.data)
+    return _follow(name, namespace, deployment, timeout, heartbeat)
+
+
+async def _follow(name: str, namespace: str, deployment: dict, timeout: float,
+                  heartbeat: Optional[float]) -> AsyncIterator[Optional[dict]]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    state = rollout_state(deployment)
+    yield state
+    if state["phase"] in TERMINAL_PHASES:
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    watcher = asyncio.create_task(
+        _watch_deployment(name, namespace, deployment["metadata"]["resourceVersion"], queue)
+    )
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                yield {**state, "phase": "timeout", "message": f"Rollout did not finish within {timeout:g}s"}
+                return
+            if queue.empty() and watcher.done():
+                # The watcher only returns after a terminal state; anything else is an unexpected error
+                error = None if watcher.cancelled() else watcher.exception()
+                reason = f"{type(error).__name__}: {error}" if error else "watch ended"
+                yield {**state, "phase": "failed", "message": f"Watch failed: {reason}"}
+                return
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                (getter, watcher), timeout=min(remaining, heartbeat or remaining),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter not in done:
+                getter.cancel()
+                if watcher not in done and heartbeat and deadline - loop.time() > 0:
+                    yield None
+                continue
+            new_state = getter.result()
+            # Deployment status is rewritten often; only report actual progress
+            if new_state != state:
+                state = {**state, **new_state}
+                yield state
+            if state["phase"] in TERMINAL_PHASES:
+                return
+    finally:
+        watcher.cancel()
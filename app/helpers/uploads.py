@@ -0,0 +1,142 @@
+# === uploads.py ===
+# Turns uploaded files into ConfigMap entries without holding more than the
+# ConfigMap size limit in memory. Files are read in chunks and rejected as soon
+# as the running total passes the limit; archives are expanded member by member
+# using their declared sizes. UTF-8 text goes to ``data``, anything else is
+# base64 encoded into ``binaryData``.
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, List, Optional, Tuple
+import base64
+import os
+import re
+import tarfile
+import zipfile
+
+# The API server rejects objects over 1 MiB; the whole ConfigMap has to fit
+CONFIGMAP_MAX_BYTES = int(os.getenv("CONFIGMAP_MAX_BYTES", str(1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+KEY_PATTERN = re.compile(r"^[-._a-zA-Z0-9]+$")
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+class Entries:
+    """ConfigMap ``data``/``binaryData`` being assembled under a shared byte budget."""
+
+    def __init__(self, limit: int = CONFIGMAP_MAX_BYTES):
+        self.limit = limit
+        self.used = 0
+        self.data: Dict[str, str] = {}
+        self.binary_data: Dict[str, str] = {}
+
+    def check(self, size: int):
+        if self.used + size > self.limit:
+            raise HTTPException(
+                status_code=413,
+                detail=f"ConfigMap content exceeds {self.limit} bytes",
+            )
+
+    def reserve(self, size: int):
+        self.check(size)
+        self.used += size
+
+    def add(self, key: str, raw: bytes):
+        if not key or not KEY_PATTERN.match(key) or len(key) > 253:
+            raise HTTPException(status_code=400, detail=f"Invalid ConfigMap key '{key}'")
+        if key in self.data or key in self.binary_data:
+            raise HTTPException(status_code=400, detail=f"Duplicate ConfigMap key '{key}'")
+        text = None
+        if b"\x00" not in raw:
+            try:
+                text = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        if text is not None:
+            self.data[key] = text
+            return
+        # Bytes were reserved while reading; binary values grow by a third once encoded
+        self.reserve(4 * ((len(raw) + 2) // 3) - len(raw))
+        self.binary_data[key] = base64.b64encode(raw).decode("ascii")
+
+
+async def read_upload(file: UploadFile, entries: Entries) -> bytes:
+    """Read ``file`` in chunks, failing with 413 as soon as it would not fit."""
+    if file.size is not None:
+        # Starlette knows the size of a spooled upload, reject it without reading
+        entries.check(file.size)
+    chunks: List[bytes] = []
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        entries.reserve(len(chunk))
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _is_archive(filename: Optional[str]) -> bool:
+    return bool(filename) and filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _read_member(stream, size: int, entries: Entries) -> bytes:
+    entries.reserve(size)
+    # Read one byte past the declared size so a lying header cannot overrun the budget
+    raw = stream.read(size + 1)
+    if len(raw) > size:
+        raise HTTPException(status_code=400, detail="Archive member is larger than declared")
+    return raw
+
+
+def _expand_archive(file: UploadFile, entries: Entries):
+    """Add every regular file of a zip or tar archive, keyed by its base name."""
+    fileobj = file.file
+    fileobj.seek(0)
+    try:
+        if file.filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    with archive.open(info) as member:
+                        entries.add(os.path.basename(info.filename), _read_member(member, info.file_size, entries))
+        else:
+            with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    stream = archive.extractfile(member)
+                    entries.add(os.path.basename(member.name), _read_member(stream, member.size, entries))
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise HTTPException(status_code=400, detail=f"Cannot read archive '{file.filename}': {e}")
+
+
+async def collect_entries(
+    content: Optional[str] = None,
+    filename: Optional[str] = None,
+    files: Optional[List[UploadFile]] = None,
+    extract: bool = False,
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Build ``(data, binary_data)`` from inline ``content`` and uploaded ``files``.
+
+    ``content`` and a single file are stored under ``filename`` (a file falls
+    back to its own name); further files use their own names. With ``extract``,
+    zip/tar uploads are expanded into one key per member.
+    """
+    entries = Entries()
+    files = [f for f in files or [] if f is not None]
+    if content is not None:
+        if not filename:
+            raise HTTPException(status_code=400, detail="'filename' is required with 'content'.")
+        raw = content.encode("utf-8")
+        entries.reserve(len(raw))
+        entries.add(filename, raw)
+    for index, file in enumerate(files):
+        if extract and _is_archive(file.filename):
+            await run_in_threadpool(_expand_archive, file, entries)
+            continue
+        key = filename if (filename and content is None and index == 0) else file.filename
+        entries.add(key, await read_upload(file, entries))
+    if not entries.data and not entries.binary_data:
+        raise HTTPException(status_code=400, detail="Either 'file', 'files' or 'content' must be provided.")
+    return entries.data, entries.binary_data
@@ -0,0 +1,122 @@
+# === write_dedup.py ===
+# Skips writes that would not change anything. Re-pushing identical content
+# still bumps resourceVersion and wakes every watcher, so update helpers skip a
+# write when they can tell, without calling the API server, that it is a no-op:
+# - the informer cache (when fresh) already holds the requested values, or
+# - the same content was written by this process to the same object within
+#   WRITE_DEDUP_TTL seconds and the informer has not seen a newer version since.
+# Otherwise the patch is sent as is: the write path never reads first.
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.helpers.metrics import WRITES
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Set to 0 to always write, e.g. to force a resourceVersion bump
+WRITE_DEDUP = os.getenv("WRITE_DEDUP", "1") == "1"
+# How long a remembered write can skip an identical one. A change made outside
+# this API is overwritten by the next identical push after that at the latest.
+WRITE_DEDUP_TTL = float(os.getenv("WRITE_DEDUP_TTL", "300"))
+# Objects remembered at once, least recently written dropped first
+WRITE_DEDUP_ENTRIES = int(os.getenv("WRITE_DEDUP_ENTRIES", "4096"))
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[str, int]] = {}
+# (kind, namespace, name) -> (content hash, resourceVersion written, result, expiry)
+_last_writes: "OrderedDict[Tuple[str, str, str], Tuple[str, Optional[str], dict, float]]" = OrderedDict()
+
+
+def content_hash(body: dict) -> str:
+    """Stable hash of a patch body: key order does not matter."""
+    return hashlib.sha256(json.dumps(body, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def remember_write(kind: str, namespace: str, name: str, digest: str, resource_version: Optional[str],
+                   result: dict):
+    """Record what was just written, so an identical write can be skipped."""
+    with _lock:
+        _last_writes[(kind, namespace, name)] = (digest, resource_version, result, time.monotonic() + WRITE_DEDUP_TTL)
+        _last_writes.move_to_end((kind, namespace, name))
+        while len(_last_writes) > WRITE_DEDUP_ENTRIES:
+            _last_writes.popitem(last=False)
+
+
+def forget_write(kind: str, namespace: str, name: str):
+    """Drop the remembered write, e.g. after the object was deleted or changed another way."""
+    with _lock:
+        _last_writes.pop((kind, namespace, name), None)
+
+
+def last_write(kind: str, namespace: str, name: str, digest: str, current=None,
+               expected_version: Optional[str] = None) -> Optional[dict]:
+    """Result of the last write when it wrote the same content and the object has not moved on since.
+
+    ``current`` is the cached object, if any: a resourceVersion other than the
+    one written means the object changed after that write. ``expected_version``
+    is the caller's precondition, which must match the version written.
+    """
+    with _lock:
+        entry = _last_writes.get((kind, namespace, name))
+        if entry is None:
+            return None
+        written_digest, written_version, result, expires = entry
+        if time.monotonic() >= expires:
+            del _last_writes[(kind, namespace, name)]
+            return None
+    if written_digest != digest:
+        return None
+    if current is not None and current.metadata.resource_version != written_version:
+        return None
+    if expected_version and expected_version != written_version:
+        return None
+    return result
+
+
+def configmap_unchanged(configmap, data: Dict[str, str], binary_data: Dict[str, str]) -> bool:
+    """True when writing ``data``/``binary_data`` would leave ``configmap`` as it is."""
+    current_data = configmap.data or {}
+    current_binary = configmap.binary_data or {}
+    # A key moving between data and binaryData is a change even with equal content
+    if any(k in current_binary for k in data) or any(k in current_data for k in binary_data):
+        return False
+    return all(current_data.get(k) == v for k, v in data.items()) \
+        and all(current_binary.get(k) == v for k, v in binary_data.items())
+
+
+def deployment_unchanged(deployment, update_data: dict, labels_to_remove: Optional[List[str]],
+                         container: Optional[str]) -> bool:
+    """True when patching ``deployment`` with ``update_data`` would not change it."""
+    labels = deployment.metadata.labels or {}
+    template_labels = deployment.spec.template.metadata.labels or {}
+    for key, value in (update_data.get("labels") or {}).items():
+        if labels.get(key) != value or template_labels.get(key) != value:
+            return False
+    for key in labels_to_remove or []:
+        if key in labels or key in template_labels:
+            return False
+    if update_data.get("replicas") is not None and update_data["replicas"] != deployment.spec.replicas:
+        return False
+    if update_data.get("image"):
+        images = {c.name: c.image for c in deployment.spec.template.spec.containers}
+        if images.get(container) != update_data["image"]:
+            return False
+    return True
+
+
+def record_write(kind: str, written: bool):
+    WRITES.labels(kind, "written" if written else "skipped").inc()
+    with _lock:
+        counters = _counters.setdefault(kind, {"written": 0, "skipped": 0})
+        counters["written" if written else "skipped"] += 1
+
+
+def dedup_stats() -> dict:
+    with _lock:
+        return {
+            "enabled": WRITE_DEDUP,
+            "remembered_writes": len(_last_writes),
+            "writes": {kind: dict(counters) for kind, counters in _counters.items()},
+        }
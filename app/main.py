@@ -1,18 +1,24 @@
 from app.configs.kube_loader import load_kube_config
 load_kube_config()
 
-from fastapi import FastAPI, Query, Path, Depends, HTTPException, Body
-from app.apis import auth, deployments, namespace, configmap, pods
+from fastapi import FastAPI, Query, Path, Depends, HTTPException, Body, Request, Response
+from typing import Optional
+from app.apis import auth, deployments, namespace, configmap, pods, diagnostics, watches, bulk, capacity
 
 app = FastAPI()
 
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.helpers import kube_helper
+from app.helpers import kube_helper, informer, kube_async
 from app.helpers.auth import get_current_user
+from app.helpers.responses import render, cached_not_modified
+from app.helpers.metrics import METRICS_ENABLED, MetricsMiddleware, render_metrics
 from app.db import database
 from kubernetes import client, config, watch
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 
 
@@ -30,35 +36,80 @@ app.include_router(configmap.router, tags=["ConfigMap"])
 
 app.include_router(pods.router, tags=["Pods"])
 
+app.include_router(diagnostics.router, tags=["Diagnostics"])
+
+app.include_router(watches.router, tags=["Watch"])
+
+app.include_router(bulk.router, tags=["Bulk"])
+
+app.include_router(capacity.router, tags=["Capacity"])
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.on_event("startup")
+def start_informers():
+    informer.start_informers()
+
+@app.on_event("shutdown")
+def stop_informers():
+    informer.stop_informers()
+    kube_async.shutdown_executor()
+
 
 @app.get("/services")
-def get_services(namespace: str = Query("default"), user=Depends(get_current_user)):
-    return kube_helper.list_services(namespace)
+def get_services(request: Request, response: Response, namespace: str = Query("default"), all_namespaces: bool = Query(False), fields: Optional[str] = Query(None), user=Depends(get_current_user)):
+    cached = cached_not_modified(request, "services")
+    if cached:
+        return cached
+    return render(kube_helper.list_services(None if all_namespaces else namespace, fields=fields), request=request, response=response)
 
 @app.get("/configmaps")
-def get_configmaps(namespace: str = Query("default"), user=Depends(get_current_user)):
-    return kube_helper.list_configmaps(namespace)
+def get_configmaps(request: Request, response: Response, namespace: str = Query("default"), all_namespaces: bool = Query(False), fields: Optional[str] = Query(None), user=Depends(get_current_user)):
+    cached = cached_not_modified(request, "configmaps")
+    if cached:
+        return cached
+    return render(kube_helper.list_configmaps(None if all_namespaces else namespace, fields=fields), request=request, response=response)
 
 @app.get("/secrets")
-def get_secrets(namespace: str = Query("default"), user=Depends(get_current_user)):
-    return kube_helper.list_secrets(namespace)
+def get_secrets(request: Request, response: Response, namespace: str = Query("default"), all_namespaces: bool = Query(False), fields: Optional[str] = Query(None), user=Depends(get_current_user)):
+    cached = cached_not_modified(request, "secrets")
+    if cached:
+        return cached
+    return render(kube_helper.list_secrets(None if all_namespaces else namespace, fields=fields), request=request, response=response)
 
 @app.get("/statefulsets")
-def get_statefulsets(namespace: str = Query("default"), user=Depends(get_current_user)):
-    return kube_helper.list_statefulsets(namespace)
+def get_statefulsets(request: Request, response: Response, namespace: str = Query("default"), fields: Optional[str] = Query(None), user=Depends(get_current_user)):
+    cached = cached_not_modified(request, "statefulsets")
+    if cached:
+        return cached
+    return render(kube_helper.list_statefulsets(namespace, fields=fields), request=request, response=response)
 
 @app.get("/jobs")
-def get_jobs(namespace: str = Query("default"), user=Depends(get_current_user)):
-    return kube_helper.list_jobs(namespace)
+def get_jobs(request: Request, response: Response, namespace: str = Query("default"), all_namespaces: bool = Query(False), fields: Optional[str] = Query(None), user=Depends(get_current_user)):
+    cached = cached_not_modified(request, "jobs")
+    if cached:
+        return cached
+    return render(kube_helper.list_jobs(None if all_namespaces else namespace, fields=fields), request=request, response=response)
 
 @app.get("/daemonsets")
-def get_daemonsets(namespace: str = Query("default"), user=Depends(get_current_user)):
-    return kube_helper.list_daemonsets(namespace)
+def get_daemonsets(request: Request, response: Response, namespace: str = Query("default"), fields: Optional[str] = Query(None), user=Depends(get_current_user)):
+    cached = cached_not_modified(request, "daemonsets")
+    if cached:
+        return cached
+    return render(kube_helper.list_daemonsets(namespace, fields=fields), request=request, response=response)
 
 @app.get("/pvs")
-def get_pvs(user=Depends(get_current_user)):
-    return kube_helper.list_persistent_volumes()
+def get_pvs(request: Request, response: Response, fields: Optional[str] = Query(None), user=Depends(get_current_user)):
+    return render(kube_helper.list_persistent_volumes(fields=fields), request=request, response=response)
 
 @app.get("/pvcs")
-def get_pvcs(namespace: str = Query("default"), user=Depends(get_current_user)):
-    return kube_helper.list_persistent_volume_claims(namespace)
+def get_pvcs(request: Request, response: Response, namespace: str = Query("default"), all_namespaces: bool = Query(False), fields: Optional[str] = Query(None), user=Depends(get_current_user)):
+    cached = cached_not_modified(request, "pvcs")
+    if cached:
+        return cached
+    return render(kube_helper.list_persistent_volume_claims(None if all_namespaces else namespace, fields=fields), request=request, response=response)
@@ -0,0 +1,45 @@
+from pydantic import BaseModel, Field, ValidationError, model_validator
+from typing import Optional, List, Literal
+from app.schemas.deployments import DeploymentUpdate
+
+# Satu operasi dalam batch bulk
+class BulkOperation(BaseModel):
+    op: Literal["create", "patch", "delete", "scale"]
+    kind: Literal["deployment", "configmap", "pod"]
+    name: str
+    namespace: str = "default"
+    body: Optional[dict] = None  # manifest untuk create, strategic merge patch untuk patch (DeploymentUpdate untuk deployment)
+    labels_to_remove: Optional[List[str]] = None  # untuk patch deployment
+    replicas: Optional[int] = Field(None, ge=0)  # untuk scale
+
+    @model_validator(mode="after")
+    def validate_operation(self) -> 'BulkOperation':
+        deployment_patch = self.op == "patch" and self.kind == "deployment"
+        if self.op in ("create", "patch") and not self.body and not (deployment_patch and self.labels_to_remove):
+            raise ValueError(f"'{self.op}' requires 'body'")
+        if self.labels_to_remove and not deployment_patch:
+            raise ValueError("'labels_to_remove' is only supported for deployment patches")
+        if deployment_patch and self.body:
+            # Same shape as PATCH /deployments/{name}
+            unknown = set(self.body) - set(DeploymentUpdate.model_fields)
+            if unknown:
+                raise ValueError(f"Unknown deployment update fields {sorted(unknown)}")
+            try:
+                DeploymentUpdate.model_validate(self.body)
+            except ValidationError as e:
+                raise ValueError(str(e))
+        if self.op == "scale":
+            if self.kind != "deployment":
+                raise ValueError("'scale' is only supported for deployments")
+            if self.replicas is None:
+                raise ValueError("'scale' requires 'replicas'")
+        return self
+
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation]
+    concurrency: Optional[int] = Field(None, ge=1, le=64)
+    # "namespace": operasi dalam satu namespace dijalankan berurutan
+    # "object": hanya operasi pada objek yang sama yang berurutan
+    ordering: Literal["namespace", "object"] = "object"
+    dry_run: bool = False
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from fastapi import UploadFile
 
 # Schema untuk menerima payload ketika membuat ConfigMap dengan file
@@ -19,6 +19,8 @@ class ConfigMapResponse(BaseModel):
     name: str
     namespace: str
     data: Dict[str, str]
+    binary_keys: List[str] = []  # key yang disimpan di binaryData (konten non-UTF-8)
+    written: bool = True  # False jika konten sama dan tidak ada write ke API
     message: str
 
 # schemas/configmap.py
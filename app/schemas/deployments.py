@@ -27,7 +27,9 @@ class DeploymentUpdate(BaseModel):
     replicas: Optional[int] = None
     image: Optional[str] = None
     labels: Optional[Dict[str, str]] = None
-    
+    container: Optional[str] = None  # container yang image-nya diubah, default container pertama
+    resource_version: Optional[str] = None  # precondition, 409 jika deployment sudah berubah
+
 
 
 # Model untuk response dari deployment
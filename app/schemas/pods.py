@@ -4,6 +4,7 @@ from datetime import datetime
 
 class PodInfo(BaseModel):
     name: str
+    namespace: Optional[str] = None
     status: str
     node_name: Optional[str]
     start_time: Optional[datetime]
@@ -12,8 +13,9 @@ class PodInfo(BaseModel):
     containers: List[str]
 
 class PodListResponse(BaseModel):
-    namespace: str
+    namespace: Optional[str]
     pods: List[PodInfo]
+    next_cursor: Optional[str] = None
 
 
 class EnvVar(BaseModel):
@@ -0,0 +1,580 @@
+"""Timings for the hot paths of the service, runnable without a cluster.
+
+    python -m benchmarks.hot_paths               # every case
+    python -m benchmarks.hot_paths pool login    # selected cases
+
+The API server and kubelet are replaced by an in-process HTTP server and the
+auth database by SQLite, so the numbers show the cost of this service's own
+code paths rather than of a real cluster.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+import asyncio
+import datetime
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/kubechef-bench.db")
+
+from kubernetes import client  # noqa: E402
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """Keep-alive HTTP server answering GETs and PATCHes with the body registered for the path."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.bodies: Dict[str, bytes] = {}
+        self.connections = 0
+        self.requests = 0
+        self.latency = 0.0  # seconds each request takes, like a real API server round trip
+        super().__init__(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; with Nagle on, delayed ACKs add ~40 ms per response
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = self.server.bodies.get(self.path.split("?", 1)[0])
+        if body is None:
+            self.send_error(404)
+            return
+        # A callable body returns (length, chunks) and is generated while it is sent
+        length, chunks = body() if callable(body) else (len(body), [body])
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain" if self.path.split("?", 1)[0].endswith("/log") else "application/json")
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(chunk)
+
+    def do_PATCH(self):
+        # The patch is not applied: the registered object is returned as the updated one
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+_api_server: Optional[FakeApiServer] = None
+
+
+def api_server() -> FakeApiServer:
+    """The fake API server, made the kubernetes client's default before app helpers are imported."""
+    global _api_server
+    if _api_server is None:
+        _api_server = FakeApiServer()
+        configuration = client.Configuration()
+        configuration.host = _api_server.url
+        client.Configuration.set_default(configuration)
+    return _api_server
+
+
+def percentiles(samples) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered) * 1000:.3f} ms, p99 {p99 * 1000:.3f} ms"
+
+
+CASES: Dict[str, Callable[[], None]] = {}
+
+
+def case(func):
+    CASES[func.__name__.replace("bench_", "")] = func
+    return func
+
+
+POD = json.dumps({"apiVersion": "v1", "kind": "Pod", "metadata": {"name": "web", "namespace": "default"}}).encode()
+
+
+@case
+def bench_pool():
+    """Connection setups per 1k API calls: shared pooled client against a client per call."""
+    server = api_server()
+    server.bodies["/api/v1/namespaces/default/pods/web"] = POD
+    from app.configs.kube_client import get_api_client, pool_stats
+
+    calls, threads = 2000, 16
+    shared = client.CoreV1Api(get_api_client())
+
+    def per_call_client(_):
+        # What helpers did before: a fresh CoreV1Api (and connection pool) per request
+        api = client.CoreV1Api(client.ApiClient(client.Configuration.get_default_copy()))
+        api.read_namespaced_pod("web", "default")
+
+    for label, call in (
+        ("client per call", per_call_client),
+        ("shared client", lambda _: shared.read_namespaced_pod("web", "default")),
+    ):
+        server.connections = server.requests = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(call, range(calls)))
+        elapsed = time.perf_counter() - started
+        print(f"  {label:16} {server.connections * 1000 / server.requests:7.1f} connections/1k requests, "
+              f"{calls / elapsed:7.0f} requests/s")
+    # The same ratio as /diagnostics/k8s-pool reports it, to check it against the server's count
+    stats = pool_stats()
+    print(f"  pool_stats()     {stats['connections_per_1k_requests']:7.1f} connections/1k requests "
+          f"({stats['connections_created']} connections, {stats['requests']} requests, maxsize {stats['maxsize']})")
+
+
+CONFIGMAP = json.dumps({"apiVersion": "v1", "kind": "ConfigMap", "data": {"app.conf": "port=80"},
+                        "metadata": {"name": "app", "namespace": "default", "resourceVersion": "1"}}).encode()
+
+
+@case
+def bench_configmap():
+    """Concurrent configmap reads and updates on one event loop: through run_k8s against calling the client inline."""
+    server = api_server()
+    server.bodies["/api/v1/namespaces/default/configmaps/app"] = CONFIGMAP
+    latency = float(os.getenv("BENCH_API_LATENCY", "0.02"))
+    server.latency = latency
+    from app.helpers import configmap
+    from app.helpers.kube_async import K8S_EXECUTOR_WORKERS
+
+    async def inline(i):
+        # What the handlers did before: the blocking client called on the event loop
+        if i % 2:
+            configmap.core_v1.read_namespaced_config_map("app", "default")
+        else:
+            configmap.core_v1.patch_namespaced_config_map("app", "default", {"data": {"n": str(i)}})
+
+    async def through_executor(i):
+        if i % 2:
+            await configmap.get_config_map("default", "app")
+        else:
+            # Different content each time, so no update is skipped as a no-op
+            await configmap.update_config_map("default", "app", {"n": str(i)})
+
+    requests = 200
+
+    async def run(call):
+        # Every request arrives at once; latency is until its own response
+        latencies = []
+
+        async def timed(i):
+            await call(i)
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(timed(i) for i in range(requests)))
+        return requests / (time.perf_counter() - started), latencies
+
+    try:
+        for label, call in (("inline", inline), ("run_k8s", through_executor)):
+            throughput, latencies = asyncio.run(run(call))
+            print(f"  {label:8} {throughput:6.0f} requests/s, {percentiles(latencies)}")
+    finally:
+        server.latency = 0.0
+    print(f"  ({requests} concurrent requests, {latency * 1000:.0f} ms per API call, "
+          f"{K8S_EXECUTOR_WORKERS} executor threads)")
+
+
+@case
+def bench_login():
+    """List-request latency during a login burst, bcrypt on the request threadpool against its own pool."""
+    from fastapi import HTTPException
+    from fastapi.concurrency import run_in_threadpool
+    from app.helpers import auth
+
+    logins, lists = 64, 200
+    hashed = auth.hash_password("secret")
+
+    def list_handler():
+        # Stand-in for a sync list endpoint: a little CPU work on the request threadpool
+        return sum(range(20000))
+
+    async def run(login):
+        latencies, rejected = [], 0
+
+        async def one_login():
+            nonlocal rejected
+            try:
+                await login()
+            except HTTPException:
+                rejected += 1
+
+        started = time.perf_counter()
+        burst = [asyncio.create_task(one_login()) for _ in range(logins)]
+        await asyncio.sleep(0)
+        for _ in range(lists):
+            began = time.perf_counter()
+            await run_in_threadpool(list_handler)
+            latencies.append(time.perf_counter() - began)
+        await asyncio.gather(*burst)
+        elapsed = time.perf_counter() - started
+        return latencies, rejected, elapsed
+
+    for label, login in (
+        ("shared threadpool", lambda: run_in_threadpool(auth.verify_password, "secret", hashed)),
+        ("bcrypt pool", lambda: auth.verify_and_update_password("secret", hashed)),
+    ):
+        latencies, rejected, elapsed = asyncio.run(run(login))
+        print(f"  {label:18} list {percentiles(latencies)}; "
+              f"{logins - rejected} logins in {elapsed:.2f}s, {rejected} rejected with 429")
+
+
+@case
+def bench_user_lookup():
+    """Login user lookups with 50 in flight, against the database and from the user cache."""
+    from app.db.database import Base, SessionLocal, engine
+    from app.helpers import auth
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if auth._get_user(db, "bench") is None:
+        auth._create_user(db, "bench", "hash")
+    rounds, concurrency = 40, 50
+
+    async def run(cached: bool):
+        latencies = []
+
+        async def lookup():
+            if not cached:
+                auth.invalidate_user("bench")
+            # Each request gets its own session from the pool, as with Depends(get_db)
+            session = SessionLocal()
+            began = time.perf_counter()
+            try:
+                await auth.get_user(session, "bench")
+            finally:
+                latencies.append(time.perf_counter() - began)
+                session.close()
+
+        for _ in range(rounds):
+            await asyncio.gather(*(lookup() for _ in range(concurrency)))
+        return latencies
+
+    for label, cached in (("database", False), ("user cache", True)):
+        latencies = asyncio.run(run(cached))
+        print(f"  {label:10} {percentiles(latencies)}")
+    db.close()
+
+
+def pod_models(count: int) -> list:
+    return [
+        client.V1Pod(
+            metadata=client.V1ObjectMeta(name=f"web-{i}", namespace="default", resource_version=str(i),
+                                         labels={"app": "web", "pod-template-hash": "5d8f7c9b6"}),
+            spec=client.V1PodSpec(node_name=f"node-{i % 20}", containers=[
+                client.V1Container(name="app", image="registry.example.com/web:1.2.3"),
+                client.V1Container(name="proxy", image="envoyproxy/envoy:v1.29"),
+            ]),
+            status=client.V1PodStatus(phase="Running", host_ip=f"10.1.0.{i % 250}", pod_ip=f"10.2.{i // 250}.{i % 250}"),
+        )
+        for i in range(count)
+    ]
+
+
+@case
+def bench_projection():
+    """Pod list of 5k objects: payload size and project + serialize time, all fields against fields=name,status."""
+    from app.helpers.pods import POD_FIELDS
+    from app.helpers.projection import project, select_fields
+    from app.helpers.responses import render
+
+    pods = pod_models(5000)
+    for label, fields in (("all fields", None), ("name,status", "name,status")):
+        samples = []
+        for _ in range(10):
+            started = time.perf_counter()
+            selected = select_fields(fields, POD_FIELDS)
+            body = render({"pods": [project(pod, POD_FIELDS, selected) for pod in pods]}, raw=True).body
+            samples.append(time.perf_counter() - started)
+        print(f"  {label:12} {len(body) / 1024:7.0f} KB, {percentiles(samples)}")
+
+
+@case
+def bench_serialization():
+    """Per-item cost of serializing a 5k pod list: jsonable_encoder + json against orjson (FAST_JSON=1)."""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.helpers.pods import POD_FIELDS
+    from app.helpers.projection import project
+    from app.helpers.responses import FastJSONResponse
+
+    pods = pod_models(5000)
+    for pod in pods:
+        pod.status.start_time = datetime.datetime(2024, 5, 1, 12, 0, tzinfo=datetime.timezone.utc)
+    content = {"pods": [project(pod, POD_FIELDS) for pod in pods]}
+    for label, respond in (
+        ("standard", lambda: JSONResponse(jsonable_encoder(content))),
+        ("orjson", lambda: FastJSONResponse(content)),
+    ):
+        samples = []
+        for _ in range(10):
+            started = time.perf_counter()
+            body = respond().body
+            samples.append(time.perf_counter() - started)
+        print(f"  {label:8} {statistics.median(samples) / len(pods) * 1e6:6.2f} µs/item, {len(body) / 1024:.0f} KB")
+
+
+@case
+def bench_metrics():
+    """Overhead per request of MetricsMiddleware, and per call of the instrumented API proxy."""
+    from app.configs.kube_client import InstrumentedApi
+    from app.helpers.metrics import MetricsMiddleware
+
+    requests = 50_000
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def run(asgi):
+        scope = {"type": "http", "method": "GET", "path": "/pods"}
+        started = time.perf_counter()
+        for _ in range(requests):
+            await asgi(dict(scope), receive, send)
+        return time.perf_counter() - started
+
+    bare = asyncio.run(run(app))
+    with_metrics = asyncio.run(run(MetricsMiddleware(app)))
+    print(f"  middleware {(with_metrics - bare) / requests * 1e6:6.2f} µs/request "
+          f"({bare / requests * 1e6:.2f} µs bare, {with_metrics / requests * 1e6:.2f} µs with metrics)")
+
+    class Api:
+        def read_namespaced_pod(self, name, namespace):
+            return name
+
+    calls = 200_000
+    for label, api in (("direct", Api()), ("instrumented", InstrumentedApi(Api()))):
+        started = time.perf_counter()
+        for _ in range(calls):
+            api.read_namespaced_pod("web", "default")
+        print(f"  {label:12} {(time.perf_counter() - started) / calls * 1e6:6.2f} µs/call")
+
+
+def log_body(lines: int, width: int = 100) -> bytes:
+    line = "x" * (width - 42)
+    return "".join(f"2024-05-01T12:00:00.{i:09d}Z {i:08d} {line}\n" for i in range(lines)).encode()
+
+
+def peak_rss_mb() -> float:
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@case
+def bench_log_download():
+    """Peak memory of a non-follow log download: streamed from the upstream body against read whole."""
+    size_mb = int(os.getenv("BENCH_LOG_MB", "200"))
+    block = log_body(10_000)
+    blocks = size_mb * 1024 * 1024 // len(block)
+    api_server().bodies["/api/v1/namespaces/default/pods/big/log"] = lambda: (
+        len(block) * blocks, (block for _ in range(blocks))
+    )
+    from app.helpers import pods
+
+    async def streamed():
+        total = 0
+        body = await pods.get_pod_logs("big", "default", format="text")
+        async for chunk in body:
+            total += len(chunk)
+        return total
+
+    def read_whole():
+        # The previous implementation: the whole log as one string, then split into a list
+        log = pods.core_v1.read_namespaced_pod_log("big", "default")
+        log.strip().split("\n")
+        return len(log)
+
+    # ru_maxrss only grows, so the streamed path runs first
+    for label, run in (("streamed", lambda: asyncio.run(streamed())), ("read whole", read_whole)):
+        before = peak_rss_mb()
+        started = time.perf_counter()
+        received = run()
+        elapsed = time.perf_counter() - started
+        print(f"  {label:10} {received / 2 ** 20:.0f} MB in {elapsed:.2f}s, peak RSS +{peak_rss_mb() - before:.0f} MB")
+
+
+@case
+def bench_log_search():
+    """Server-side log search over 50 MB: sparse matches against a match on every 10th line."""
+    lines = 500_000
+    body = log_body(lines)
+    chunk = 64 * 1024
+
+    async def stream_chunks(path, query=None):
+        for start in range(0, len(body), chunk):
+            yield body[start:start + chunk]
+
+    from app.helpers import kube_async, pods
+    kube_async.stream_chunks = stream_chunks
+
+    async def run(pattern):
+        results = await pods.search_pod_logs("default", "web", pods.compile_log_matcher(pattern, None))
+        async for last in results:
+            pass
+        return json.loads(last)["summary"]
+
+    for label, pattern in (("sparse", r" 0042\d{4} "), ("every 10th", r"0Z \d{7}0 ")):
+        summary = asyncio.run(run(pattern))
+        print(f"  {label:10} {summary['mb_per_second']:7.1f} MB/s, {summary['matches']} matches "
+              f"in {summary['lines_scanned']} lines")
+
+
+def serve_app(app) -> str:
+    """Run an ASGI app with uvicorn on a background thread, return its base URL."""
+    import socket
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+@case
+def bench_log_stream():
+    """Followed log delivery of 200k lines (20 MB): chunked text stream against batched WebSocket frames."""
+    lines = 200_000
+    api_server().bodies["/api/v1/namespaces/default/pods/web/log"] = log_body(lines)
+    from http.client import HTTPConnection
+    from fastapi import FastAPI
+    from websockets.sync.client import connect
+    from app.apis import pods as pod_routes
+    from app.helpers import auth
+
+    app = FastAPI()
+    app.include_router(pod_routes.router)
+    address = serve_app(app)
+    token = auth.create_access_token({"sub": "bench"})
+
+    def text_stream():
+        connection = HTTPConnection(address)
+        connection.request("GET", "/pods/default/web/logs/stream", headers={"Authorization": f"Bearer {token}"})
+        response = connection.getresponse()
+        received = dropped = 0
+        for line in response:
+            if line.startswith(b"..."):
+                dropped += int(line.split()[1])
+            else:
+                received += 1
+        return received, dropped
+
+    def websocket_stream():
+        received = dropped = 0
+        with connect(f"ws://{address}/pods/default/web/logs/ws?token={token}", max_size=None) as websocket:
+            for message in websocket:
+                frame = json.loads(message)
+                if frame.get("event") == "end":
+                    break
+                received += len(frame.get("lines", ()))
+                dropped += frame.get("dropped", 0)
+        return received, dropped
+
+    for label, stream in (("text stream", text_stream), ("websocket", websocket_stream)):
+        started = time.perf_counter()
+        received, dropped = stream()
+        elapsed = time.perf_counter() - started
+        print(f"  {label:12} {received / elapsed:9.0f} lines/s, {received} delivered, {dropped} dropped "
+              f"(hub buffer {os.getenv('LOG_HUB_BUFFER', '2000')} lines)")
+
+
+def capacity_lists(pods: int, namespaces: int, nodes: int) -> Dict[str, bytes]:
+    """Raw list bodies for the capacity report, with the few distinct request values real clusters have."""
+    sizes = [("100m", "128Mi", "500m", "512Mi"), ("250m", "256Mi", "1", "1Gi"), ("1", "2Gi", "2", "4Gi")]
+    items = []
+    for i in range(pods):
+        cpu, memory, cpu_limit, memory_limit = sizes[i % len(sizes)]
+        app = {"name": "app", "resources": {"requests": {"cpu": cpu, "memory": memory},
+                                            "limits": {"cpu": cpu_limit, "memory": memory_limit}}}
+        # Every 10th pod has a sidecar without requests, every 20th an init container
+        spec = {"containers": [app, {"name": "sidecar", "resources": {}}] if i % 10 == 0 else [app]}
+        if i % 20 == 0:
+            spec["initContainers"] = [{"name": "init", "resources": {"requests": {"cpu": "2", "memory": "64Mi"}}}]
+        items.append({"metadata": {"name": f"pod-{i}", "namespace": f"ns-{i % namespaces}"}, "spec": spec,
+                      "status": {"phase": "Running"}})
+    node_items = [{"metadata": {"name": f"node-{i}"}, "spec": {},
+                   "status": {"allocatable": {"cpu": "64", "memory": "256Gi", "pods": "250"}}} for i in range(nodes)]
+    quotas = [{"metadata": {"name": "quota", "namespace": f"ns-{i}"},
+               "status": {"hard": {"requests.cpu": "100", "requests.memory": "200Gi"},
+                          "used": {"requests.cpu": f"{i % 100}", "requests.memory": f"{i % 200}Gi"}}}
+              for i in range(namespaces)]
+    limit_ranges = [{"metadata": {"name": "limits", "namespace": f"ns-{i}"}, "spec": {"limits": []}}
+                    for i in range(0, namespaces, 2)]
+
+    def listing(kind, objects):
+        return json.dumps({"apiVersion": "v1", "kind": kind, "metadata": {"resourceVersion": "1"},
+                           "items": objects}).encode()
+
+    return {
+        "/api/v1/nodes": listing("NodeList", node_items),
+        "/api/v1/pods": listing("PodList", items),
+        "/api/v1/resourcequotas": listing("ResourceQuotaList", quotas),
+        "/api/v1/limitranges": listing("LimitRangeList", limit_ranges),
+    }
+
+
+@case
+def bench_capacity():
+    """Capacity report over 50k pods in 1k namespaces: raw JSON lists against the pod list as models."""
+    pods = int(os.getenv("BENCH_CAPACITY_PODS", "50000"))
+    namespaces = int(os.getenv("BENCH_CAPACITY_NAMESPACES", "1000"))
+    server = api_server()
+    server.bodies.update(capacity_lists(pods, namespaces, nodes=500))
+    from app.helpers import capacity
+    from app.helpers.quantity import parse_quantity
+
+    # The first run parses every distinct quantity string, later runs hit the memoized parser
+    for label in ("cold", "warm"):
+        if label == "cold":
+            parse_quantity.cache_clear()
+        started = time.perf_counter()
+        report = asyncio.run(capacity.capacity_report())
+        elapsed = time.perf_counter() - started
+        timing = report["timing_ms"]
+        print(f"  raw JSON ({label})  {elapsed:6.2f}s: fetch {timing['fetch'] / 1000:.2f}s, "
+              f"compute {timing['compute'] / 1000:.2f}s ({report['cluster']['pods']} pods, {len(report['namespaces'])} namespaces)")
+
+    # What a model-based report would pay before aggregating anything
+    started = time.perf_counter()
+    listed = capacity.core_v1.list_pod_for_all_namespaces(field_selector=capacity.ACTIVE_PODS)
+    print(f"  models (pods only) {time.perf_counter() - started:6.2f}s for {len(listed.items)} pods, no aggregation")
+
+
+def main(argv):
+    names = argv or list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        sys.exit(f"Unknown cases {unknown}. Available: {list(CASES)}")
+    for name in names:
+        print(f"{name}: {CASES[name].__doc__}")
+        CASES[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,7 @@
+# Tests run without a cluster or a database server: the kubernetes client is
+# never configured and the auth database is an in-memory SQLite stand-in.
+# These have to be set before any app module reads them at import time.
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
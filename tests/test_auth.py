@@ -0,0 +1,128 @@
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+from app.helpers import auth
+import asyncio
+import pytest
+import threading
+
+
+def test_password_job_rejected_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(auth, "_hash_slots", threading.BoundedSemaphore(1))
+    auth._hash_slots.acquire()
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(auth.hash_password_async("secret"))
+    assert error.value.status_code == 429
+    assert error.value.headers == {"Retry-After": "1"}
+
+
+def test_verify_rehashes_outdated_cost():
+    old_hash = bcrypt.using(rounds=auth.BCRYPT_ROUNDS + 1).hash("secret")
+    valid, new_hash = asyncio.run(auth.verify_and_update_password("secret", old_hash))
+    assert valid
+    assert new_hash is not None and auth.verify_password("secret", new_hash)
+    assert asyncio.run(auth.verify_and_update_password("secret", new_hash)) == (True, None)
+
+
+def test_verify_rejects_wrong_password():
+    hashed = auth.hash_password("secret")
+    assert asyncio.run(auth.verify_and_update_password("wrong", hashed)) == (False, None)
+
+
+@pytest.fixture
+def db():
+    from app.db.database import Base, SessionLocal, engine
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+    auth.invalidate_user()
+
+
+def _cached_user(db, username):
+    user = auth.User(username=username, hashed_password="old")
+    db.add(user)
+    db.commit()
+    auth._cache_user(auth.UserRecord(user.id, username, "old"))
+    return user
+
+
+def test_user_cache_dropped_when_user_is_deleted(db):
+    user = _cached_user(db, "alice")
+    db.delete(user)
+    db.commit()
+    assert "alice" not in auth._user_cache
+
+
+def test_user_cache_dropped_when_password_changes(db):
+    user = _cached_user(db, "alice")
+    user.hashed_password = "new"
+    db.commit()
+    assert "alice" not in auth._user_cache
+
+
+def test_user_cache_cleared_by_bulk_update(db):
+    _cached_user(db, "alice")
+    db.execute(auth.update(auth.User).values(hashed_password="new"))
+    db.commit()
+    assert auth._user_cache == {}
+
+
+def test_async_database_url():
+    from app.db.database import async_database_url
+    assert async_database_url("postgresql://u:p@db:5432/kubechef") == "postgresql+asyncpg://u:p@db:5432/kubechef"
+    assert async_database_url("sqlite:///./kubechef.db") == "sqlite+aiosqlite:///./kubechef.db"
+    assert async_database_url("mysql://u@db/kubechef") is None
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    monkeypatch.setattr(auth, "_token_cache", type(auth._token_cache)())
+    monkeypatch.setattr(auth, "_token_cache_stats", {"hits": 0, "misses": 0})
+    decoded = []
+    decode = auth.jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: decoded.append(args[0]) or decode(*args, **kwargs))
+    return decoded
+
+
+def test_repeated_token_is_verified_once(tokens):
+    token = auth.create_access_token({"sub": "alice"})
+    assert auth.verify_token(token)["sub"] == "alice"
+    assert auth.verify_token(token)["sub"] == "alice"
+    assert tokens == [token]
+    assert auth.token_cache_stats() == {"size": 1, "max_size": auth.TOKEN_CACHE_SIZE, "hits": 1, "misses": 1}
+
+
+def test_cached_token_expires_with_its_exp(tokens, monkeypatch):
+    token = auth.create_access_token({"sub": "alice"})
+    auth.verify_token(token)
+    exp = auth._token_cache[token][1]
+    # Past exp the cache no longer vouches for the token: it is verified again (jose rejects it for real)
+    monkeypatch.setattr(auth.time, "time", lambda: exp + 1)
+    auth.verify_token(token)
+    assert tokens == [token, token]
+    assert auth.token_cache_stats()["hits"] == 0
+
+
+def test_least_recently_used_token_is_evicted(tokens, monkeypatch):
+    monkeypatch.setattr(auth, "TOKEN_CACHE_SIZE", 2)
+    first, second, third = (auth.create_access_token({"sub": name}) for name in ("a", "b", "c"))
+    auth.verify_token(first)
+    auth.verify_token(second)
+    auth.verify_token(first)  # second is now the oldest
+    auth.verify_token(third)
+    assert list(auth._token_cache) == [first, third]
+
+
+def test_tokens_are_dropped_when_their_user_changes(db, tokens):
+    user = _cached_user(db, "alice")
+    alice, bob = auth.create_access_token({"sub": "alice"}), auth.create_access_token({"sub": "bob"})
+    auth.verify_token(alice)
+    auth.verify_token(bob)
+    user.hashed_password = "new"
+    db.commit()
+    assert list(auth._token_cache) == [bob]
+    db.delete(user)
+    db.commit()
+    db.execute(auth.update(auth.User).values(hashed_password="newer"))
+    assert auth._token_cache == {}
@@ -0,0 +1,52 @@
+from fastapi import HTTPException
+from pydantic import ValidationError
+from app.helpers import bulk
+from app.schemas.bulk import BulkOperation, BulkRequest
+import asyncio
+import json
+import pytest
+
+
+def _run(batch):
+    async def main():
+        return [json.loads(line) async for line in bulk.run_batch(batch)]
+    return asyncio.run(main())
+
+
+def test_default_ordering_is_per_object():
+    batch = BulkRequest(operations=[
+        {"op": "delete", "kind": "pod", "name": "a"},
+        {"op": "delete", "kind": "pod", "name": "b"},
+    ])
+    assert batch.ordering == "object"
+
+
+def test_deployment_patch_uses_the_update_shape():
+    BulkOperation(op="patch", kind="deployment", name="web", body={"replicas": 3, "image": "web:2"})
+    BulkOperation(op="patch", kind="deployment", name="web", labels_to_remove=["tier"])
+    for body in ({"spec": {"replicas": 3}}, {"replicas": "many"}):
+        with pytest.raises(ValidationError):
+            BulkOperation(op="patch", kind="deployment", name="web", body=body)
+    with pytest.raises(ValidationError):
+        BulkOperation(op="patch", kind="configmap", name="cfg", body={"data": {}}, labels_to_remove=["tier"])
+
+
+def test_deployment_patch_goes_through_patch_deployment(monkeypatch):
+    calls = []
+
+    def fake_patch_deployment(name, namespace, update_data, labels_to_remove=None, dry_run=False):
+        calls.append((name, namespace, update_data, labels_to_remove, dry_run))
+        if name == "missing":
+            raise HTTPException(status_code=404, detail="Not Found")
+        return {"written": False}
+
+    monkeypatch.setattr(bulk, "patch_deployment", fake_patch_deployment)
+    results = _run(BulkRequest(dry_run=True, operations=[
+        {"op": "patch", "kind": "deployment", "name": "web", "body": {"replicas": 2}, "labels_to_remove": ["x"]},
+        {"op": "patch", "kind": "deployment", "name": "missing", "body": {"replicas": 2}},
+    ]))
+    by_name = {result["name"]: result for result in results[:-1]}
+    assert by_name["web"]["status"] == "ok" and by_name["web"]["written"] is False
+    assert by_name["missing"]["code"] == 404
+    assert ("web", "default", {"replicas": 2}, ["x"], True) in calls
+    assert results[-1]["summary"]["failed"] == 1
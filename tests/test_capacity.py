@@ -0,0 +1,48 @@
+from app.helpers.capacity import _pod_resources
+
+
+def _container(requests=None, limits=None):
+    resources = {}
+    if requests:
+        resources["requests"] = requests
+    if limits:
+        resources["limits"] = limits
+    return {"name": "c", "resources": resources}
+
+
+def test_containers_are_summed():
+    requests, limits, unbounded = _pod_resources({"containers": [
+        _container({"cpu": "250m", "memory": "64Mi"}, {"cpu": "1"}),
+        _container({"cpu": "500m"}, {"cpu": "500m", "memory": "1Gi"}),
+    ]})
+    assert requests == {"cpu": 0.75, "memory": 64 * 2 ** 20}
+    assert limits == {"cpu": 1.5, "memory": 2 ** 30}
+    assert unbounded == 0
+
+
+def test_largest_init_container_wins_when_bigger_than_the_sum():
+    requests, _, _ = _pod_resources({
+        "containers": [_container({"cpu": "100m", "memory": "1Gi"})],
+        "initContainers": [_container({"cpu": "2", "memory": "128Mi"}), _container({"cpu": "1"})],
+    })
+    assert requests == {"cpu": 2.0, "memory": 2 ** 30}
+
+
+def test_overhead_is_added():
+    requests, limits, _ = _pod_resources({
+        "containers": [_container({"cpu": "1"}, {"cpu": "2"})],
+        "overhead": {"cpu": "250m"},
+    })
+    assert requests["cpu"] == 1.25
+    assert limits["cpu"] == 2.25
+
+
+def test_containers_without_requests_are_counted():
+    requests, _, unbounded = _pod_resources({"containers": [
+        {"name": "bare"},
+        _container(limits={"cpu": "1"}),
+        _container({"cpu": "1", "memory": "oops"}),
+    ]})
+    assert unbounded == 2
+    # Malformed quantities are skipped, not fatal
+    assert requests == {"cpu": 1.0}
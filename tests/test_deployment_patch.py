@@ -0,0 +1,75 @@
+from kubernetes import client
+from app.helpers import configmap, deployment
+import asyncio
+import pytest
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record patches instead of sending them, answering with a minimal deployment."""
+    calls = []
+
+    def fake_patch(name, namespace, body, **kwargs):
+        calls.append((body, kwargs))
+        return client.V1Deployment(
+            metadata=client.V1ObjectMeta(name=name, namespace=namespace),
+            spec=client.V1DeploymentSpec(
+                replicas=2,
+                selector=client.V1LabelSelector(),
+                template=client.V1PodTemplateSpec(
+                    metadata=client.V1ObjectMeta(),
+                    spec=client.V1PodSpec(containers=[client.V1Container(name="app", image="web:1")]),
+                ),
+            ),
+        )
+
+    monkeypatch.setattr(deployment, "WRITE_DEDUP", False)
+    monkeypatch.setattr(deployment.apps_v1, "patch_namespaced_deployment", fake_patch)
+    return calls
+
+
+def test_update_is_sent_as_strategic_merge_patch(sent):
+    deployment.patch_deployment("web", "default", {"replicas": 2, "resource_version": "7"}, ["tier"])
+    body, kwargs = sent[0]
+    assert kwargs["_content_type"] == "application/strategic-merge-patch+json"
+    assert body["metadata"] == {"labels": {"tier": None}, "resourceVersion": "7"}
+    assert body["spec"]["replicas"] == 2
+
+
+def test_label_removal_is_sent_as_strategic_merge_patch(sent):
+    deployment.remove_deployment_labels("web", "default", ["tier"])
+    body, kwargs = sent[0]
+    assert kwargs["_content_type"] == "application/strategic-merge-patch+json"
+    assert body["spec"]["template"]["metadata"]["labels"] == {"tier": None}
+
+
+class RecordingApi:
+    """Records the name of every API method called, whatever it is."""
+
+    def __init__(self, answer):
+        self.calls = []
+        self.answer = answer
+
+    def __getattr__(self, method):
+        return lambda *args, **kwargs: self.calls.append(method) or self.answer
+
+
+def test_each_update_is_one_patch_and_no_read(monkeypatch):
+    # Round trips per update with dedup off: one patch each, nothing read first
+    apps = RecordingApi(client.V1Deployment(
+        metadata=client.V1ObjectMeta(name="web"),
+        spec=client.V1DeploymentSpec(selector=client.V1LabelSelector(), template=client.V1PodTemplateSpec(
+            metadata=client.V1ObjectMeta(), spec=client.V1PodSpec(containers=[client.V1Container(name="app")]))),
+    ))
+    monkeypatch.setattr(deployment, "WRITE_DEDUP", False)
+    monkeypatch.setattr(deployment, "apps_v1", apps)
+    deployment.patch_deployment("web", "default", {"replicas": 3, "image": "web:2", "container": "app",
+                                                   "labels": {"tier": "front"}, "resource_version": "7"})
+    deployment.remove_deployment_labels("web", "default", ["tier"])
+    assert apps.calls == ["patch_namespaced_deployment"] * 2
+
+    core = RecordingApi(client.V1ConfigMap(metadata=client.V1ObjectMeta(name="cfg")))
+    monkeypatch.setattr(configmap, "WRITE_DEDUP", False)
+    monkeypatch.setattr(configmap, "core_v1", core)
+    asyncio.run(configmap.update_config_map("default", "cfg", {"a": "1"}, resource_version="8"))
+    assert core.calls == ["patch_namespaced_config_map"]
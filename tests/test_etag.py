@@ -0,0 +1,38 @@
+from starlette.requests import Request
+from app.helpers.projection import Versioned
+from app.helpers.responses import etag, not_modified, render
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_etag_is_weak_and_needs_a_version():
+    assert etag("42") == 'W/"42"'
+    assert etag(None) is None
+    assert etag("") is None
+
+
+def test_matching_tag_returns_304():
+    response = not_modified(_request('W/"42"'), "42")
+    assert response.status_code == 304
+    assert response.headers["etag"] == 'W/"42"'
+
+
+def test_tag_in_list_and_wildcard_match():
+    assert not_modified(_request('W/"1", W/"42" ,W/"7"'), "42").status_code == 304
+    assert not_modified(_request("*"), "42").status_code == 304
+
+
+def test_stale_missing_or_unversioned_is_served():
+    assert not_modified(_request('W/"41"'), "42") is None
+    assert not_modified(_request(), "42") is None
+    assert not_modified(_request("*"), None) is None
+
+
+def test_render_sets_etag_or_short_circuits():
+    content = Versioned({"name": "web"}, "42")
+    response = render(content, raw=True)
+    assert response.headers["etag"] == 'W/"42"'
+    assert render(content, raw=True, request=_request('W/"42"')).status_code == 304
@@ -0,0 +1,60 @@
+from datetime import datetime
+from dateutil.tz import tzutc
+from fastapi import FastAPI
+from kubernetes import client
+from app.apis import pods as pods_api
+from app.helpers import pods, responses
+from app.helpers.informer import Listing
+import asyncio
+import pytest
+
+
+def _pod(name):
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=name, namespace="default"),
+        spec=client.V1PodSpec(node_name="node-1", containers=[client.V1Container(name="app")]),
+        status=client.V1PodStatus(phase="Running", start_time=datetime(2024, 5, 1, 12, 0, tzinfo=tzutc()),
+                                  pod_ip="10.0.0.7"),
+    )
+
+
+app = FastAPI()
+app.include_router(pods_api.router)
+
+
+def _get(path, query=b""):
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": query, "headers": [], "scheme": "http", "server": ("test", 80),
+             "client": ("test", 1), "http_version": "1.1"}
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    asyncio.run(app(scope, receive, send))
+    return b"".join(body)
+
+
+@pytest.fixture
+def cluster(monkeypatch):
+    monkeypatch.setattr(pods, "list_objects", lambda *args, **kwargs: Listing([_pod("web-1"), _pod("web-2")],
+                                                                              resource_version="7"))
+    monkeypatch.setattr(pods.core_v1, "read_namespaced_pod", lambda name, namespace: _pod(name))
+
+
+@pytest.mark.parametrize("path, query", [
+    ("/pods/default", b""),
+    ("/pods/default", b"fields=name,start_time"),
+    ("/pods/default/web-1", b""),
+    ("/pods/default/web-1", b"fields=start_time,containers"),
+])
+def test_fast_json_sends_the_same_bytes(cluster, monkeypatch, path, query):
+    monkeypatch.setattr(responses, "FAST_JSON", False)
+    standard = _get(path, query)
+    monkeypatch.setattr(responses, "FAST_JSON", True)
+    assert _get(path, query) == standard
+    assert b"2024-05-01T12:00:00" in standard
@@ -0,0 +1,107 @@
+from kubernetes import client
+from app.helpers import informer
+from app.helpers.informer import Informer, list_objects
+import pytest
+import time
+
+
+def _pod(name, resource_version="1", namespace="default"):
+    return client.V1Pod(metadata=client.V1ObjectMeta(name=name, namespace=namespace,
+                                                     resource_version=resource_version))
+
+
+def _pod_list(pods, resource_version):
+    return client.V1PodList(items=pods, metadata=client.V1ListMeta(resource_version=resource_version))
+
+
+class FakeWatch:
+    """Replays one scripted watch session per ``stream`` call and records where each resumed from."""
+
+    sessions = []
+    resumed_from = []
+
+    def __init__(self):
+        self.resource_version = None
+
+    def stream(self, func, resource_version=None, **kwargs):
+        FakeWatch.resumed_from.append(resource_version)
+        session = FakeWatch.sessions.pop(0)
+        if isinstance(session, Exception):
+            raise session
+        if callable(session):
+            session = session()
+        for event in session:
+            self.resource_version = event["object"].metadata.resource_version
+            yield event
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def pods(monkeypatch):
+    """An informer whose LIST answers with the next scripted list and whose watch replays FakeWatch.sessions."""
+    lists = []
+    monkeypatch.setattr(informer.watch, "Watch", FakeWatch)
+    monkeypatch.setattr(FakeWatch, "sessions", [])
+    monkeypatch.setattr(FakeWatch, "resumed_from", [])
+    pods = Informer("pods", lambda **kwargs: lists.pop(0))
+    pods.lists = lists
+    return pods
+
+
+def test_events_update_the_store(pods):
+    pods._apply({"type": "ADDED", "object": _pod("web-1")})
+    pods._apply({"type": "ADDED", "object": _pod("db-1", namespace="data")})
+    pods._apply({"type": "MODIFIED", "object": _pod("web-1", "2")})
+    assert pods.get("default", "web-1").metadata.resource_version == "2"
+    pods._apply({"type": "DELETED", "object": _pod("web-1", "3")})
+    assert pods.get("default", "web-1") is None
+    assert [p.metadata.name for p in pods.items()] == ["db-1"]
+
+
+def test_watch_resumes_from_the_last_resource_version_and_relists_on_410(pods):
+    def stop_informer():
+        pods.stop()
+        return []
+
+    pods.lists.extend([_pod_list([_pod("web-1", "10")], "10"), _pod_list([_pod("web-9", "20")], "20")])
+    FakeWatch.sessions.extend([
+        [{"type": "ADDED", "object": _pod("web-2", "11")}],  # server closes the watch after its timeout
+        client.exceptions.ApiException(status=410, reason="Gone"),
+        stop_informer,
+    ])
+    pods._run()
+
+    assert FakeWatch.resumed_from == ["10", "11", "20"]
+    assert pods.relists == 2
+    # The relist replaced the store rather than adding to it
+    assert [p.metadata.name for p in pods.items()] == ["web-9"]
+    assert pods.resource_version == "20"
+
+
+def test_only_a_fresh_store_is_served(pods, monkeypatch):
+    api_calls = []
+    monkeypatch.setitem(informer.RESOURCES, "pods", (
+        lambda namespace, **kwargs: api_calls.append((namespace, kwargs)) or _pod_list([_pod("api")], "99"),
+        lambda **kwargs: api_calls.append((None, kwargs)) or _pod_list([_pod("api")], "99"),
+    ))
+    monkeypatch.setattr(informer, "_informers", {"pods": pods})
+    pods.lists.append(_pod_list([_pod("cached", "5")], "5"))
+    pods._relist()
+
+    listing = list_objects("pods", "default")
+    assert [p.metadata.name for p in listing] == ["cached"] and listing.resource_version == "5"
+    assert informer.cached_object("pods", "default", "cached") is not None
+    assert api_calls == []
+
+    # Paginated requests always go to the API server so cursors stay valid
+    assert [p.metadata.name for p in list_objects("pods", "default", limit=10)] == ["api"]
+    assert api_calls == [("default", {"limit": 10})]
+
+    # Past the freshness cutoff nothing is served from memory
+    pods._last_sync = time.monotonic() - informer.INFORMER_MAX_STALENESS - 1
+    assert not pods.is_fresh()
+    assert [p.metadata.name for p in list_objects("pods", None)] == ["api"]
+    assert informer.cached_object("pods", "default", "cached") is None
+    assert pods.status()["fresh"] is False
@@ -0,0 +1,122 @@
+from kubernetes import client
+from app.helpers import kube_async
+import asyncio
+import os
+import pytest
+import shutil
+
+
+def _stream_from(handler, proxy=None, **options):
+    """Read ``stream_chunks`` from a local server whose connections are handled by ``handler``.
+
+    With ``proxy`` (configuration attributes), the server is the proxy in front of kubernetes.test.
+    """
+    async def main():
+        server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        configuration = client.Configuration()
+        configuration.host = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        if proxy is not None:
+            configuration.proxy, configuration.host = configuration.host, "http://kubernetes.test:6443"
+            for key, value in proxy.items():
+                setattr(configuration, key, value)
+        api_client = client.ApiClient(configuration)
+        original = kube_async.get_api_client
+        kube_async.get_api_client = lambda: api_client
+        try:
+            return [chunk async for chunk in kube_async.stream_chunks("/api/v1/x", **options)]
+        finally:
+            kube_async.get_api_client = original
+            server.close()
+    return asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+
+async def _read_request(reader):
+    lines = []
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        lines.append(line.decode().rstrip())
+    return lines
+
+
+def test_chunked_body_is_streamed():
+    async def handler(reader, writer):
+        await _read_request(reader)
+        writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    assert b"".join(_stream_from(handler)) == b"hello world"
+
+
+def test_silent_connection_times_out():
+    async def handler(reader, writer):
+        await _read_request(reader)
+        writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n2\r\nok\r\n")
+        await writer.drain()
+        await asyncio.sleep(3)  # half-open: nothing more arrives
+
+    with pytest.raises(TimeoutError):
+        _stream_from(handler, read_timeout=0.2)
+    # Callers retry on OSError
+    assert issubclass(TimeoutError, OSError)
+
+
+def test_error_status_raises_api_exception():
+    async def handler(reader, writer):
+        await _read_request(reader)
+        writer.write(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 9\r\n\r\nforbidden")
+        await writer.drain()
+        writer.close()
+
+    with pytest.raises(client.exceptions.ApiException) as error:
+        _stream_from(handler)
+    assert error.value.status == 403
+    assert error.value.body == "forbidden"
+
+
+def test_proxy_is_tunnelled_with_connect():
+    requests = []
+
+    async def handler(reader, writer):
+        requests.append(await _read_request(reader))
+        writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        requests.append(await _read_request(reader))
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+        await writer.drain()
+        writer.close()
+
+    assert _stream_from(handler, proxy={"proxy_headers": {"Proxy-Authorization": "Basic eDp5"}}) == [b"ok"]
+    connect, get = requests
+    assert connect[0] == "CONNECT kubernetes.test:6443 HTTP/1.1"
+    assert "Proxy-Authorization: Basic eDp5" in connect
+    assert get[0] == "GET /api/v1/x HTTP/1.1"
+
+
+def test_refused_tunnel_raises_api_exception():
+    async def handler(reader, writer):
+        await _read_request(reader)
+        writer.write(b"HTTP/1.1 407 Proxy Authentication Required\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    with pytest.raises(client.exceptions.ApiException) as error:
+        _stream_from(handler, proxy={})
+    assert error.value.status == 502
+
+
+def test_metric_labels_are_path_templates():
+    assert kube_async._metric_labels("/api/v1/namespaces/ns/pods/web/log", {}) == ("stream", "pods/log")
+    assert kube_async._metric_labels("/apis/apps/v1/namespaces/ns/deployments", {"watch": "true"}) \
+        == ("watch", "deployments")
+    assert kube_async._metric_labels("/api/v1/namespaces", {"watch": "true"}) == ("watch", "namespaces")
+
+
+def test_ssl_context_is_rebuilt_when_a_file_changes(tmp_path):
+    import certifi
+    ca = tmp_path / "ca.pem"
+    shutil.copy(certifi.where(), ca)
+    configuration = client.Configuration()
+    configuration.ssl_ca_cert = str(ca)
+    first = kube_async._get_ssl_context(configuration)
+    assert kube_async._get_ssl_context(configuration) is first
+    os.utime(ca, (1, 1))  # rotated in place
+    assert kube_async._get_ssl_context(configuration) is not first
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+from app.helpers import kube_async, log_hub
+import asyncio
+import pytest
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake follow connections: lines put on ``upstream.lines`` are published, opens and closes are counted."""
+    fake = SimpleNamespace(lines=None, opened=0, closed=0)
+
+    async def fake_stream_lines(path, query=None):
+        fake.opened += 1
+        try:
+            while True:
+                yield await fake.lines.get()
+        finally:
+            fake.closed += 1
+
+    monkeypatch.setattr(kube_async, "stream_lines", fake_stream_lines)
+    monkeypatch.setattr(log_hub, "_topics", {})
+    return fake
+
+
+def _run(upstream, scenario):
+    async def main():
+        upstream.lines = asyncio.Queue()
+        return await scenario()
+    return asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+
+async def _publish(upstream, *lines):
+    for line in lines:
+        upstream.lines.put_nowait(line)
+    # Let the follower task move them into the topic
+    while not upstream.lines.empty():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+def test_one_upstream_fans_out_to_every_subscriber(upstream):
+    async def scenario():
+        first = log_hub.subscribe("default", "web-1", "app")
+        second = log_hub.subscribe("default", "web-1", "app")
+        await _publish(upstream, "a", "b")
+        return await first.next_lines(), await second.next_lines()
+
+    assert _run(upstream, scenario) == (["a", "b"], ["a", "b"])
+    assert upstream.opened == 1
+
+
+def test_late_subscriber_gets_the_backlog(upstream):
+    async def scenario():
+        first = log_hub.subscribe("default", "web-1", "app")
+        await _publish(upstream, *"abcde")
+        late = log_hub.subscribe("default", "web-1", "app", backlog=2)
+        await _publish(upstream, "f")
+        return await first.next_lines(), await late.next_lines()
+
+    assert _run(upstream, scenario) == (list("abcdef"), ["d", "e", "f"])
+
+
+def test_slow_subscriber_skips_ahead_and_counts_drops(upstream, monkeypatch):
+    monkeypatch.setattr(log_hub, "LOG_HUB_BUFFER", 4)
+
+    async def scenario():
+        slow = log_hub.subscribe("default", "web-1", "app", backlog=0)
+        await _publish(upstream, *"abcdefghij")
+        return await slow.next_lines(), slow.take_dropped(), slow.take_dropped()
+
+    assert _run(upstream, scenario) == (list("ghij"), 6, 0)
+
+
+def test_upstream_stops_with_its_last_subscriber(upstream):
+    async def scenario():
+        first = log_hub.subscribe("default", "web-1", "app")
+        second = log_hub.subscribe("default", "web-1", "app")
+        await asyncio.sleep(0)
+        log_hub.unsubscribe(first)
+        await asyncio.sleep(0)
+        still_open = upstream.closed == 0 and bool(log_hub._topics)
+        log_hub.unsubscribe(second)
+        while upstream.closed == 0:
+            await asyncio.sleep(0)
+        return still_open, log_hub._topics
+
+    assert _run(upstream, scenario) == (True, {})
+    assert (upstream.opened, upstream.closed) == (1, 1)
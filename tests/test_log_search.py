@@ -0,0 +1,59 @@
+from fastapi import HTTPException
+from app.helpers import kube_async, pods
+import asyncio
+import json
+import pytest
+
+
+@pytest.fixture
+def pod_log(monkeypatch):
+    """Serve the chunks put in the returned list as the pod's log body."""
+    chunks = []
+
+    async def fake_stream_chunks(path, query=None):
+        for chunk in chunks:
+            yield chunk
+
+    monkeypatch.setattr(kube_async, "stream_chunks", fake_stream_chunks)
+    return chunks
+
+
+def _search(pattern, **options):
+    async def main():
+        matcher = pods.compile_log_matcher(pattern, None)
+        results = await pods.search_pod_logs("default", "web", matcher, **options)
+        return [json.loads(line) for chunk in [c async for c in results] for line in chunk.splitlines()]
+
+    records = asyncio.run(main())
+    return records[:-1], records[-1]["summary"]
+
+
+def test_last_line_without_newline_is_searched(pod_log):
+    pod_log.extend([b"ok 1\nok 2\n", b"boom at the e", b"nd"])
+    records, summary = _search("boom")
+    assert records == [{"line": 3, "match": True, "text": "boom at the end"}]
+    assert summary["lines_scanned"] == 3
+    assert summary["matches"] == 1
+
+
+def test_context_and_max_matches(pod_log):
+    pod_log.append(b"a\nerr 1\nb\nc\nerr 2\nd\nerr 3")
+    records, summary = _search("err", before=1, after=1, max_matches=2)
+    assert [(r["line"], r["match"]) for r in records] == [
+        (1, False), (2, True), (3, False), (4, False), (5, True), (6, False),
+    ]
+    assert summary["matches"] == 2
+
+
+def test_literals_are_escaped_and_combined():
+    matcher = pods.compile_log_matcher(None, ["a.b", "[x]"])
+    assert matcher.search("1 a.b 2")
+    assert matcher.search("[x]")
+    assert not matcher.search("aXb")
+
+
+def test_matcher_rejects_missing_or_invalid_pattern():
+    for pattern, literals in ((None, None), ("(", None)):
+        with pytest.raises(HTTPException) as error:
+            pods.compile_log_matcher(pattern, literals)
+        assert error.value.status_code == 400
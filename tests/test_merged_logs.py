@@ -0,0 +1,144 @@
+from fastapi import HTTPException
+from types import SimpleNamespace
+from app.helpers import kube_async, pods
+import asyncio
+import json
+import pytest
+
+
+def _listing(*containers):
+    return SimpleNamespace(data=json.dumps({
+        "metadata": {"resourceVersion": "1"},
+        "items": [
+            {
+                "metadata": {"name": "web-1"},
+                "spec": {"containers": [{"name": name} for name in containers]},
+                "status": {"phase": "Running"},
+            }
+        ],
+    }))
+
+
+@pytest.fixture
+def fake_cluster(monkeypatch):
+    """A pod whose log produces lines as fast as they are read, and a pod watch that stays quiet."""
+    state = {"listing": _listing("app")}
+
+    async def fake_run_k8s(func, *args, **kwargs):
+        return state["listing"]
+
+    async def fake_stream_lines(path, query=None):
+        if not path.endswith("/log"):
+            await asyncio.Event().wait()
+        number = 0
+        while True:
+            for _ in range(100):
+                number += 1
+                yield f"2024-05-01T12:00:00.{number:09d}Z line {number}"
+            await asyncio.sleep(0)
+
+    monkeypatch.setattr(pods, "run_k8s", fake_run_k8s)
+    monkeypatch.setattr(kube_async, "stream_lines", fake_stream_lines)
+    return state
+
+
+def test_unknown_container_is_rejected_before_streaming(fake_cluster):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(pods.stream_merged_logs("default", "app=web", container="sidecar"))
+    assert error.value.status_code == 400
+
+
+def test_slow_client_gets_bounded_batches_and_drop_markers(fake_cluster):
+    async def main():
+        stream = await pods.stream_merged_logs("default", "app=web", merge_window=0.01, max_batch=500)
+        batches = []
+        try:
+            async for batch in stream:
+                batches.append(batch.splitlines())
+                await asyncio.sleep(0.05)  # slow client
+                if len(batches) == 5:
+                    break
+        finally:
+            await stream.aclose()
+        return batches
+
+    batches = asyncio.run(main())
+    # At most max_batch lines plus the drop marker of the one pod
+    assert all(len(batch) <= 501 for batch in batches)
+    assert any("lines dropped, client too slow" in line for batch in batches for line in batch)
+
+
+def test_reattached_pod_resumes_without_repeating_lines(monkeypatch):
+    """The pod's log ends, the watch reports it again: the second follow starts at the last line already sent."""
+    queries = []
+    first_follow_done = asyncio.Event()
+
+    async def fake_run_k8s(func, *args, **kwargs):
+        return _listing("app")
+
+    async def fake_stream_lines(path, query=None):
+        if not path.endswith("/log"):
+            await first_follow_done.wait()
+            await asyncio.sleep(0.05)
+            modified = {"metadata": {"name": "web-1", "resourceVersion": "2"},
+                        "spec": {"containers": [{"name": "app"}]}, "status": {"phase": "Running"}}
+            yield json.dumps({"type": "MODIFIED", "object": modified})
+            await asyncio.Event().wait()
+        queries.append(query)
+        if len(queries) == 1:
+            yield "2024-05-01T12:00:00.1Z first"
+            yield "2024-05-01T12:00:01.25Z second"
+            first_follow_done.set()
+            return
+        # sinceTime is inclusive on the kubelet side
+        yield "2024-05-01T12:00:01.25Z second"
+        yield "2024-05-01T12:00:02Z third"
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(pods, "run_k8s", fake_run_k8s)
+    monkeypatch.setattr(kube_async, "stream_lines", fake_stream_lines)
+
+    async def main():
+        stream = await pods.stream_merged_logs("default", "app=web", merge_window=0.01)
+        lines = []
+        try:
+            async for batch in stream:
+                lines.extend(line.split()[-1] for line in batch.splitlines())
+                if "third" in lines:
+                    return lines
+        finally:
+            await stream.aclose()
+
+    assert asyncio.run(asyncio.wait_for(main(), timeout=5)) == ["first", "second", "third"]
+    assert "tailLines" in queries[0] and "sinceTime" not in queries[0]
+    assert queries[1]["sinceTime"] == "2024-05-01T12:00:01.250000000Z"
+
+
+def test_follow_without_container_shares_the_named_default(monkeypatch):
+    opened = []
+
+    async def fake_stream_lines(path, query=None):
+        opened.append(query["container"])
+        await asyncio.Event().wait()
+        yield ""
+
+    async def fake_run_k8s(func, *args, **kwargs):
+        return SimpleNamespace(spec=SimpleNamespace(containers=[SimpleNamespace(name="app")]))
+
+    monkeypatch.setattr(kube_async, "stream_lines", fake_stream_lines)
+    monkeypatch.setattr(pods, "run_k8s", fake_run_k8s)
+    monkeypatch.setattr(pods, "cached_object", lambda *args: None)
+    monkeypatch.setattr(pods.log_hub, "_topics", {})
+
+    async def main():
+        followers = [pods.stream_logs("default", "web-1"), pods.stream_logs("default", "web-1", "app")]
+        reads = [asyncio.create_task(follower.__anext__()) for follower in followers]
+        await asyncio.sleep(0.05)
+        topics = list(pods.log_hub._topics)
+        for read in reads:
+            read.cancel()
+        await asyncio.gather(*reads, return_exceptions=True)
+        return topics
+
+    assert asyncio.run(main()) == [("default", "web-1", "app")]
+    assert opened == ["app"]
@@ -0,0 +1,141 @@
+from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi.responses import StreamingResponse
+from kubernetes import client
+from prometheus_client import REGISTRY
+from app.configs.kube_client import InstrumentedApi
+from app.helpers.metrics import MetricsMiddleware
+import asyncio
+import pytest
+
+
+class FakeApi:
+    """Stands in for a generated API class."""
+
+    api_client = "shared"
+
+    def list_namespaced_pod(self, namespace):
+        """list pods
+
+        :return: V1PodList
+        """
+        return ["web-1"]
+
+    def read_namespaced_pod_log_with_http_info(self, name, namespace):
+        raise client.exceptions.ApiException(status=404, reason="Not Found")
+
+
+def _count(verb, resource):
+    return REGISTRY.get_sample_value(
+        "kubechef_k8s_request_duration_seconds_count", {"verb": verb, "resource": resource}
+    ) or 0
+
+
+def test_calls_are_labelled_by_method_name():
+    api = InstrumentedApi(FakeApi())
+    before = _count("list", "namespaced_pod")
+    assert api.list_namespaced_pod("default") == ["web-1"]
+    assert _count("list", "namespaced_pod") == before + 1
+    # The wrapper keeps what kubernetes.watch reads from the method
+    assert api.list_namespaced_pod.__doc__ == FakeApi.list_namespaced_pod.__doc__
+    assert api.api_client == "shared"
+
+
+def test_api_errors_are_counted_with_their_status():
+    api = InstrumentedApi(FakeApi())
+    labels = {"verb": "read", "resource": "namespaced_pod_log", "status": "404"}
+    before = REGISTRY.get_sample_value("kubechef_k8s_request_errors_total", labels) or 0
+    with pytest.raises(client.exceptions.ApiException):
+        api.read_namespaced_pod_log_with_http_info("web-1", "default")
+    assert REGISTRY.get_sample_value("kubechef_k8s_request_errors_total", labels) == before + 1
+    assert _count("read", "namespaced_pod_log") >= 1
+
+
+def _streaming(route):
+    return REGISTRY.get_sample_value("kubechef_streaming_connections", {"route": route}) or 0
+
+
+def _requests(route, status):
+    labels = {"method": "GET", "route": route, "status": status}
+    return REGISTRY.get_sample_value("kubechef_http_requests_total", labels) or 0
+
+
+app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+seen_while_open = []
+
+
+@app.get("/test-metrics/items/{item_id}")
+def get_item(item_id: int):
+    if item_id == 404:
+        raise HTTPException(status_code=404)
+    if item_id == 500:
+        raise RuntimeError("broken")
+    return {"id": item_id}
+
+
+@app.get("/test-metrics/stream")
+def stream():
+    def chunks():
+        yield b"first\n"
+        seen_while_open.append(_streaming("/test-metrics/stream"))
+        yield b"second\n"
+    return StreamingResponse(chunks())
+
+
+@app.websocket("/test-metrics/ws")
+async def socket(websocket: WebSocket):
+    await websocket.accept()
+    seen_while_open.append(_streaming("/test-metrics/ws"))
+    await websocket.close()
+
+
+def _call(path, kind="http"):
+    scope = {"type": kind, "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+             "headers": [], "scheme": "http", "server": ("test", 80), "client": ("test", 1)}
+    if kind == "http":
+        scope.update(method="GET", http_version="1.1")
+        incoming = [{"type": "http.request", "body": b""}]
+    else:
+        incoming = [{"type": "websocket.connect"}]
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        pass
+
+    async def main():
+        try:
+            await app(scope, receive, send)
+        except RuntimeError:
+            pass  # re-raised after the 500 was sent, as uvicorn would see it
+    asyncio.run(main())
+
+
+def test_requests_are_labelled_by_route_template_and_status():
+    route = "/test-metrics/items/{item_id}"
+    before = {status: _requests(route, status) for status in ("200", "404", "500")}
+    for path in ("/test-metrics/items/1", "/test-metrics/items/2", "/test-metrics/items/404",
+                 "/test-metrics/items/500"):
+        _call(path)
+    assert _requests(route, "200") == before["200"] + 2
+    assert _requests(route, "404") == before["404"] + 1
+    assert _requests(route, "500") == before["500"] + 1
+
+
+def test_unknown_paths_share_one_label():
+    before = _requests("unmatched", "404")
+    _call("/test-metrics/nope/1")
+    _call("/test-metrics/nope/2")
+    assert _requests("unmatched", "404") == before + 2
+
+
+def test_streaming_gauge_counts_open_streams_and_websockets():
+    seen_while_open.clear()
+    _call("/test-metrics/stream")
+    _call("/test-metrics/ws", kind="websocket")
+    assert seen_while_open == [1, 1]
+    assert _streaming("/test-metrics/stream") == 0
+    assert _streaming("/test-metrics/ws") == 0
@@ -0,0 +1,44 @@
+from fastapi import HTTPException
+from kubernetes import client
+from app.helpers import overview
+import asyncio
+import pytest
+import time
+
+
+def _overview(monkeypatch, sections, **kwargs):
+    monkeypatch.setattr(overview, "SECTIONS", sections)
+    return asyncio.run(overview.namespace_overview("default", **kwargs))
+
+
+def test_failing_sections_do_not_break_the_page(monkeypatch):
+    def broken(namespace, hotspots, timeout):
+        raise KeyError("status")
+
+    def forbidden(namespace, hotspots, timeout):
+        raise client.exceptions.ApiException(status=403, reason="Forbidden")
+
+    def slow(namespace, hotspots, timeout):
+        time.sleep(0.3)
+
+    result = _overview(monkeypatch, {"ok": lambda *args: {"total": 1}, "broken": broken,
+                                     "forbidden": forbidden, "slow": slow}, timeout=0.05)
+    assert result["ok"] == {"total": 1}
+    assert result["broken"] == {"error": "KeyError: 'status'", "timed_out": False}
+    assert result["forbidden"] == {"error": "403 Forbidden", "timed_out": False}
+    assert result["slow"]["timed_out"] is True
+
+
+def test_timeout_is_passed_to_the_section(monkeypatch):
+    seen = []
+    _overview(monkeypatch, {"pods": lambda namespace, hotspots, timeout: seen.append(timeout)}, timeout=1.5)
+    assert seen == [1.5]
+
+
+def test_missing_namespace_is_404(monkeypatch):
+    def missing(namespace, hotspots, timeout):
+        raise client.exceptions.ApiException(status=404, reason="Not Found")
+
+    with pytest.raises(HTTPException) as error:
+        _overview(monkeypatch, {"namespace": missing})
+    assert error.value.status_code == 404
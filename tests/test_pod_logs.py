@@ -0,0 +1,76 @@
+from fastapi import HTTPException
+from kubernetes import client
+from app.helpers import kube_async, pods
+import asyncio
+import json
+import pytest
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Stubbed log streams: serve ``upstream["chunks"]`` (or raise ``upstream["error"]``) and record requests."""
+    state = {"chunks": [], "error": None, "requests": [], "closed": 0}
+
+    async def fake_stream_chunks(path, query=None):
+        state["requests"].append((path, query))
+        try:
+            if state["error"]:
+                raise state["error"]
+            for chunk in state["chunks"]:
+                yield chunk
+        finally:
+            state["closed"] += 1
+
+    async def fake_stream_lines(path, query=None):
+        async for chunk in fake_stream_chunks(path, query):
+            for line in chunk.decode().splitlines():
+                yield line
+
+    monkeypatch.setattr(kube_async, "stream_chunks", fake_stream_chunks)
+    monkeypatch.setattr(kube_async, "stream_lines", fake_stream_lines)
+    return state
+
+
+def _download(*args, **options):
+    async def main():
+        body = await pods.get_pod_logs(*args, **options)
+        return [item async for item in body]
+    return asyncio.run(main())
+
+
+def test_text_is_streamed_as_received(upstream):
+    upstream["chunks"] = [b"one\ntw", b"o\n"]
+    assert _download("web-1", "default") == [b"one\ntw", b"o\n"]
+    assert upstream["requests"][0][0] == "/api/v1/namespaces/default/pods/web-1/log"
+
+
+def test_ndjson_numbers_each_line(upstream):
+    upstream["chunks"] = [b"one\ntwo\n"]
+    records = [json.loads(line) for line in _download("web-1", "default", "ndjson")]
+    assert records == [{"pod": "web-1", "line": 1, "log": "one"}, {"pod": "web-1", "line": 2, "log": "two"}]
+
+
+def test_bounds_are_sent_to_the_kubelet(upstream):
+    _download("web-1", "default", container="app", tail_lines=100, limit_bytes=4096, timestamps=True)
+    _, query = upstream["requests"][0]
+    assert query == {"container": "app", "tailLines": 100, "sinceSeconds": None, "sinceTime": None,
+                     "limitBytes": 4096, "previous": None, "timestamps": "true", "follow": None}
+    with pytest.raises(HTTPException) as error:
+        _download("web-1", "default", since_seconds=60, since_time="2024-05-01T00:00:00Z")
+    assert error.value.status_code == 400
+
+
+def test_api_error_on_the_first_chunk_is_an_http_error(upstream):
+    error = client.exceptions.ApiException(status=400, reason="Bad Request")
+    error.body = json.dumps({"message": 'container "db" is not valid for pod "web-1"'})
+    upstream["error"] = error
+    for format in ("text", "ndjson"):
+        with pytest.raises(HTTPException) as raised:
+            _download("web-1", "default", format, container="db")
+        assert raised.value.status_code == 400
+        assert raised.value.detail == 'container "db" is not valid for pod "web-1"'
+    assert upstream["closed"] == 2
+
+
+def test_empty_log(upstream):
+    assert _download("web-1", "default") == []
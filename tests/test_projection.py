@@ -0,0 +1,45 @@
+from fastapi import HTTPException
+from kubernetes import client
+from app.helpers.pods import POD_FIELDS
+from app.helpers.projection import project, project_object, select_fields
+import pytest
+
+
+def _pod():
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name="web-1", namespace="default", resource_version="42"),
+        spec=client.V1PodSpec(node_name="node-a", containers=[client.V1Container(name="app")]),
+        status=client.V1PodStatus(phase="Running", pod_ip="10.0.0.7"),
+    )
+
+
+def test_no_fields_selects_everything():
+    assert select_fields(None, POD_FIELDS) is None
+    assert select_fields("", POD_FIELDS) is None
+    assert list(project(_pod(), POD_FIELDS)) == list(POD_FIELDS)
+
+
+def test_selected_fields_in_request_order():
+    selected = select_fields(" status, name ,,", POD_FIELDS)
+    assert selected == ["status", "name"]
+    assert project(_pod(), POD_FIELDS, selected) == {"status": "Running", "name": "web-1"}
+
+
+def test_only_requested_extractors_run():
+    calls = []
+    extractors = {"a": lambda obj: calls.append("a") or 1, "b": lambda obj: calls.append("b") or 2}
+    assert project(object(), extractors, ["b"]) == {"b": 2}
+    assert calls == ["b"]
+
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        select_fields("name,labels", POD_FIELDS)
+    assert error.value.status_code == 400
+    assert "labels" in error.value.detail
+
+
+def test_project_object_keeps_resource_version():
+    projected = project_object(_pod(), POD_FIELDS, ["containers"])
+    assert projected == {"containers": ["app"]}
+    assert projected.resource_version == "42"
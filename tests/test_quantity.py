@@ -0,0 +1,32 @@
+from app.helpers.quantity import parse_quantity, parse_resources
+import pytest
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("500m", 0.5),
+    ("2", 2.0),
+    ("1.5", 1.5),
+    ("100n", 1e-7),
+    ("1Ki", 1024.0),
+    ("2Gi", 2 * 2 ** 30),
+    ("1M", 1e6),
+    ("1.5e3", 1500.0),
+    ("1E3", 1000.0),
+    (".5", 0.5),
+    ("-1", -1.0),
+    (" 3 ", 3.0),
+])
+def test_valid_quantities(value, expected):
+    assert parse_quantity(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", [None, "", "abc", "1Gb", "1.2.3", "Mi"])
+def test_malformed_quantities_are_none(value):
+    assert parse_quantity(value) is None
+
+
+def test_parse_resources_drops_malformed_values():
+    assert parse_resources({"cpu": "250m", "memory": "64Mi", "gpu": "lots"}) == {
+        "cpu": 0.25, "memory": 64 * 2 ** 20,
+    }
+    assert parse_resources(None) == {}
@@ -0,0 +1,68 @@
+from kubernetes import client
+from app.helpers import kube_async, resource_watch
+import asyncio
+import json
+
+
+def _event(event_type, name, resource_version):
+    return json.dumps({"type": event_type, "object": {
+        "apiVersion": "v1", "kind": "Pod",
+        "metadata": {"name": name, "namespace": "default", "resourceVersion": resource_version},
+        "status": {"phase": "Running"},
+    }})
+
+
+def _fake_watch(monkeypatch, *responses):
+    """Each watch request gets the next response: a list of lines, or an exception to raise."""
+    responses = list(responses)
+    queries = []
+
+    async def fake_stream_lines(path, query=None):
+        queries.append(query)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        for line in response:
+            yield line
+
+    monkeypatch.setattr(kube_async, "stream_lines", fake_stream_lines)
+    monkeypatch.setattr(resource_watch, "WATCH_RETRY_SECONDS", 0)
+    return queries
+
+
+def _collect(**options):
+    async def main():
+        stream = resource_watch.watch_events("pods", "default", **options)
+        return [message async for message in stream]
+    return asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+
+def test_events_are_deserialized_projected_and_resumed(monkeypatch):
+    queries = _fake_watch(
+        monkeypatch,
+        ["", _event("ADDED", "web-1", "10"), _event("BOOKMARK", "", "11")],
+        client.exceptions.ApiException(status=403, reason="Forbidden"),
+    )
+    messages = _collect(fields="name,status")
+    assert messages[1] == 'id: 10\nevent: ADDED\ndata: {"name":"web-1","status":"Running"}\n\n'
+    assert messages[2] == "id: 11\n\n"
+    # Re-opened from the bookmark's resourceVersion
+    assert queries[1]["resourceVersion"] == "11"
+
+
+def test_client_error_ends_the_stream(monkeypatch):
+    queries = _fake_watch(monkeypatch, client.exceptions.ApiException(status=403, reason="Forbidden"))
+    messages = _collect()
+    assert messages[-1] == 'event: ERROR\ndata: {"status":403,"reason":"Forbidden"}\n\n'
+    assert len(queries) == 1
+
+
+def test_server_error_is_retried(monkeypatch):
+    _fake_watch(
+        monkeypatch,
+        client.exceptions.ApiException(status=500, reason="Internal Server Error"),
+        client.exceptions.ApiException(status=404, reason="Not Found"),
+    )
+    messages = _collect()
+    assert messages[1].startswith("event: WARNING")
+    assert messages[2].startswith("event: ERROR")
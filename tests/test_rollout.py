@@ -0,0 +1,69 @@
+from app.helpers import kube_async, rollout
+from app.helpers.rollout import rollout_state
+import asyncio
+import json
+
+
+def _deployment(desired=3, replicas=3, updated=3, available=3, generation=2, observed=2, conditions=()):
+    return {
+        "metadata": {"name": "web", "namespace": "default", "generation": generation, "resourceVersion": "5"},
+        "spec": {"replicas": desired},
+        "status": {
+            "observedGeneration": observed,
+            "replicas": replicas,
+            "updatedReplicas": updated,
+            "availableReplicas": available,
+            "conditions": list(conditions),
+        },
+    }
+
+
+def test_rollout_phases():
+    cases = [
+        (_deployment(observed=1), "progressing", "spec update to be observed"),
+        (_deployment(updated=1), "progressing", "1 out of 3 new replicas"),
+        (_deployment(replicas=4), "progressing", "1 old replicas are pending termination"),
+        (_deployment(available=2), "progressing", "2 of 3 updated replicas are available"),
+        (_deployment(), "complete", "Rollout complete"),
+    ]
+    for deployment, phase, message in cases:
+        state = rollout_state(deployment)
+        assert state["phase"] == phase
+        assert message in state["message"]
+
+
+def test_progress_deadline_fails_the_rollout():
+    deadline = {"type": "Progressing", "status": "False", "reason": "ProgressDeadlineExceeded"}
+    state = rollout_state(_deployment(updated=1, conditions=[deadline]))
+    assert state["phase"] == "failed"
+
+
+def test_defaults_for_a_fresh_deployment():
+    state = rollout_state({"metadata": {"name": "web"}, "spec": {}, "status": {}})
+    assert (state["desired"], state["updated"], state["phase"]) == (1, 0, "progressing")
+
+
+def _follow_with_watch(monkeypatch, lines):
+    async def fake_stream_lines(path, query=None):
+        for line in lines:
+            yield line
+        await asyncio.Event().wait()  # a quiet watch
+
+    monkeypatch.setattr(kube_async, "stream_lines", fake_stream_lines)
+
+    async def main():
+        return [state async for state in rollout._follow("web", "default", _deployment(updated=1), 5, None)]
+    return asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+
+def test_watch_reports_progress_until_complete(monkeypatch):
+    events = [json.dumps({"type": "MODIFIED", "object": _deployment(updated=2)}),
+              json.dumps({"type": "MODIFIED", "object": _deployment()})]
+    states = _follow_with_watch(monkeypatch, events)
+    assert [state["phase"] for state in states] == ["progressing", "progressing", "complete"]
+
+
+def test_unexpected_watch_error_is_reported_as_failed(monkeypatch):
+    states = _follow_with_watch(monkeypatch, ["not json"])
+    assert states[-1]["phase"] == "failed"
+    assert "JSONDecodeError" in states[-1]["message"]
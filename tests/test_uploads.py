@@ -0,0 +1,69 @@
+from fastapi import HTTPException, UploadFile
+from app.helpers.uploads import CONFIGMAP_MAX_BYTES, collect_entries
+import asyncio
+import base64
+import io
+import pytest
+import zipfile
+
+
+def _upload(name, raw, declare_size=False):
+    return UploadFile(io.BytesIO(raw), filename=name, size=len(raw) if declare_size else None)
+
+
+def _collect(**kwargs):
+    return asyncio.run(collect_entries(**kwargs))
+
+
+def test_text_and_binary_files_are_split():
+    png = b"\x89PNG\r\n\x1a\n\x00\x00"
+    data, binary_data = _collect(files=[_upload("app.conf", b"port=80\n"), _upload("logo.png", png)])
+    assert data == {"app.conf": "port=80\n"}
+    assert binary_data == {"logo.png": base64.b64encode(png).decode()}
+
+
+def test_invalid_utf8_is_binary():
+    data, binary_data = _collect(files=[_upload("latin1.txt", "café".encode("latin-1"))])
+    assert data == {} and list(binary_data) == ["latin1.txt"]
+
+
+def test_content_and_first_file_use_filename():
+    data, _ = _collect(content="a=1", filename="inline.env", files=[_upload("x.conf", b"x")])
+    assert data == {"inline.env": "a=1", "x.conf": "x"}
+    data, _ = _collect(filename="renamed.conf", files=[_upload("x.conf", b"x")])
+    assert data == {"renamed.conf": "x"}
+
+
+def test_size_limit_counts_every_file():
+    half = CONFIGMAP_MAX_BYTES // 2 + 1
+    with pytest.raises(HTTPException) as error:
+        _collect(files=[_upload("a", b"x" * half), _upload("b", b"x" * half)])
+    assert error.value.status_code == 413
+    # A declared size is rejected before reading
+    with pytest.raises(HTTPException) as error:
+        _collect(files=[_upload("big", b"x" * (CONFIGMAP_MAX_BYTES + 1), declare_size=True)])
+    assert error.value.status_code == 413
+
+
+def test_binary_values_are_counted_base64_encoded():
+    # Fits as raw bytes, not once encoded
+    with pytest.raises(HTTPException) as error:
+        _collect(files=[_upload("blob", b"\x00" * (CONFIGMAP_MAX_BYTES * 9 // 10))])
+    assert error.value.status_code == 413
+
+
+def test_duplicate_and_invalid_keys_are_rejected():
+    for files in ([_upload("a.conf", b"1"), _upload("a.conf", b"2")], [_upload("bad/key", b"1")]):
+        with pytest.raises(HTTPException) as error:
+            _collect(files=files)
+        assert error.value.status_code == 400
+
+
+def test_archives_are_expanded_per_member():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("conf/app.conf", "port=80")
+        archive.writestr("conf/blob.bin", b"\x00\x01")
+    data, binary_data = _collect(files=[_upload("bundle.zip", buffer.getvalue())], extract=True)
+    assert data == {"app.conf": "port=80"}
+    assert list(binary_data) == ["blob.bin"]
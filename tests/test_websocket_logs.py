@@ -0,0 +1,82 @@
+from app.helpers import log_hub, pods
+import asyncio
+
+
+class FakeTopic:
+    key = ("default", "web", "app")
+    error = None
+
+
+class FakeSubscription:
+    """Hands out lines put on ``feed``; ``None`` ends the stream."""
+
+    def __init__(self):
+        self.topic = FakeTopic()
+        self.feed: asyncio.Queue = asyncio.Queue()
+        self.dropped = 0
+
+    async def next_lines(self):
+        lines = await self.feed.get()
+        return [] if lines is None else lines
+
+    def take_dropped(self):
+        return 0
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_json(self, frame):
+        self.frames.append((asyncio.get_running_loop().time(), frame))
+
+    async def iter_json(self):
+        await asyncio.Event().wait()
+        yield
+
+    async def close(self):
+        pass
+
+
+def _run(monkeypatch, scenario):
+    subscription = FakeSubscription()
+    monkeypatch.setattr(log_hub, "subscribe", lambda *args: subscription)
+    monkeypatch.setattr(log_hub, "unsubscribe", lambda *args: None)
+    websocket = FakeWebSocket()
+
+    async def main():
+        sender = asyncio.create_task(scenario(subscription.feed))
+        await pods.websocket_logs(websocket, "default", "web", "app", batch_bytes=10, batch_interval=0.2)
+        await sender
+
+    asyncio.run(main())
+    return [(at, frame) for at, frame in websocket.frames if "lines" in frame]
+
+
+def test_size_flush_starts_a_new_time_window(monkeypatch):
+    published = {}
+
+    async def scenario(feed):
+        loop = asyncio.get_running_loop()
+        await feed.put(["0123456789"])  # fills a batch: flushed by size right away
+        await asyncio.sleep(0.15)
+        published["short"] = loop.time()
+        await feed.put(["a"])
+        await asyncio.sleep(0.4)
+        await feed.put(None)
+
+    frames = _run(monkeypatch, scenario)
+    assert [frame["lines"] for _, frame in frames] == [["0123456789"], ["a"]]
+    # Flushed one full window after it arrived, not at the end of the size-flushed batch's window
+    assert frames[1][0] - published["short"] >= 0.19
+
+
+def test_lines_flushed_by_time_window(monkeypatch):
+    async def scenario(feed):
+        await feed.put(["a"])
+        await feed.put(["b"])
+        await asyncio.sleep(0.3)
+        await feed.put(None)
+
+    frames = _run(monkeypatch, scenario)
+    assert [frame["lines"] for _, frame in frames] == [["a", "b"]]
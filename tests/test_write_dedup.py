@@ -0,0 +1,130 @@
+from kubernetes import client
+from app.helpers import configmap, deployment, write_dedup
+from app.helpers.write_dedup import configmap_unchanged, deployment_unchanged
+import asyncio
+import pytest
+
+
+def _configmap(data=None, binary_data=None):
+    return client.V1ConfigMap(metadata=client.V1ObjectMeta(name="cfg"), data=data, binary_data=binary_data)
+
+
+def _deployment(replicas=2, image="web:1", labels=None, resource_version="5"):
+    labels = labels if labels is not None else {"app": "web"}
+    return client.V1Deployment(
+        metadata=client.V1ObjectMeta(name="web", namespace="default", labels=dict(labels),
+                                     resource_version=resource_version),
+        spec=client.V1DeploymentSpec(
+            replicas=replicas,
+            selector=client.V1LabelSelector(),
+            template=client.V1PodTemplateSpec(
+                metadata=client.V1ObjectMeta(labels=dict(labels)),
+                spec=client.V1PodSpec(containers=[client.V1Container(name="app", image=image)]),
+            ),
+        ),
+    )
+
+
+def test_configmap_same_values_are_unchanged():
+    current = _configmap({"a": "1", "b": "2"}, {"bin": "AAE="})
+    assert configmap_unchanged(current, {"a": "1"}, {})
+    assert configmap_unchanged(current, {"a": "1", "b": "2"}, {"bin": "AAE="})
+
+
+def test_configmap_new_or_different_values_are_changes():
+    current = _configmap({"a": "1"})
+    assert not configmap_unchanged(current, {"a": "2"}, {})
+    assert not configmap_unchanged(current, {"c": "1"}, {})
+    assert not configmap_unchanged(_configmap(), {"a": "1"}, {})
+
+
+def test_configmap_key_moving_between_data_and_binary_data_is_a_change():
+    assert not configmap_unchanged(_configmap({"a": "MQ=="}), {}, {"a": "MQ=="})
+    assert not configmap_unchanged(_configmap(binary_data={"a": "MQ=="}), {"a": "MQ=="}, {})
+
+
+def test_deployment_unchanged():
+    current = _deployment()
+    assert deployment_unchanged(current, {"replicas": 2, "image": "web:1", "labels": {"app": "web"}}, None, "app")
+    assert deployment_unchanged(current, {}, ["absent"], "app")
+    assert not deployment_unchanged(current, {"replicas": 3}, None, "app")
+    assert not deployment_unchanged(current, {"image": "web:2"}, None, "app")
+    assert not deployment_unchanged(current, {"labels": {"tier": "front"}}, None, "app")
+    assert not deployment_unchanged(current, {}, ["app"], "app")
+
+
+def test_label_only_on_the_template_is_a_change():
+    current = _deployment()
+    current.metadata.labels["tier"] = "front"
+    assert not deployment_unchanged(current, {"labels": {"tier": "front"}}, None, "app")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Dedup on, no informer, and every API call recorded instead of sent."""
+    made = []
+    versions = iter(range(10, 100))
+    monkeypatch.setattr(deployment, "WRITE_DEDUP", True)
+    monkeypatch.setattr(configmap, "WRITE_DEDUP", True)
+    monkeypatch.setattr(deployment, "cached_object", lambda *args: None)
+    monkeypatch.setattr(configmap, "cached_object", lambda *args: None)
+    monkeypatch.setattr(write_dedup, "_last_writes", type(write_dedup._last_writes)())
+
+    def patch_deployment(name, namespace, body, **kwargs):
+        made.append(("patch", body))
+        return _deployment(replicas=body["spec"].get("replicas", 2), resource_version=str(next(versions)))
+
+    def patch_config_map(name, namespace, body, **kwargs):
+        made.append(("patch", body))
+        result = _configmap(body["data"])
+        result.metadata.resource_version = str(next(versions))
+        return result
+
+    monkeypatch.setattr(deployment.apps_v1, "read_namespaced_deployment",
+                        lambda *args: made.append(("read", args)) or _deployment())
+    monkeypatch.setattr(deployment.apps_v1, "patch_namespaced_deployment", patch_deployment)
+    monkeypatch.setattr(configmap.core_v1, "patch_namespaced_config_map", patch_config_map)
+    return made
+
+
+def test_an_update_is_written_without_a_read(calls):
+    result = deployment.patch_deployment("web", "default", {"replicas": 3, "container": "app", "image": "web:2"})
+    assert result["written"] is True
+    assert [kind for kind, _ in calls] == ["patch"]
+
+
+def test_a_repeated_identical_update_is_skipped_without_a_call(calls):
+    assert deployment.patch_deployment("web", "default", {"replicas": 3})["written"] is True
+    assert deployment.patch_deployment("web", "default", {"replicas": 3})["written"] is False
+    assert deployment.patch_deployment("web", "default", {"replicas": 4})["written"] is True
+    assert asyncio.run(configmap.update_config_map("default", "cfg", {"a": "1"}))["written"] is True
+    skipped = asyncio.run(configmap.update_config_map("default", "cfg", {"a": "1"}))
+    assert skipped["written"] is False and skipped["data"] == {"a": "1"}
+    assert [kind for kind, _ in calls] == ["patch", "patch", "patch"]
+
+
+def test_remembered_writes_expire_and_are_dropped_on_other_changes(calls, monkeypatch):
+    deployment.patch_deployment("web", "default", {"replicas": 3})
+    deployment.remove_deployment_labels("web", "default", ["tier"])
+    assert deployment.patch_deployment("web", "default", {"replicas": 3})["written"] is True
+    monkeypatch.setattr(write_dedup, "WRITE_DEDUP_TTL", 0)
+    deployment.patch_deployment("web", "default", {"replicas": 5})
+    assert deployment.patch_deployment("web", "default", {"replicas": 5})["written"] is True
+
+
+def test_a_newer_cached_version_means_the_object_moved_on(calls, monkeypatch):
+    written = deployment.patch_deployment("web", "default", {"replicas": 3})
+    assert written["written"] is True
+    # Someone scaled it back to 2 after our write: the cache has a newer version
+    monkeypatch.setattr(deployment, "cached_object", lambda *args: _deployment(replicas=2, resource_version="99"))
+    assert deployment.patch_deployment("web", "default", {"replicas": 3})["written"] is True
+
+
+def test_the_cache_showing_the_values_skips_without_a_call(calls, monkeypatch):
+    monkeypatch.setattr(deployment, "cached_object", lambda *args: _deployment())
+    result = deployment.patch_deployment("web", "default", {"replicas": 2, "image": "web:1"})
+    assert result["written"] is False
+    assert calls == []
+    # A precondition on another version is left to the server, which answers 409
+    result = deployment.patch_deployment("web", "default", {"replicas": 2, "resource_version": "4"})
+    assert result["written"] is True